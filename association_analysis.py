@@ -0,0 +1,221 @@
+"""
+Associations entre toutes les questions catégorielles (V de Cramér et information mutuelle)
+"""
+import re
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from config import ASSOCIATION_CONFIG, SELECT_MULTIPLE_GROUPS
+
+def select_categorical_columns(df):
+    """Questions à choix unique (peu de modalités) et combinaisons des choix multiples"""
+    excluded = {col.strip() for col in SELECT_MULTIPLE_GROUPS.values()} | set(ASSOCIATION_CONFIG['exclude_columns'])
+    columns = []
+    for col in df.columns:
+        if col.startswith('_') or '/' in col or col.strip() in excluded:
+            continue
+        if col.startswith('Bitset_') and not ASSOCIATION_CONFIG['include_select_multiple']:
+            continue
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        values = df[col].dropna()
+        if pd.api.types.is_float_dtype(values) and not (values % 1 == 0).all():
+            continue  # mesure continue
+        if len(values) >= ASSOCIATION_CONFIG['min_answers'] and 2 <= values.nunique() <= ASSOCIATION_CONFIG['max_categories']:
+            columns.append(col)
+    return columns
+
+def base_question(column):
+    """Question d'origine d'une colonne (espaces et suffixe de doublon pandas ".1" retirés)"""
+    return re.sub(r'\.\d+$', '', column.strip()).strip()
+
+def own_source_pairs(columns):
+    """Paires (i, j) d'une colonne Bitset_* et d'une version de sa propre question à choix multiples"""
+    sources = {f'Bitset_{group}': base_question(question) for group, question in SELECT_MULTIPLE_GROUPS.items()}
+    pairs = []
+    for i, col in enumerate(columns):
+        if col in sources:
+            pairs.extend((i, j) for j, other in enumerate(columns)
+                         if j != i and base_question(other.split('/')[0]) == sources[col])
+    return pairs
+
+def encode_categoricals(df, columns):
+    """Code les questions en entiers 0..k-1 (-1 = non renseigné)"""
+    codes = np.empty((len(df), len(columns)), dtype=np.int64)
+    levels = np.empty(len(columns), dtype=np.int64)
+    for j, col in enumerate(columns):
+        codes[:, j], uniques = pd.factorize(df[col])
+        levels[j] = len(uniques)
+    return codes, levels
+
+def one_hot_block(codes, levels, columns):
+    """Codage disjonctif d'un bloc de questions (observations x modalités)
+
+    Une réponse manquante n'active aucune modalité : elle disparaît donc
+    d'elle-même de chaque table de contingence où la question intervient.
+    """
+    offsets = np.concatenate([[0], np.cumsum(levels[columns])])
+    dtype = np.float32 if len(codes) < 2 ** 24 else np.float64   # comptes exacts
+    matrix = np.zeros((len(codes), offsets[-1]), dtype=dtype)
+    rows, positions = np.nonzero(codes[:, columns] >= 0)
+    matrix[rows, offsets[positions] + codes[rows, columns[positions]]] = 1
+    return matrix, offsets
+
+def contingency_tables(codes, levels, block_i, block_j):
+    """Tables de contingence de toutes les paires entre deux blocs de questions
+
+    Le produit X_i^T X_j des codages disjonctifs contient, pour chaque paire
+    de questions, le comptage croisé de leurs modalités (l'équivalent d'un
+    bincount par paire, calculé en un seul produit matriciel).
+    """
+    left, left_offsets = one_hot_block(codes, levels, block_i)
+    right, right_offsets = (left, left_offsets) if block_j is block_i else one_hot_block(codes, levels, block_j)
+    gram = np.rint(left.T @ right).astype(np.int64)
+
+    tables = {}
+    for a, i in enumerate(block_i):
+        for b, j in enumerate(block_j):
+            if i < j:
+                tables[(i, j)] = gram[left_offsets[a]:left_offsets[a + 1], right_offsets[b]:right_offsets[b + 1]]
+    return tables
+
+def association_measures(table):
+    """V de Cramér, information mutuelle (nats) et information mutuelle normalisée d'une table
+
+    Le V de Cramér est corrigé du biais des petits effectifs (Bergsma); les
+    paires renseignées simultanément par trop peu d'agriculteurs sont ignorées.
+    """
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    n = table.sum()
+    if n < ASSOCIATION_CONFIG['min_answers'] or min(table.shape) < 2:
+        return np.nan, np.nan, np.nan
+
+    p = table / n
+    row, col = p.sum(axis=1), p.sum(axis=0)
+    expected = np.outer(row, col)
+
+    phi2 = ((p - expected) ** 2 / expected).sum()
+    r, k = table.shape
+    phi2 = max(0.0, phi2 - (k - 1) * (r - 1) / (n - 1))
+    r_corrected, k_corrected = r - (r - 1) ** 2 / (n - 1), k - (k - 1) ** 2 / (n - 1)
+    denominator = min(r_corrected, k_corrected) - 1
+    cramers_v = np.sqrt(phi2 / denominator) if denominator > 0 else np.nan
+
+    nonzero = p > 0
+    mutual_information = (p[nonzero] * np.log(p[nonzero] / expected[nonzero])).sum()
+    entropy_row, entropy_col = -(row * np.log(row)).sum(), -(col * np.log(col)).sum()
+    normalized = mutual_information / np.sqrt(entropy_row * entropy_col) if entropy_row > 0 and entropy_col > 0 else np.nan
+
+    return cramers_v, mutual_information, normalized
+
+def evaluate_tile(codes, levels, tile):
+    """Mesures d'association des paires d'une tuile (bloc i x bloc j)"""
+    block_i, block_j = tile
+    return {pair: association_measures(table) for pair, table in contingency_tables(codes, levels, block_i, block_j).items()}
+
+def column_blocks(codes, levels, max_block_bytes=None):
+    """Découpe les questions en blocs dont le codage disjonctif tient dans la mémoire allouée"""
+    max_block_bytes = max_block_bytes or ASSOCIATION_CONFIG['max_block_bytes']
+    max_width = max(int(max_block_bytes // (4 * max(len(codes), 1))), int(levels.max(initial=1)))
+    blocks, current, width = [], [], 0
+    for column, level in enumerate(levels):
+        if current and width + level > max_width:
+            blocks.append(np.array(current))
+            current, width = [], 0
+        current.append(column)
+        width += level
+    if current:
+        blocks.append(np.array(current))
+    return blocks
+
+def association_matrices(codes, levels, max_block_bytes=None, n_jobs=None):
+    """Matrices symétriques de V de Cramér et d'information mutuelle pour toutes les paires
+
+    Les paires sont traitées par tuiles de blocs de questions, éventuellement
+    réparties sur un pool de processus.
+    """
+    n_jobs = n_jobs or ASSOCIATION_CONFIG['n_jobs']
+    n_columns = codes.shape[1]
+
+    blocks = column_blocks(codes, levels, max_block_bytes)
+    tiles = [(blocks[a], blocks[b]) for a in range(len(blocks)) for b in range(a, len(blocks))]
+    evaluate = partial(evaluate_tile, codes, levels)
+
+    if n_jobs > 1 and len(tiles) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(evaluate, tiles))
+    else:
+        results = [evaluate(tile) for tile in tiles]
+
+    matrices = [np.eye(n_columns) for _ in range(3)]
+    for result in results:
+        for (i, j), measures in result.items():
+            for matrix, value in zip(matrices, measures):
+                matrix[i, j] = matrix[j, i] = value
+    return matrices
+
+def short_label(column, width=40):
+    """Libellé court d'une question pour les graphiques"""
+    column = column.strip()
+    return column if len(column) <= width else column[:width - 1] + '…'
+
+def generate_association_report(df):
+    """Génère la matrice d'associations entre questions catégorielles"""
+
+    print("Analyse des associations entre questions catégorielles...")
+
+    columns = select_categorical_columns(df)
+    codes, levels = encode_categoricals(df, columns)
+    cramers_v, mutual_information, normalized_mi = association_matrices(codes, levels)
+    
+    # Une combinaison de choix multiples et sa propre question : association triviale
+    for i, j in own_source_pairs(columns):
+        for matrix in (cramers_v, mutual_information, normalized_mi):
+            matrix[i, j] = matrix[j, i] = np.nan
+
+    # Paires les plus associées
+    i_idx, j_idx = np.triu_indices(len(columns), k=1)
+    values = cramers_v[i_idx, j_idx]
+    order = np.argsort(-np.nan_to_num(values, nan=-1), kind='stable')[:ASSOCIATION_CONFIG['top_pairs']]
+    top_pairs = [
+        {
+            'question_1': columns[i_idx[k]],
+            'question_2': columns[j_idx[k]],
+            'cramers_v': float(values[k]),
+            'mutual_information': float(mutual_information[i_idx[k], j_idx[k]]),
+            'normalized_mi': float(normalized_mi[i_idx[k], j_idx[k]])
+        }
+        for k in order if not np.isnan(values[k])
+    ]
+
+    report = {
+        'columns': columns,
+        'labels': [short_label(col) for col in columns],
+        'cramers_v': cramers_v.tolist(),
+        'mutual_information': mutual_information.tolist(),
+        'normalized_mi': normalized_mi.tolist(),
+        'top_pairs': top_pairs,
+        'summary': {
+            'n_questions': len(columns),
+            'n_pairs': len(i_idx),
+            'strong_associations': int((np.nan_to_num(values) >= 0.5).sum()),
+            'strongest_pair': (top_pairs[0]['question_1'], top_pairs[0]['question_2'], top_pairs[0]['cramers_v']) if top_pairs else None
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DES ASSOCIATIONS CATÉGORIELLES ===")
+    print(f"   - Questions analysées: {len(columns)} ({len(i_idx)} paires)")
+    print(f"   - Associations fortes (V >= 0.5): {report['summary']['strong_associations']}")
+    for pair in top_pairs[:5]:
+        print(f"   - {short_label(pair['question_1'])} × {short_label(pair['question_2'])}: V = {pair['cramers_v']:.2f}")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_association_report(df)
@@ -0,0 +1,269 @@
+"""
+Rapports PDF par village, commune ou coopérative (génération par lots)
+"""
+import io
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from config import BATCH_REPORT_CONFIG, GRAPH_CONFIG, HARMFUL_PRACTICES, RECOMMENDATION_RULES, THRESHOLDS
+from impact_analysis import COMPILED_HARMFUL_PRACTICES, evaluate_rules
+from recommendation_engine import applicable_rules
+from report_generator import get_report_styles, METHODOLOGY_TEXT, RECOMMENDATIONS_TEXT
+from text_index import fold_text
+
+# Indicateurs clés du tableau de chaque rapport : (libellé, format)
+KEY_INDICATORS = {
+    'pesticides': ("Utilisation de pesticides (%)", '{:.1f}'),
+    'protection': ("Équipement de protection (%)", '{:.1f}'),
+    'exposition': ("Score d'exposition moyen", '{:.1f}'),
+    'eau_m3': ("Consommation d'eau (m³/ha)", '{:,.0f}'),
+    'travail_enfants': ("Travail des enfants (%)", '{:.1f}')
+}
+
+def farmer_indicators(df):
+    """Indicateurs par agriculteur agrégés dans chaque rapport (pratiques, recommandations, indicateurs clés)"""
+    practices = evaluate_rules(df, COMPILED_HARMFUL_PRACTICES).astype(float)
+    recommendations = applicable_rules(df).astype(float)
+    child_labor = df.get("Des enfants abandonnent ils  l'école pour venir travailler dans votre exploitation")
+
+    indicators = pd.DataFrame({
+        'pesticides': df['Uses_pesticides'].astype(float) * 100,
+        'protection': (df['Protection_factor'] < 1.0).astype(float) * 100,
+        'exposition': df['Pesticide_exposure_score'],
+        'eau_m3': df['Water_consumption_m3'],
+        'travail_enfants': (child_labor == 'oui').astype(float) * 100 if child_labor is not None else np.nan
+    }, index=df.index)
+    practice_frame = pd.DataFrame(practices * 100, index=df.index, columns=[f'pratique:{name}' for name in HARMFUL_PRACTICES])
+    recommendation_frame = pd.DataFrame(recommendations, index=df.index, columns=[f'reco:{name}' for name in RECOMMENDATION_RULES])
+    return pd.concat([indicators, practice_frame, recommendation_frame], axis=1)
+
+def dimension_codes(values):
+    """Codes entiers d'une colonne de regroupement et libellé de chaque code
+
+    Les variantes d'écriture (casse, accents, espaces) sont regroupées; le
+    libellé retenu est l'orthographe la plus fréquente du groupe.
+    """
+    raw_codes, raw_values = pd.factorize(values)
+    # Normalisation des seules valeurs distinctes (dernière entrée : valeur manquante)
+    spellings = np.array([str(value).strip() for value in raw_values] + ['Non renseigné'], dtype=object)
+    raw_codes = np.where(raw_codes < 0, len(raw_values), raw_codes)
+    folded = np.array([' '.join(fold_text(label).split()) for label in spellings], dtype=object)
+    spelling_ids, unique_spellings = pd.factorize(spellings)
+
+    codes, _ = pd.factorize(folded[raw_codes], sort=True)
+    frequencies = (pd.DataFrame({'code': codes, 'spelling': spelling_ids[raw_codes]}).value_counts()
+                   .reset_index().drop_duplicates('code').sort_values('code'))
+    return codes, [unique_spellings[i] for i in frequencies['spelling']]
+
+def group_labels(values):
+    """Libellé de groupe de chaque ligne, variantes d'écriture regroupées (voir dimension_codes)"""
+    codes, labels = dimension_codes(values)
+    return pd.Series(np.array(labels, dtype=object)[codes], index=values.index)
+
+def compute_group_aggregates(df, group_by=None):
+    """Agrégats de tous les groupes en un seul groupby, et valeurs d'ensemble pour comparaison
+
+    Les moyennes donnent les taux (%) et indicateurs moyens; les colonnes de
+    recommandations sont sommées (nombre d'agriculteurs concernés).
+    """
+    group_by = group_by or BATCH_REPORT_CONFIG['group_by']
+    indicators = farmer_indicators(df)
+    groups = group_labels(df[group_by])
+
+    grouped = indicators.groupby(groups)
+    aggregates = grouped.mean()
+    reco_columns = [col for col in indicators.columns if col.startswith('reco:')]
+    aggregates[reco_columns] = grouped[reco_columns].sum()
+    aggregates['farmers'] = grouped.size()
+
+    national = indicators.mean()
+    national['farmers'] = len(df)
+    return aggregates, national
+
+def practice_labels():
+    """Libellés des pratiques nuisibles, seuils inclus (ordre de HARMFUL_PRACTICES)"""
+    return [practice['description'].format(threshold=THRESHOLDS.get(practice.get('threshold'), practice.get('value')))
+            for practice in HARMFUL_PRACTICES.values()]
+
+def document_filename(group_by, group):
+    """Nom de fichier sûr pour le rapport d'un groupe"""
+    slug = re.sub(r'[^a-z0-9]+', '_', fold_text(group)).strip('_') or 'sans_nom'
+    return f"rapport_{fold_text(group_by).strip().replace(' ', '_')}_{slug}.pdf"
+
+def unique_filenames(filenames):
+    """Suffixe _2, _3... les noms de fichiers en double (groupes distincts de même nom simplifié)"""
+    used, unique = set(), []
+    for name in filenames:
+        stem, dot, ext = name.rpartition('.')
+        candidate, number = name, 1
+        while candidate in used:
+            number += 1
+            candidate = f"{stem}_{number}{dot}{ext}"
+        used.add(candidate)
+        unique.append(candidate)
+    return unique
+
+@lru_cache(maxsize=1)
+def static_flowables():
+    """Sections identiques dans tous les rapports (construites une fois par processus)"""
+    styles = get_report_styles()
+    return (
+        Paragraph("MÉTHODOLOGIE", styles['heading']),
+        Paragraph(METHODOLOGY_TEXT, styles['normal']),
+        PageBreak(),
+        Paragraph("RECOMMANDATIONS GÉNÉRALES", styles['heading']),
+        Paragraph(RECOMMENDATIONS_TEXT, styles['normal'])
+    )
+
+def practice_chart(group_rates, national_rates, labels):
+    """Graphique des pratiques nuisibles (groupe vs ensemble), rendu en mémoire (PNG)"""
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    positions = np.arange(len(labels))
+    ax.barh(positions + 0.2, group_rates, height=0.4, color=GRAPH_CONFIG['colors'][0], label='Groupe')
+    ax.barh(positions - 0.2, national_rates, height=0.4, color=GRAPH_CONFIG['colors'][1], alpha=0.6, label='Ensemble')
+    ax.set_yticks(positions)
+    ax.set_yticklabels(labels, fontsize=9)
+    ax.set_xlim(0, 100)
+    ax.set_xlabel("Pourcentage d'agriculteurs (%)")
+    ax.legend(fontsize=GRAPH_CONFIG['legend_size'])
+    plt.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=BATCH_REPORT_CONFIG['chart_dpi'])
+    plt.close(fig)
+    buffer.seek(0)
+    return buffer
+
+def build_group_story(task, chart):
+    """Contenu d'un rapport de groupe : en-tête, indicateurs, graphique, recommandations ciblées, sections statiques"""
+    styles = get_report_styles()
+    values, national = task['values'], task['national']
+    story = [
+        Paragraph(f"{task['group_label']} : {task['group']}", styles['title']),
+        Paragraph(f"<b>Date du rapport:</b> {task['date']}<br/><b>Agriculteurs enquêtés:</b> {int(values['farmers'])} "
+                  f"(sur {int(national['farmers'])})", styles['normal']),
+        Paragraph("INDICATEURS CLÉS", styles['heading'])
+    ]
+
+    rows = [['Indicateur', 'Groupe', 'Ensemble']]
+    for key, (label, fmt) in KEY_INDICATORS.items():
+        rows.append([label] + [fmt.format(v) if pd.notna(v) else 'N/A' for v in (values[key], national[key])])
+    table = Table(rows, colWidths=[3.2*inch, 1.4*inch, 1.4*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+    ]))
+    story += [table, Spacer(1, 0.3*inch), Paragraph("PRATIQUES AGRICOLES NUISIBLES", styles['heading']),
+              Image(chart, width=6*inch, height=3.4*inch), Spacer(1, 0.2*inch)]
+
+    targeted = [(rule['priority'], -values[f'reco:{name}'], rule['message'], int(values[f'reco:{name}']))
+                for name, rule in RECOMMENDATION_RULES.items() if values[f'reco:{name}'] > 0]
+    content = "".join(f"• [Priorité {priority}] {message} : {count} agriculteur(s)<br/>"
+                      for priority, _, message, count in sorted(targeted))
+    story += [Paragraph("RECOMMANDATIONS CIBLÉES", styles['heading']),
+              Paragraph(content or "Aucune recommandation ciblée pour ce groupe.", styles['normal']),
+              PageBreak()]
+
+    return story + list(static_flowables())
+
+def render_group_report(task):
+    """Rend le graphique et le PDF d'un groupe; retourne les temps de chaque étape"""
+    start = time.perf_counter()
+    practice_names = list(HARMFUL_PRACTICES)
+    chart = practice_chart([task['values'][f'pratique:{name}'] for name in practice_names],
+                           [task['national'][f'pratique:{name}'] for name in practice_names],
+                           task['practice_labels'])
+    chart_done = time.perf_counter()
+
+    story = build_group_story(task, chart)
+    SimpleDocTemplate(str(task['filename']), pagesize=A4).build(story)
+    end = time.perf_counter()
+
+    return {
+        'group': task['group'],
+        'file': str(task['filename']),
+        'farmers': int(task['values']['farmers']),
+        'chart_seconds': chart_done - start,
+        'build_seconds': end - chart_done,
+        'total_seconds': end - start
+    }
+
+def generate_batch_reports(df, group_by=None, n_jobs=None):
+    """Génère un rapport PDF par groupe à partir d'agrégats calculés une seule fois"""
+    group_by = group_by or BATCH_REPORT_CONFIG['group_by']
+    n_jobs = n_jobs or BATCH_REPORT_CONFIG['n_jobs']
+    output_dir = BATCH_REPORT_CONFIG['output_dir']
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"Génération des rapports par {group_by.strip()}...")
+    start = time.perf_counter()
+
+    aggregates, national = compute_group_aggregates(df, group_by)
+    aggregates = aggregates[aggregates['farmers'] >= BATCH_REPORT_CONFIG['min_farmers']]
+    labels = practice_labels()
+
+    national_values = national.to_dict()
+    date = datetime.now().strftime('%d/%m/%Y')
+    filenames = unique_filenames([document_filename(group_by, group) for group in aggregates.index])
+    tasks = [
+        {
+            'group': group,
+            'group_label': group_by.strip().capitalize(),
+            'values': values,
+            'national': national_values,
+            'practice_labels': labels,
+            'date': date,
+            'filename': output_dir / filename
+        }
+        for group, values, filename in zip(aggregates.index, aggregates.to_dict('records'), filenames)
+    ]
+    aggregation_seconds = time.perf_counter() - start
+
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            documents = list(executor.map(render_group_report, tasks))
+    else:
+        documents = [render_group_report(task) for task in tasks]
+
+    total_seconds = time.perf_counter() - start
+    timings = pd.DataFrame(documents)
+    report = {
+        'group_by': group_by,
+        'documents': documents,
+        'summary': {
+            'documents': len(documents),
+            'aggregation_seconds': aggregation_seconds,
+            'total_seconds': total_seconds,
+            'mean_document_seconds': timings['total_seconds'].mean() if documents else 0.0,
+            'slowest_document': timings.loc[timings['total_seconds'].idxmax(), 'group'] if documents else None
+        }
+    }
+
+    # Afficher le résumé
+    print(f"\n=== RÉSUMÉ DES RAPPORTS PAR {group_by.strip().upper()} ===")
+    print(f"   - Documents: {len(documents)} dans {output_dir}")
+    print(f"   - Agrégats: {aggregation_seconds:.2f} s, total: {total_seconds:.2f} s ({n_jobs} processus)")
+    if documents:
+        print(f"   - Par document: graphique {timings['chart_seconds'].mean():.2f} s, "
+              f"PDF {timings['build_seconds'].mean():.2f} s en moyenne (max {timings['total_seconds'].max():.2f} s)")
+
+    return report
+
+if __name__ == "__main__":
+    import sys
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_batch_reports(df, group_by=sys.argv[1] if len(sys.argv) > 1 else None)
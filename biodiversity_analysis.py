@@ -0,0 +1,181 @@
+"""
+Analyse des changements de faune et de flore déclarés par les agriculteurs
+"""
+import re
+import pandas as pd
+import numpy as np
+from config import THRESHOLDS, BIODIVERSITY_QUESTION_COLUMNS
+from data_loader import get_select_multiple_options
+from text_index import fold_text
+
+# Tables de motifs appliquées au texte normalisé (minuscules, sans accents)
+TAXON_PATTERNS = {
+    'oiseaux': r'\boiseau|\bcanar|\bpigeon',
+    'poissons': r'\bpoisson',
+    'reptiles_amphibiens': r'serpent|tortu|crocodile|amphibien|grenouille|crapaud',
+    'mammiferes_sauvages': r'phacoch|\bsinge|\blion|\btigre|panthere|hippopotame|\blapin|lievre|serval|chacal|hyene|animaux sauvages|especes animales',
+    'insectes': r'insecte|ravageur|criquet|moustique',
+    'arbres_savane': r'\barbre|arbuste|prosop|acacia|tamarix|ziziphus|gonak|jubier|savane|foret|deforest',
+    'adventices': r'\bherbe|adventice|advantice|mbeubeus',
+    'flore_generale': r'especes? vegeta|vegetation'
+}
+
+CHANGE_PATTERNS = {
+    'disparition': r'dispar|dispru|absence|n.existe plus',
+    'diminution': r'diminu|dumin|reduc|reduit|baiss|\bmoins\b|meurt|coupe',
+    'augmentation': r'augm|augem|prolif|nouve|envah|invasi|apparai',
+    'deplacement': r'deplac|refuge|migr',
+    'pas_de_changement': r'pas de changement|^\s*(non|neant|rien)\b'
+}
+
+NEGATIVE_CHANGES = ['disparition', 'diminution']
+
+COMPILED_TAXON_PATTERNS = {name: re.compile(pattern) for name, pattern in TAXON_PATTERNS.items()}
+COMPILED_CHANGE_PATTERNS = {name: re.compile(pattern) for name, pattern in CHANGE_PATTERNS.items()}
+
+def match_patterns(text, compiled_patterns):
+    """Applique une table de motifs compilés à une colonne de texte normalisé"""
+    return pd.DataFrame({
+        name: text.str.contains(pattern, na=False).to_numpy(dtype=bool)
+        for name, pattern in compiled_patterns.items()
+    }, index=text.index)
+
+def extract_biodiversity_indicators(df, columns=None):
+    """Extrait les indicateurs de groupe taxonomique et de sens du changement
+
+    Chaque question est normalisée une fois (fold_text, comme l'index texte)
+    puis chaque motif est appliqué à la colonne entière; une exploitation est
+    marquée si au moins une de ses réponses correspond.
+    """
+    columns = [col for col in (columns or BIODIVERSITY_QUESTION_COLUMNS) if col in df.columns]
+
+    taxa = pd.DataFrame(False, index=df.index, columns=list(TAXON_PATTERNS))
+    changes = pd.DataFrame(False, index=df.index, columns=list(CHANGE_PATTERNS))
+    answered = pd.Series(False, index=df.index)
+
+    for col in columns:
+        text = df[col].map(fold_text, na_action='ignore').astype('string')
+        answered |= text.notna() & (text.str.strip() != '')
+        taxa |= match_patterns(text, COMPILED_TAXON_PATTERNS)
+        changes |= match_patterns(text, COMPILED_CHANGE_PATTERNS)
+
+    return taxa, changes, answered, columns
+
+def build_practice_indicators(df):
+    """Indicateurs binaires des pratiques phytosanitaires et hydrauliques"""
+    practices = {}
+
+    if 'Uses_pesticides' in df.columns:
+        practices['utilise_pesticides'] = df['Uses_pesticides'].fillna(False).astype(bool)
+    if 'Pesticide_exposure_score' in df.columns:
+        practices['exposition_pesticides_elevee'] = df['Pesticide_exposure_score'] > THRESHOLDS['pesticide_exposure_risk']
+    if 'Water_consumption_m3' in df.columns:
+        practices['surconsommation_eau'] = df['Water_consumption_m3'] > THRESHOLDS['water_consumption_high']
+
+    # Types d'irrigation et origines de l'eau (choix multiples)
+    for group in ['irrigation', 'water_sources']:
+        for col in get_select_multiple_options(df, group):
+            option = col.split('/', 1)[-1].strip()
+            practices[f"{group}:{option}"] = df[col].fillna(0).astype(bool)
+
+    return pd.DataFrame(practices, index=df.index)
+
+def crosstab_indicators(indicators, practices, respondents):
+    """Croise tous les indicateurs avec toutes les pratiques en une passe
+
+    Un produit matriciel P^T X donne le nombre d'exploitations présentant à la
+    fois chaque pratique et chaque indicateur; les taux avec/sans pratique s'en
+    déduisent à partir des totaux.
+    """
+    x = indicators[respondents].to_numpy(dtype=np.float64)
+    p = practices[respondents].to_numpy(dtype=np.float64)
+
+    joint = p.T @ x                              # pratiques x indicateurs
+    n_with = p.sum(axis=0)[:, None]
+    n_without = len(x) - n_with
+    totals = x.sum(axis=0)[None, :]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_with = np.where(n_with > 0, joint / n_with * 100, np.nan)
+        rate_without = np.where(n_without > 0, (totals - joint) / n_without * 100, np.nan)
+
+    def frame(values):
+        return pd.DataFrame(values, index=practices.columns, columns=indicators.columns)
+
+    return {
+        'joint_counts': frame(joint.astype(np.int64)),
+        'n_with': pd.Series(n_with[:, 0].astype(np.int64), index=practices.columns),
+        'rate_with': frame(rate_with),
+        'rate_without': frame(rate_without),
+        'difference': frame(rate_with - rate_without)
+    }
+
+def generate_biodiversity_report(df, min_support=5):
+    """Génère le rapport sur les changements de faune et de flore"""
+
+    print("Analyse de la biodiversité...")
+
+    taxa, changes, answered, columns = extract_biodiversity_indicators(df)
+    if not columns:
+        print("⚠️ Aucune question sur la biodiversité trouvée dans l'export")
+
+    changes['changement_negatif'] = changes[NEGATIVE_CHANGES].any(axis=1)
+    indicators = pd.concat([taxa, changes], axis=1)
+    practices = build_practice_indicators(df)
+    n_respondents = int(answered.sum())
+
+    crosstab = crosstab_indicators(indicators, practices, answered.to_numpy())
+
+    # Groupes taxonomiques x sens du changement
+    taxon_by_change = (taxa[answered].to_numpy(dtype=np.int64).T @ changes[answered].to_numpy(dtype=np.int64))
+    taxon_by_change = pd.DataFrame(taxon_by_change, index=taxa.columns, columns=changes.columns)
+
+    # Association la plus forte parmi les pratiques suffisamment répandues
+    difference = crosstab['difference']['changement_negatif'][crosstab['n_with'] >= min_support].dropna()
+    strongest = (difference.idxmax(), float(difference.max())) if not difference.empty else ('aucune', 0.0)
+
+    def percentage(count):
+        return count / n_respondents * 100 if n_respondents > 0 else 0
+
+    report = {
+        'columns_used': columns,
+        'n_respondents': n_respondents,
+        'min_support': min_support,
+        'taxon_counts': {name: int(count) for name, count in taxa[answered].sum().items()},
+        'change_counts': {name: int(count) for name, count in changes[answered].sum().items()},
+        'taxon_by_change': taxon_by_change.to_dict('index'),
+        'practice_crosstab': {
+            practice: {
+                'n': int(crosstab['n_with'][practice]),
+                'negative_change_with': crosstab['rate_with'].loc[practice, 'changement_negatif'],
+                'negative_change_without': crosstab['rate_without'].loc[practice, 'changement_negatif'],
+                'rates_with': crosstab['rate_with'].loc[practice].to_dict(),
+                'rates_without': crosstab['rate_without'].loc[practice].to_dict()
+            }
+            for practice in practices.columns
+        },
+        'difference_matrix': crosstab['difference'].to_dict('index'),
+        'summary': {
+            'negative_change_rate': percentage(changes.loc[answered, 'changement_negatif'].sum()),
+            'increase_rate': percentage(changes.loc[answered, 'augmentation'].sum()),
+            'most_cited_taxon': taxa[answered].sum().idxmax() if taxa[answered].to_numpy().any() else 'aucun',
+            'strongest_practice_association': strongest
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DE L'ANALYSE DE LA BIODIVERSITÉ ===")
+    print(f"   - Réponses exploitables: {n_respondents} ({len(columns)} questions)")
+    print(f"   - Changement négatif (disparition/diminution): {report['summary']['negative_change_rate']:.1f}%")
+    print(f"   - Augmentation/prolifération: {report['summary']['increase_rate']:.1f}%")
+    print(f"   - Groupe le plus cité: {report['summary']['most_cited_taxon']}")
+    print(f"   - Pratique la plus associée aux pertes: {strongest[0]} ({strongest[1]:+.1f} points)")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_biodiversity_report(df)
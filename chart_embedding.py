@@ -0,0 +1,47 @@
+"""
+Intégration des graphiques dans le PDF (dessins vectoriels ou images en mémoire)
+"""
+import io
+import matplotlib.pyplot as plt
+from reportlab.platypus import Image
+from config import GRAPH_CONFIG
+
+try:
+    from svglib.svglib import svg2rlg
+except ImportError:  # dépendance optionnelle : repli sur une image matricielle en mémoire
+    svg2rlg = None
+
+def embedding_format():
+    """Format d'intégration effectif : 'svg' si demandé et svglib disponible, sinon 'png'"""
+    if GRAPH_CONFIG['pdf_embedding'] == 'vector' and svg2rlg is not None:
+        return 'svg'
+    return 'png'
+
+def render_chart(fig):
+    """Rend une figure en mémoire pour le rapport : (format, octets), SVG vectoriel ou PNG à la résolution du PDF"""
+    fmt = embedding_format()
+    buffer = io.BytesIO()
+    if fmt == 'svg':
+        # Texte conservé comme texte (et non en contours) : SVG plus léger, conversion plus rapide
+        with plt.rc_context({'svg.fonttype': 'none'}):
+            fig.savefig(buffer, format='svg', bbox_inches='tight')
+        if buffer.tell() > GRAPH_CONFIG['max_vector_bytes']:
+            # Graphique trop dense (cartes de chaleur...) : l'image matricielle est plus légère
+            fmt, buffer = 'png', io.BytesIO()
+    if fmt == 'png':
+        fig.savefig(buffer, format='png', dpi=GRAPH_CONFIG['pdf_dpi'], bbox_inches='tight')
+    return fmt, buffer.getvalue()
+
+def chart_flowable(entry, width, height):
+    """Flowable reportlab d'un graphique rendu en mémoire (format, octets)
+
+    Le graphique est ajusté au cadre width x height en conservant ses proportions.
+    """
+    fmt, data = entry
+    if fmt == 'svg':
+        drawing = svg2rlg(io.BytesIO(data))
+        scale = min(width / drawing.width, height / drawing.height)
+        drawing.width, drawing.height = drawing.width * scale, drawing.height * scale
+        drawing.scale(scale, scale)
+        return drawing
+    return Image(io.BytesIO(data), width=width, height=height, kind='proportional')
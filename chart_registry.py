@@ -0,0 +1,95 @@
+"""
+Registre des graphiques rendus en mémoire, avec export PNG asynchrone
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+from PIL import Image
+from config import GRAPH_CONFIG, GRAPHS_DIR
+from chart_embedding import render_chart, chart_flowable
+
+class ChartRegistry:
+    """Graphiques rendus une fois en mémoire et indexés par nom
+
+    Le rapport PDF consomme directement les rendus en mémoire. L'export des
+    PNG haute résolution est optionnel : seule la rastérisation se fait au
+    moment du rendu (matplotlib n'est pas sûr entre threads); la copie RGBA du
+    canevas est compressée en PNG (PIL) et écrite en arrière-plan pendant la
+    suite du traitement.
+    """
+
+    def __init__(self, export_dir=None, export_png=None):
+        self.export_dir = export_dir or GRAPHS_DIR
+        self.export_png = GRAPH_CONFIG['export_png'] if export_png is None else export_png
+        self.charts = {}      # nom -> (format, octets) pour le PDF
+        self.pending = {}     # nom -> écriture PNG en cours
+        self._executor = None
+
+    def _writer(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export-png')
+        return self._executor
+
+    @staticmethod
+    def _write(path, data):
+        path.write_bytes(data)
+        return path
+
+    @staticmethod
+    def _encode(path, rgba, dpi):
+        """Compresse une image RGBA en PNG et l'écrit (thread d'export)"""
+        Image.fromarray(rgba, 'RGBA').save(path, format='PNG', dpi=(dpi, dpi))
+        return path
+
+    @staticmethod
+    def snapshot(fig, dpi):
+        """Rastérise la figure à dpi et copie le canevas recadré comme bbox_inches='tight'"""
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        rgba = np.asarray(fig.canvas.buffer_rgba())
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(plt.rcParams['savefig.pad_inches'])
+        height, width = rgba.shape[:2]
+        left, right = max(round(bbox.x0 * dpi), 0), min(round(bbox.x1 * dpi), width)
+        top, bottom = max(round(height - bbox.y1 * dpi), 0), min(round(height - bbox.y0 * dpi), height)
+        return rgba[top:bottom, left:right].copy()
+
+    def register(self, name, fig):
+        """Rend une figure pour le rapport, programme son export PNG et la ferme"""
+        fmt, data = self.charts[name] = render_chart(fig)
+        if self.export_png:
+            if fmt == 'png' and GRAPH_CONFIG['pdf_dpi'] == GRAPH_CONFIG['dpi']:
+                # Rendu PDF déjà en PNG à la résolution d'export (profil d'aperçu) : réutilisé tel quel
+                task = (self._write, self.export_dir / name, data)
+            else:
+                task = (self._encode, self.export_dir / name, self.snapshot(fig, GRAPH_CONFIG['dpi']), GRAPH_CONFIG['dpi'])
+            self.pending[name] = self._writer().submit(*task)
+        plt.close(fig)
+        return self.charts[name]
+
+    def get(self, name):
+        """Rendu en mémoire d'un graphique (None s'il n'a pas été enregistré)"""
+        return self.charts.get(name)
+
+    def flowable(self, name, width, height):
+        """Flowable reportlab d'un graphique enregistré (None s'il est absent)"""
+        entry = self.get(name)
+        return chart_flowable(entry, width, height) if entry is not None else None
+
+    def wait(self):
+        """Attend la fin des exports PNG en cours; retourne les fichiers écrits"""
+        written = []
+        for name, future in self.pending.items():
+            try:
+                written.append(future.result())
+            except Exception as e:
+                print(f"✗ Export du graphique {name} impossible: {e}")
+        self.pending.clear()
+        return written
+
+    def clear(self):
+        """Oublie les graphiques enregistrés (après attente des exports)"""
+        self.wait()
+        self.charts.clear()
+
+# Registre partagé par la visualisation et le générateur de rapport
+CHART_REGISTRY = ChartRegistry()
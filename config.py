@@ -10,14 +10,81 @@ DATA_DIR = BASE_DIR / "data"
 RESULTS_DIR = BASE_DIR / "resultats"
 GRAPHS_DIR = RESULTS_DIR / "graphiques"
 REPORTS_DIR = RESULTS_DIR / "rapports"
+CACHE_DIR = DATA_DIR / "cache"
+STORE_DIR = DATA_DIR / "store"
+STORE_STATE_FILE = "state.json"
 
 # Créer les dossiers s'ils n'existent pas
-for directory in [DATA_DIR, RESULTS_DIR, GRAPHS_DIR, REPORTS_DIR]:
+for directory in [DATA_DIR, RESULTS_DIR, GRAPHS_DIR, REPORTS_DIR, CACHE_DIR, STORE_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
 
 # Fichier de données
 DATA_FILE = "Evaluation_environnementale_du_projet_TAAT2__all_versions__Français_fr__20250703101247.xlsx"
 
+# Exports régionaux / par phase à fusionner (source 'all')
+DATA_FILE_PATTERN = "Evaluation_environnementale_*.xlsx"
+
+# Source des données: 'file' (export manuel DATA_FILE), 'all' (tous les exports DATA_FILE_PATTERN)
+# ou 'store' (soumissions synchronisées)
+DATA_SOURCE = os.environ.get('TAAT2_DATA_SOURCE', 'file')
+
+# Lecture en flux des exports CSV / JSON (lignes par bloc). Seule l'ingestion dans le magasin
+# (ingest_export_to_store) est à mémoire bornée : load_data assemble toujours le tableau complet
+INGEST_CHUNK_SIZE = 50000
+CSV_EXTENSIONS = {'.csv', '.txt'}
+JSON_EXTENSIONS = {'.json', '.jsonl', '.ndjson'}
+
+# Synchronisation avec l'API Kobo (v2)
+KOBO_CONFIG = {
+    'server_url': os.environ.get('KOBO_SERVER_URL', 'https://kf.kobotoolbox.org'),
+    'asset_uid': os.environ.get('KOBO_ASSET_UID', ''),
+    'token': os.environ.get('KOBO_API_TOKEN', ''),
+    'page_size': 500,
+    'timeout': 30,      # secondes
+    'max_retries': 3,
+    # Correspondance nom de champ XML -> libellé de l'export : XLSForm du formulaire s'il est présent,
+    # sinon table versionnée (kobo_sync.py --table-alias pour la régénérer)
+    'xlsform_file': DATA_DIR / "formulaire_taat2.xlsx",
+    'aliases_file': DATA_DIR / "kobo_column_aliases.csv"
+}
+
+# Renommages supplémentaires (prioritaires sur l'XLSForm et la table d'alias)
+COLUMN_ALIASES = {}
+
+# Coordonnées GPS livrées par l'API en "lat lon altitude précision" (colonnes _<question>_latitude... dans l'export)
+GEOPOINT_COLUMNS = ['start-geopoint', 'Cordonnées GPS']
+GEOPOINT_PARTS = ['latitude', 'longitude', 'altitude', 'precision']
+
+# Types appliqués par harmonize_columns : l'API et les exports CSV / JSON livrent des chaînes
+# dont le type dépend du bloc lu. 'datetime' : date; 'date_or_value' : cellule mixte de l'export
+# Excel (dates reconverties, autres réponses conservées); sinon type pandas (valeurs non numériques -> NaN)
+COLUMN_TYPES = {
+    'start': 'datetime',
+    'end': 'datetime',
+    '_submission_time': 'datetime',
+    '_id': 'Int64',
+    'Age': 'date_or_value',
+    'Age.1': 'datetime',
+    'Surperficie cultivée en 2023': 'float64',
+    'Superficie cultivée en 2024': 'float64',
+    'Superficie cultivée en 2025': 'float64',
+    'Superficie cultivée en contre saison ': 'float64',
+    'Superficie cultivée en Hivernage': 'float64',
+    'superficie par campagne en hectare': 'float64',
+    'Nombre de campagne par an': 'float64',
+    'quelle quantite de semence utiliser vous par hectare': 'float64',
+    'quelle quantité de matière organique utiliser vous': 'float64',
+    "quelle quantite d'engrais chimique utiliser vous": 'float64',
+    'preciser les quantites': 'float64',
+    'sur une echelle de 1 a 5 comment notez vous cette pollution': 'float64',
+    'sur une echelle de 1 a 5 notez la présence de pesticide sur les canaux': 'float64',
+    'sur une echelle de 1 a 100 notez la présence des pesticides dans les canaux': 'float64'
+}
+DATETIME_COLUMNS = [col for col, kind in COLUMN_TYPES.items() if kind == 'datetime']
+
+# Date sérialisée (ISO en JSON, "AAAA-MM-JJ HH:MM:SS" en CSV)
+DATETIME_TEXT_PATTERN = r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}'
+
 # Configuration des graphiques
 GRAPH_CONFIG = {
     'figure_size': (10, 6),
@@ -26,15 +93,406 @@ GRAPH_CONFIG = {
     'title_size': 14,
     'label_size': 12,
     'legend_size': 10,
-    'colors': ['#2E86AB', '#E63946', '#F77F00', '#06D6A0', '#7209B7', '#F72585']
+    'colors': ['#2E86AB', '#E63946', '#F77F00', '#06D6A0', '#7209B7', '#F72585'],
+    'pdf_embedding': 'vector',   # 'vector' (SVG -> dessin reportlab, nécessite svglib) ou 'raster'
+    'pdf_dpi': 150,              # résolution des graphiques matriciels intégrés au PDF
+    'max_vector_bytes': 200 * 1024, # au-delà, le graphique est intégré en image matricielle
+    'export_png': True,             # export des PNG haute résolution (écriture en arrière-plan)
+    'export_dir': GRAPHS_DIR,
+    'style': 'seaborn-v0_8-darkgrid',
+    'report_chart_size': (6, 4),    # cadre des graphiques dans le rapport PDF (pouces)
+    'draft_report': False           # rapport marqué « aperçu » (version de travail)
+}
+
+# Profils de rendu : publication (300 dpi, graphiques vectoriels) ou aperçu rapide
+# pour l'itération interactive (résolution écran, style matplotlib 'fast', vignettes)
+RENDER_PROFILES = {
+    'publication': {key: GRAPH_CONFIG[key] for key in
+                    ('dpi', 'pdf_embedding', 'pdf_dpi', 'export_png', 'export_dir', 'style',
+                     'report_chart_size', 'draft_report')},
+    'preview': {
+        'dpi': 96,
+        'pdf_embedding': 'raster',
+        'pdf_dpi': 96,                        # = dpi : un seul rendu par graphique (PDF et PNG)
+        'export_png': True,
+        'export_dir': GRAPHS_DIR / "apercu",  # ne remplace pas les PNG de publication
+        'style': 'fast',
+        'report_chart_size': (3.5, 2.4),
+        'draft_report': True
+    }
 }
 
 # Seuils d'analyse
 THRESHOLDS = {
     'water_consumption_high': 16250,  # m³/ha
     'pesticide_exposure_risk': 50,    # échelle 1-100
+    'pesticide_exposure_medium': 20,  # échelle 1-100
     'soil_erosion_severe': 3,         # échelle 1-5
-    'biodiversity_impact_high': 0.7   # proportion
+    'biodiversity_impact_high': 0.7,  # proportion
+    'protection_insufficient': 0.7    # Protection_factor (1 = aucune protection)
+}
+
+# Facteur de protection par équipement déclaré (1 = aucune protection)
+PROTECTION_WEIGHTS = {
+    'habit_lourd': 0.5,
+    'Voile': 0.7,
+    'Négligeable': 1.0,
+    'neant': 1.0
+}
+DEFAULT_PROTECTION_WEIGHT = 1.0   # équipement non reconnu ou non renseigné
+
+# Analyse de sensibilité du score d'exposition (indices de Sobol)
+SENSITIVITY_CONFIG = {
+    'n_base_samples': 1024,           # échantillons de base (évaluations = n x (d + 2))
+    'weight_perturbation': 0.3,       # variation relative des facteurs de protection
+    'canal_weight_range': (0.5, 1.5), # contribution du score de présence dans les canaux
+    'batch_size': 512,                # jeux de paramètres évalués par produit matriciel
+    'n_jobs': 1,                      # > 1 : répartition des lots sur un pool de processus
+    'seed': 42
+}
+
+# Associations entre questions catégorielles (V de Cramér, information mutuelle)
+ASSOCIATION_CONFIG = {
+    'max_categories': 15,             # au-delà, la question est considérée comme texte libre
+    'min_answers': 10,                # réponses minimales pour retenir une question
+    'include_select_multiple': True,  # combinaisons des choix multiples (colonnes Bitset_*)
+    'max_block_bytes': 256 * 1024**2, # mémoire d'un bloc de codage disjonctif (observations x modalités)
+    'n_jobs': 1,                      # > 1 : répartition des lots sur un pool de processus
+    'top_pairs': 15,
+    'exclude_columns': [
+        # métadonnées, identité et suivi de l'enquête
+        'deviceid', 'username', 'phonenumber', "Nom de l'enqueteur", "fiche d'enquete numero", 'Nom et Prenom',
+        'Telephone', 'souhaitez vous recevoir les resultats de cette enquete?', 'peut on vous recontacter pour un complément',
+        # recodages et variables dérivées des questions (associations triviales)
+        'Age_clean', 'Age_group', 'Education_level', 'Soil_erosion_score', 'Uses_pesticides', 'Protection_factor',
+        'Pesticide_exposure_score', 'Water_consumption_m3', 'Deforestation_mentioned', 'Biodiversity_impact'
+    ]
+}
+
+# Tests de permutation des corrélations socio-démographiques
+PERMUTATION_CONFIG = {
+    'n_permutations': 9999,           # p-value de résolution 1/(n+1)
+    'max_chunk_bytes': 64 * 1024**2,  # mémoire d'un lot de permutations (permutations x observations)
+    'n_jobs': 1,                      # > 1 : répartition des lots sur un pool de processus
+    'seed': 42
+}
+
+# Balayage facteurs socio-démographiques x indicateurs (correction FDR de Benjamini-Hochberg)
+SOCIODEMOGRAPHIC_SCAN_CONFIG = {
+    'factors': {
+        'sexe': 'Sexe',
+        'ethnie': 'Ethnie',
+        'statut_migratoire': 'Statut migratoire',
+        'organisation': 'Appartenance à une organisation ou association de riziculteur',
+        'experience': 'Expérience en riziculture ',
+        'proprietaire': 'Propritaire',
+        'age': 'Age_group',
+        'education': "niveau d'instruction ",
+        'situation_matrimoniale': 'Situation matrimoniale'
+    },
+    'training_columns': [  # même question posée dans plusieurs versions du formulaire
+        "avez vous suivi une formation sur l'utilisation des produits chimiques",
+        "avez vous suivi une formation sur l'utilisation des produits chimiques.1",
+        "avez vous suivi une formation sur l'utilisation des produits agrochimiques"
+    ],
+    'child_labor_column': "Des enfants abandonnent ils  l'école pour venir travailler dans votre exploitation",
+    'min_answers': 5,   # observations minimales (renseignées pour le facteur et l'indicateur) par test
+    'fdr_alpha': 0.05,
+    'top_n': 10
+}
+
+# Modèle de risque par agriculteur (régression logistique L2)
+RISK_MODEL_CONFIG = {
+    'target': 'incident',   # 'incident' (accident/intoxication rapporté) ou 'high_risk_rule' (règle fixe)
+    'incident_columns': [
+        "pouvez vous raconter un cas d'accident ou d'intoxication lie à l'usage des produits chimiques? ",
+        "pouvez vous raconter un cas d'accident ou d'intoxication lie à l'usage des produits chimiques? .1"
+    ],
+    # Réponses normalisées (minuscules, sans accents); ni positive ni négative -> non renseignée
+    'negative_answer_pattern': r'^(non|neant|pas de cas|rien|aucun)\b',
+    'positive_answer_pattern': r'^oui\b|\b(intoxi\w*|accident\w*|mort\w*|deces|decede\w*|tue\w*|suicide\w*|malad\w*|brul\w*|cancer\w*|maux|mal de|toux|vomi\w*|cas)\b',
+    'numeric_features': {
+        'education': 'Education_level',
+        'age': 'Age_clean',
+        'protection': 'Protection_factor',
+        'exposition': 'Pesticide_exposure_score',
+        'pesticides': 'Uses_pesticides',
+        'eau': 'Water_consumption_m3',
+        'superficie': 'Superficie cultivée en Hivernage'
+    },
+    'categorical_features': {
+        'sexe': 'Sexe',
+        'statut_migratoire': 'Statut migratoire',
+        'organisation': 'Appartenance à une organisation ou association de riziculteur',
+        'experience': 'Expérience en riziculture ',
+        'formation': SOCIODEMOGRAPHIC_SCAN_CONFIG['training_columns']
+    },
+    'min_level_count': 3,          # modalités plus rares regroupées avec les inconnues
+    'l2': 1.0,                     # pénalité ridge (variables standardisées)
+    'cv_folds': 5,                 # validation croisée stratifiée pour l'AUC rapportée
+    'seed': 42,
+    'max_iter': 500,
+    'high_risk_threshold': 0.5,
+    'model_file': DATA_DIR / "risk_model.pkl",
+    'export_file': "risque_agriculteurs.csv"   # dans REPORTS_DIR, à côté des recommandations
+}
+
+# Recommandations personnalisées : toutes les conditions ('when') doivent être vraies.
+# Une condition est le nom d'une pratique de HARMFUL_PRACTICES ou une règle de même syntaxe.
+RECOMMENDATION_RULES = {
+    'equipement_protection': {
+        'when': ['pesticides_chimiques', 'pas_de_protection'],
+        'priority': 1, 'category': 'santé',
+        'message': "S'équiper d'EPI complets (masque, gants, combinaison) pour chaque traitement"
+    },
+    'gestion_contenants': {
+        'when': ['brulage_dechets'],
+        'priority': 1, 'category': 'environnement',
+        'message': "Ne plus brûler les contenants vides : les rincer et les rapporter au point de collecte"
+    },
+    'travail_enfants': {
+        'when': [{'column': "Des enfants abandonnent ils  l'école pour venir travailler dans votre exploitation",
+                  'operator': 'contains', 'pattern': r'^\s*oui'}],
+        'priority': 1, 'category': 'social',
+        'message': "Maintenir les enfants à l'école et les tenir éloignés des traitements"
+    },
+    'formation_pesticides': {
+        'when': ['pesticides_chimiques',
+                 {'column': SOCIODEMOGRAPHIC_SCAN_CONFIG['training_columns'],   # toutes les versions de la question
+                  'operator': 'contains', 'pattern': r'^\s*non'}],
+        'priority': 2, 'category': 'santé',
+        'message': "Suivre une formation sur l'utilisation sécurisée des produits phytosanitaires"
+    },
+    'irrigation_econome': {
+        'when': ['surconsommation_eau'],
+        'priority': 2, 'category': 'eau',
+        'message': "Adopter des techniques d'irrigation économes (SRI, planage, gestion des tours d'eau)"
+    },
+    'accompagnement_jeunes': {
+        'when': ['pesticides_chimiques', {'column': 'Age_clean', 'operator': '<', 'value': 35}],
+        'priority': 2, 'category': 'santé',
+        'message': "Bénéficier d'un accompagnement de proximité pour les premiers traitements"
+    },
+    'rotation_cultures': {
+        'when': ['pas_de_rotation'],
+        'priority': 3, 'category': 'sols',
+        'message': "Introduire une rotation des cultures pour préserver la fertilité des sols"
+    },
+    'fertilisation_organique': {
+        'when': ['engrais_chimiques'],
+        'priority': 3, 'category': 'sols',
+        'message': "Compléter ou remplacer les engrais chimiques par du compost ou de la fumure organique"
+    }
+}
+
+RECOMMENDATION_CONFIG = {
+    'max_per_farmer': 5,
+    'id_columns': {'_uuid': 'uuid', 'village': 'village', 'commune': 'commune', 'Nom et Prenom': 'agriculteur'},
+    'export_file': "recommandations_agriculteurs.csv"
+}
+
+# Rapports PDF par groupe (village, commune, coopérative...)
+BATCH_REPORT_CONFIG = {
+    'group_by': 'village',          # colonne de regroupement
+    'min_farmers': 1,               # groupes plus petits ignorés
+    'n_jobs': 1,                    # > 1 : documents répartis sur un pool de processus
+    'chart_dpi': 100,               # graphiques rendus en mémoire pour chaque document
+    'output_dir': REPORTS_DIR / "par_groupe"
+}
+
+# Petits multiples : un panneau par village, commune ou enquêteur ("Nom de l'enqueteur")
+SMALL_MULTIPLES_CONFIG = {
+    'group_by': 'village',
+    'rows': 4,                      # panneaux par planche : rows x cols
+    'cols': 5,
+    'panel_size': (2.6, 2.0),       # pouces
+    'dpi': 100,
+    'min_farmers': 1,
+    'export_panels': False,         # en plus des planches, un PNG par panneau (découpé dans la planche)
+    'output_dir': GRAPHS_DIR / "petits_multiples"
+}
+
+# Tableau de bord HTML autonome (agrégats pré-calculés, filtrage dans le navigateur)
+DASHBOARD_CONFIG = {
+    'dimensions': {'Village': 'village', 'Commune': 'commune', "Tranche d'âge": 'Age_group'},  # libellé -> colonne
+    'decimals': 3,                  # arrondi des sommes sérialisées
+    'output_file': "tableau_de_bord.html"
+}
+
+# Tranches de consommation d'eau déclarées (m³/ha) : bornes (min, max) par réponse
+# (le centre de chaque tranche sert d'estimation ponctuelle)
+WATER_CONSUMPTION_BUCKETS = {
+    '<10000m3': (6000, 10000),
+    '10000-13000m3': (10000, 13000),
+    '13001-16250m3': (13000, 16250),
+    '>16250m3': (16250, 23750)
+}
+
+# Estimation Monte Carlo des volumes d'eau
+MONTE_CARLO_CONFIG = {
+    'n_draws': 10000,
+    'max_chunk_bytes': 256 * 1024**2,   # mémoire maximale d'un bloc (exploitations x tirages)
+    'seed': 42,
+    'interval': (5, 95)                 # percentiles de l'intervalle rapporté
+}
+
+# Balayage des seuils (what-if): règle évaluée et grille (début, fin, nombre de points).
+# La règle est le nom d'une pratique de HARMFUL_PRACTICES (colonne et opérateur partagés)
+# ou une règle de même syntaxe pour les seuils qui ne définissent pas de pratique
+THRESHOLD_SWEEPS = {
+    'water_consumption_high': {
+        'rule': 'surconsommation_eau',
+        'grid': (8000, 24000, 33),
+        'label': "Surconsommation d'eau (%)"
+    },
+    'pesticide_exposure_risk': {
+        'rule': {'column': 'Pesticide_exposure_score', 'operator': '>', 'threshold': 'pesticide_exposure_risk'},
+        'grid': (0, 100, 51),
+        'label': "Exposition élevée aux pesticides (%)"
+    },
+    'protection_insufficient': {
+        'rule': 'pas_de_protection',
+        'grid': (0.3, 1.0, 15),
+        'label': "Protection insuffisante (%)"
+    }
+}
+
+# Pratiques agricoles nuisibles (règles déclaratives)
+# operator: '>', '>=', '<', '<=', '==', '!=' ou 'contains' (motif regex, insensible à la casse)
+# threshold: clé de THRESHOLDS, value: valeur littérale
+# inverse: compte les réponses renseignées pour lesquelles la condition est fausse
+HARMFUL_PRACTICES = {
+    'pesticides_chimiques': {
+        'column': 'quels sont  les intrants  et  fertilisants que vous recevez ou utilisez/Herbicide',
+        'operator': '>', 'value': 0,
+        'description': "Utilisation d'herbicides chimiques",
+        'impact': "Pollution des sols et de l'eau, risques sanitaires"
+    },
+    'engrais_chimiques': {
+        'column': 'quels sont  les intrants  et  fertilisants que vous recevez ou utilisez/engrais chimiques(uree, NPk...)',
+        'operator': '>', 'value': 0,
+        'description': "Utilisation d'engrais chimiques (urée, NPK)",
+        'impact': "Eutrophisation, pollution des nappes phréatiques"
+    },
+    'brulage_dechets': {
+        'column': 'que faites vous des contenants vides de produits agrochimiques (sacs, bidons) après usage',
+        'operator': 'contains', 'pattern': 'brûl',
+        'description': "Brûlage des contenants de produits chimiques",
+        'impact': "Pollution atmosphérique, émission de dioxines"
+    },
+    'pas_de_protection': {
+        'column': 'Protection_factor',
+        'operator': '>=', 'threshold': 'protection_insufficient',
+        'description': "Absence ou insuffisance d'équipements de protection",
+        'impact': "Exposition directe aux produits toxiques"
+    },
+    'surconsommation_eau': {
+        'column': 'Water_consumption_m3',
+        'operator': '>', 'threshold': 'water_consumption_high',
+        'description': "Surconsommation d'eau (>{threshold:.0f} m³/ha)",
+        'impact': "Épuisement des ressources hydriques"
+    },
+    'pas_de_rotation': {
+        'column': "utilisez vous des pratiques pour limiter l'impact de la riziculture sur l'environnement en adoptant ces mesures/rotation ",
+        'operator': '>', 'value': 0, 'inverse': True,
+        'description': "Absence de rotation des cultures",
+        'impact': "Épuisement des sols, prolifération des ravageurs"
+    }
+}
+
+# Magasin de variables dérivées (calcul paresseux, cache disque optionnel)
+FEATURE_STORE_CONFIG = {
+    'disk_cache': False,
+    'cache_dir': CACHE_DIR / "features"
+}
+
+# Réponses libres interrogées par les analyses d'impact et de santé
+BIODIVERSITY_TEXT_COLUMN = "depuis l'installation de la rizière, avez vous constaté une diminution, une prolifération ou une disparition des espèces végétales ou animale"
+SYMPTOM_TEXT_COLUMN = 'comment ca se manifeste'
+DEFORESTATION_TEXT_COLUMNS = [
+    BIODIVERSITY_TEXT_COLUMN,
+    SYMPTOM_TEXT_COLUMN,
+    "Avez vous beneficié d'une extention de vos surfaces rizicoles, si oui expliquez"
+]
+
+# Questions ouvertes sur la faune et la flore (les colonnes absentes de l'export sont ignorées)
+BIODIVERSITY_QUESTION_COLUMNS = [
+    BIODIVERSITY_TEXT_COLUMN,
+    'Quels sont les changements que vous  avez remarqué dans la faune locale(oiseaux, poissons, insectes)',
+    'avez vous remarque des changements dans la faune locale( oiseaux, poissons, insectes)',
+    'quelles sont vos observations par rapport a la vegetation naturelle(disparition, remplacement, nouvelles especes) depuis le debut des activite agricole'
+]
+
+# Index inversé des réponses libres
+TEXT_INDEX_CONFIG = {
+    'columns': None,            # None = détection automatique des colonnes de texte libre
+    'required_columns': DEFORESTATION_TEXT_COLUMNS,   # indexées même si la détection les écarte
+    'min_words': 1.5,           # nombre moyen de mots minimal pour la détection
+    'exclude_columns': [        # identité, localisation et variables dérivées
+        'start-geopoint', 'phonenumber', "Nom de l'enqueteur", 'Cordonnées GPS', 'Nom et Prenom', 'Age_group'
+    ],
+    'bm25_k1': 1.2,
+    'bm25_b': 0.75,
+    'index_file': DATA_DIR / "text_index.pkl"   # à côté de cleaned_data.csv
+}
+
+# Regroupement automatique des réponses libres (TF-IDF + k-means par mini-lots)
+TEXT_CLUSTERING_CONFIG = {
+    'columns': {
+        'symptomes': SYMPTOM_TEXT_COLUMN,
+        'dechets': 'que faites vous des contenants vides de produits agrochimiques (sacs, bidons) après usage',
+        'biodiversite': BIODIVERSITY_TEXT_COLUMN,
+        'impacts_negatifs': 'quelles sont les impacts environnementaux et sociaux négatifs de la riziculture dans votre zone'
+    },
+    'n_clusters': 6,
+    'min_df': 2,                # nombre minimal de réponses contenant un terme
+    'max_df': 0.5,              # proportion maximale (termes trop fréquents ignorés)
+    'batch_size': 1024,
+    'n_iter': 100,              # nombre de mini-lots
+    'top_terms': 5,             # mots-clés proposés par catégorie
+    'seed': 42,
+    'stop_words': [
+        'a', 'au', 'aux', 'avec', 'ca', 'ce', 'ces', 'd', 'dans', 'de', 'des', 'du', 'elle', 'en', 'est',
+        'et', 'il', 'ils', 'l', 'la', 'le', 'les', 'leur', 'mais', 'n', 'ne', 'nous', 'on', 'ou', 'par',
+        'pas', 'plus', 'pour', 'qu', 'que', 'qui', 's', 'sa', 'se', 'ses', 'son', 'sont', 'sur', 'tres',
+        'un', 'une', 'y', 'oui', 'vous', 'ont', 'c', 'j', 'm', 't'
+    ]
+}
+
+# Liste canonique des produits phytosanitaires (nom -> variantes connues)
+PESTICIDE_PRODUCTS = {
+    'weedone': ['windone', 'widone', 'window', 'windows'],
+    'propanil': [],
+    'londox': ['londax'],
+    'rubus': [],
+    'clache': ['clage']
+}
+
+# Rapprochement approximatif des noms de produits (n-grammes de caractères)
+PRODUCT_MATCHING_CONFIG = {
+    'ngram_size': 3,
+    'min_similarity': 0.5,      # coefficient de Dice minimal sur les n-grammes
+    'min_length': 3,            # mots plus courts ignorés
+    'stop_words': ['et', 'ou', 'avec', 'autre', 'autres']
+}
+
+# Questions à choix multiples Kobo (colonne parente -> colonnes "parente/option")
+SELECT_MULTIPLE_GROUPS = {
+    'pesticides': 'quels sont les pesticides que vous  utiliser',
+    'intrants': 'quels sont  les intrants  et  fertilisants que vous recevez ou utilisez',
+    'irrigation': "les types d'irrigation utilisée ",
+    'water_sources': "origine de l'eau ",
+    'energy': "Types d'energie pour l'irrigation pour ",
+    'climate_change': 'comment se manifeste les changements climatiques dans votre zone'
+}
+
+# Analyse temporelle (fenêtres sur _submission_time)
+TREND_CONFIG = {
+    'time_column': '_submission_time',
+    'frequency': 'D',           # pas de rééchantillonnage (règle pandas)
+    'rolling_windows': 7,       # nombre de fenêtres pour la moyenne glissante
+    'refresh_windows': 2,       # fenêtres recalculées à chaque rafraîchissement
+    'cache_file': 'trend_windows.pkl'
 }
 
 # Catégories d'analyse
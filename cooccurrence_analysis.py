@@ -0,0 +1,131 @@
+"""
+Analyse des co-occurrences dans les questions à choix multiples
+"""
+import pandas as pd
+import numpy as np
+from config import SELECT_MULTIPLE_GROUPS, THRESHOLDS
+from data_loader import get_select_multiple_options, unpack_bitset
+
+def option_labels(df, group):
+    """Libellés courts des options d'un groupe (partie après le '/')"""
+    return [col.split('/', 1)[-1].strip() for col in get_select_multiple_options(df, group)]
+
+def compute_cooccurrence(bits, n_options, mask=None):
+    """Calcule les co-occurrences et le lift de toutes les paires d'options
+
+    Un seul produit matriciel X^T X donne tous les comptes de co-usage;
+    la diagonale contient le support de chaque option.
+    """
+    indicators = unpack_bitset(bits, n_options)
+    if mask is not None:
+        indicators = indicators[np.asarray(mask, dtype=bool)]
+
+    x = indicators.astype(np.float64)
+    counts = x.T @ x
+    n_rows = len(x)
+
+    support = np.diag(counts)
+    expected = np.outer(support, support) / n_rows if n_rows > 0 else np.zeros_like(counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lift = np.where(expected > 0, counts / expected, np.nan)
+
+    return counts.astype(np.int64), lift, n_rows
+
+def combination_counts(bits, labels, mask=None):
+    """Compte les combinaisons exactes d'options (un bitset = une combinaison)"""
+    bits = np.asarray(bits, dtype=np.int64)
+    if mask is not None:
+        bits = bits[np.asarray(mask, dtype=bool)]
+
+    values, counts = np.unique(bits, return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    decoded = unpack_bitset(values[order], len(labels))
+
+    return {
+        ' + '.join(label for label, used in zip(labels, row) if used) or 'aucun': int(count)
+        for row, count in zip(decoded, counts[order])
+    }
+
+def respondent_mask(df, group, mask=None):
+    """Agriculteurs ayant répondu à la question (bitset 0 ambigu : aucune option ou sans réponse)"""
+    respondents = df[get_select_multiple_options(df, group)].notna().any(axis=1).to_numpy()
+    return respondents if mask is None else respondents & np.asarray(mask, dtype=bool)
+
+def analyze_group_cooccurrence(df, group, mask=None, min_support=2, top_n=10):
+    """Analyse les co-usages d'un groupe parmi les répondants, éventuellement restreints à un sous-ensemble"""
+
+    labels = option_labels(df, group)
+    mask = respondent_mask(df, group, mask)
+    counts, lift, n_rows = compute_cooccurrence(df[f'Bitset_{group}'], len(labels), mask)
+
+    # Paires (i < j) classées par lift, avec un support minimal
+    i_idx, j_idx = np.triu_indices(len(labels), k=1)
+    pair_counts = counts[i_idx, j_idx]
+    keep = pair_counts >= min_support
+    i_idx, j_idx, pair_counts = i_idx[keep], j_idx[keep], pair_counts[keep]
+    pair_lift = lift[i_idx, j_idx]
+    order = np.lexsort((-pair_counts, -np.nan_to_num(pair_lift)))[:top_n]
+
+    top_pairs = [
+        {
+            'pair': (labels[i_idx[k]], labels[j_idx[k]]),
+            'count': int(pair_counts[k]),
+            'lift': float(pair_lift[k])
+        }
+        for k in order
+    ]
+
+    return {
+        'options': labels,
+        'sample_size': n_rows,
+        'counts': pd.DataFrame(counts, index=labels, columns=labels),
+        'lift': pd.DataFrame(lift, index=labels, columns=labels),
+        'top_pairs': top_pairs,
+        'combinations': combination_counts(df[f'Bitset_{group}'], labels, mask)
+    }
+
+def generate_cooccurrence_report(df):
+    """Génère le rapport de co-occurrence pour tous les groupes à choix multiples"""
+
+    print("Analyse des co-occurrences des choix multiples...")
+
+    groups = {
+        group: analyze_group_cooccurrence(df, group)
+        for group in SELECT_MULTIPLE_GROUPS
+        if f'Bitset_{group}' in df.columns and option_labels(df, group)
+    }
+
+    # Combinaisons de pesticides chez les agriculteurs sans protection suffisante
+    no_protection = None
+    if 'pesticides' in groups and 'Protection_factor' in df.columns:
+        no_protection = analyze_group_cooccurrence(
+            df, 'pesticides', mask=df['Protection_factor'] >= THRESHOLDS['protection_insufficient'])
+
+    report = {
+        'groups': groups,
+        'pesticides_without_protection': no_protection,
+        'summary': {
+            'groups_analyzed': len(groups),
+            'main_pesticide_combination': next(iter(groups['pesticides']['combinations']), 'N/A') if 'pesticides' in groups else 'N/A'
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DES CO-OCCURRENCES ===")
+    for group, data in groups.items():
+        if data['top_pairs']:
+            best = data['top_pairs'][0]
+            print(f"   - {group}: {best['pair'][0]} + {best['pair'][1]} (n={best['count']}, lift={best['lift']:.2f})")
+    if no_protection is not None:
+        print(f"\nCombinaisons de pesticides sans protection ({no_protection['sample_size']} agriculteurs):")
+        for combo, count in list(no_protection['combinations'].items())[:3]:
+            print(f"   - {combo}: {count}")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_cooccurrence_report(df)
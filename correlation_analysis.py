@@ -4,6 +4,9 @@ Analyse des corrélations entre facteurs socio-démographiques et exposition aux
 import pandas as pd
 import numpy as np
 from scipy import stats
+from permutation_tests import permutation_test
+from config import SOCIODEMOGRAPHIC_SCAN_CONFIG, THRESHOLDS
+from data_loader import first_answer
 
 def analyze_education_correlation(df):
     """Analyse la corrélation entre niveau d'éducation et exposition aux pesticides"""
@@ -25,8 +28,11 @@ def analyze_education_correlation(df):
     
     if len(education_groups) > 1:
         f_stat, p_value = stats.f_oneway(*education_groups)
+        education_mask = df['niveau d\'instruction '].notna() & df['Pesticide_exposure_score'].notna()
+        levels, _ = pd.factorize(df.loc[education_mask, 'niveau d\'instruction '])
+        _, permutation_p = permutation_test('anova', df.loc[education_mask, 'Pesticide_exposure_score'], levels)
     else:
-        f_stat, p_value = np.nan, np.nan
+        f_stat, p_value, permutation_p = np.nan, np.nan, np.nan
     
     # Analyser les pratiques par niveau d'éducation
     education_practices = {}
@@ -45,7 +51,9 @@ def analyze_education_correlation(df):
         'correlation_stats': {
             'f_statistic': f_stat,
             'p_value': p_value,
-            'significant': p_value < 0.05 if not np.isnan(p_value) else False
+            'significant': p_value < 0.05 if not np.isnan(p_value) else False,
+            'permutation_p_value': permutation_p,
+            'permutation_significant': permutation_p < 0.05 if not np.isnan(permutation_p) else False
         },
         'by_education_level': education_practices,
         'trend': 'negative' if df['Education_level'].corr(df['Pesticide_exposure_score']) < 0 else 'positive'
@@ -70,8 +78,9 @@ def analyze_age_correlation(df):
             df[age_mask]['Age_clean'], 
             df[age_mask]['Pesticide_exposure_score']
         )
+        _, permutation_p = permutation_test('pearson', df.loc[age_mask, 'Age_clean'], df.loc[age_mask, 'Pesticide_exposure_score'])
     else:
-        correlation, p_value = np.nan, np.nan
+        correlation, p_value, permutation_p = np.nan, np.nan, np.nan
     
     # Analyser les pratiques par groupe d'âge
     age_practices = {}
@@ -92,7 +101,9 @@ def analyze_age_correlation(df):
         'correlation_stats': {
             'pearson_r': correlation,
             'p_value': p_value,
-            'significant': p_value < 0.05 if not np.isnan(p_value) else False
+            'significant': p_value < 0.05 if not np.isnan(p_value) else False,
+            'permutation_p_value': permutation_p,
+            'permutation_significant': permutation_p < 0.05 if not np.isnan(permutation_p) else False
         },
         'by_age_group': age_practices,
         'by_experience': experience_exposure.to_dict('index')
@@ -117,8 +128,11 @@ def analyze_marital_status_correlation(df):
     
     if len(married) > 0 and len(not_married) > 0:
         t_stat, p_value = stats.ttest_ind(married, not_married)
+        score_mask = df['Pesticide_exposure_score'].notna()
+        _, permutation_p = permutation_test('ttest', df.loc[score_mask, 'Pesticide_exposure_score'],
+                                            df.loc[score_mask, 'Situation matrimoniale'] == 'marié.e')
     else:
-        t_stat, p_value = np.nan, np.nan
+        t_stat, p_value, permutation_p = np.nan, np.nan, np.nan
     
     # Analyser les responsabilités familiales
     marital_practices = {}
@@ -138,7 +152,9 @@ def analyze_marital_status_correlation(df):
         'correlation_stats': {
             't_statistic': t_stat,
             'p_value': p_value,
-            'significant': p_value < 0.05 if not np.isnan(p_value) else False
+            'significant': p_value < 0.05 if not np.isnan(p_value) else False,
+            'permutation_p_value': permutation_p,
+            'permutation_significant': permutation_p < 0.05 if not np.isnan(permutation_p) else False
         },
         'by_marital_status': marital_practices
     }
@@ -157,8 +173,8 @@ def analyze_combined_factors(df):
     
     # Identifier les profils à risque
     high_risk_profile = df[
-        (df['Pesticide_exposure_score'] > 50) & 
-        (df['Protection_factor'] >= 0.7)
+        (df['Pesticide_exposure_score'] > THRESHOLDS['pesticide_exposure_risk']) & 
+        (df['Protection_factor'] >= THRESHOLDS['protection_insufficient'])
     ]
     
     risk_profile_stats = {
@@ -192,6 +208,116 @@ def analyze_combined_factors(df):
     
     return results
 
+def build_scan_outcomes(df):
+    """Indicateurs de résultat du balayage (NaN = non renseigné)
+
+    Les indicateurs binaires valent 0/1; l'exposition et le facteur de
+    protection restent continus.
+    """
+    training = first_answer(df, SOCIODEMOGRAPHIC_SCAN_CONFIG['training_columns'])
+    child_labor = df.get(SOCIODEMOGRAPHIC_SCAN_CONFIG['child_labor_column'], pd.Series(np.nan, index=df.index))
+
+    def binary(condition, answered):
+        return condition.astype(float).where(answered)
+
+    return pd.DataFrame({
+        'exposition': df['Pesticide_exposure_score'],
+        'protection': df['Protection_factor'],
+        'formation': binary(training == 'oui', training.notna()),
+        'surconsommation_eau': binary(df['Water_consumption_m3'] > THRESHOLDS['water_consumption_high'], df['Water_consumption_m3'].notna()),
+        'travail_enfants': binary(child_labor == 'oui', child_labor.notna())
+    }, index=df.index)
+
+def group_aggregates(df, factors, outcomes):
+    """Effectifs, sommes et sommes des carrés de chaque indicateur par modalité de chaque facteur
+
+    Toutes les modalités de tous les facteurs sont codées dans une seule
+    matrice disjonctive G; un unique produit G^T [M, Y, Y²] (M = masque des
+    valeurs renseignées) donne les agrégats de toutes les paires.
+    """
+    codes, offsets = [], [0]
+    for col in factors.values():
+        factor_codes, uniques = pd.factorize(df[col]) if col in df.columns else (np.full(len(df), -1), [])
+        codes.append(factor_codes)
+        offsets.append(offsets[-1] + len(uniques))
+
+    design = np.zeros((len(df), offsets[-1]))
+    for factor_codes, offset in zip(codes, offsets):
+        answered = np.flatnonzero(factor_codes >= 0)
+        design[answered, offset + factor_codes[answered]] = 1
+
+    values = outcomes.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    values = np.where(mask, values, 0)
+    counts, sums, squares = np.split(design.T @ np.hstack([mask, values, values ** 2]), 3, axis=1)
+    return counts, sums, squares, np.array(offsets)
+
+def scan_tests(counts, sums, squares, offsets, binary):
+    """Tests d'association de toutes les paires (facteur x indicateur) à partir des agrégats
+
+    Indicateur continu : ANOVA à un facteur (F). Indicateur binaire : khi-deux
+    d'indépendance, égal à N x SSB / SST. L'effet est mesuré par l'eta².
+    """
+    starts, factor_ids = offsets[:-1], np.arange(len(offsets) - 1)
+    nonempty = offsets[1:] > starts
+    starts, factor_ids = starts[nonempty], factor_ids[nonempty]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        level_ss = np.where(counts > 0, sums ** 2 / counts, 0)
+
+    def per_factor(matrix):
+        return np.add.reduceat(matrix, starts, axis=0)
+
+    n = per_factor(counts)
+    k = per_factor((counts > 0).astype(float))
+    total_sum = per_factor(sums)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_ss = per_factor(squares) - total_sum ** 2 / n
+        between_ss = per_factor(level_ss) - total_sum ** 2 / n
+        eta_squared = np.clip(between_ss / total_ss, 0, 1)
+
+        f_stat = (between_ss / (k - 1)) / (np.maximum(total_ss - between_ss, 0) / (n - k))
+        chi2 = n * eta_squared
+        statistic = np.where(binary, chi2, f_stat)
+        p_value = np.where(binary, stats.chi2.sf(chi2, k - 1), stats.f.sf(f_stat, k - 1, n - k))
+
+    testable = (n >= SOCIODEMOGRAPHIC_SCAN_CONFIG['min_answers']) & (k >= 2) & (total_ss > 1e-12)
+    p_value = np.where(testable, p_value, np.nan)
+    return factor_ids, n, k, statistic, p_value, eta_squared
+
+def benjamini_hochberg(p_values):
+    """q-values de Benjamini-Hochberg (les tests non réalisables restent NaN)"""
+    q_values = np.full(len(p_values), np.nan)
+    tested = ~np.isnan(p_values)
+    if tested.any():
+        q_values[tested] = stats.false_discovery_control(p_values[tested], method='bh')
+    return q_values
+
+def scan_sociodemographic_factors(df):
+    """Teste chaque facteur socio-démographique contre chaque indicateur, tableau classé par q-value"""
+    factors = SOCIODEMOGRAPHIC_SCAN_CONFIG['factors']
+    outcomes = build_scan_outcomes(df)
+    binary = outcomes.apply(lambda s: s.dropna().isin([0, 1]).all()).to_numpy()
+
+    counts, sums, squares, offsets = group_aggregates(df, factors, outcomes)
+    factor_ids, n, k, statistic, p_value, eta_squared = scan_tests(counts, sums, squares, offsets, binary)
+
+    factor_names = np.array(list(factors))[factor_ids]
+    table = pd.DataFrame({
+        'factor': np.repeat(factor_names, outcomes.shape[1]),
+        'outcome': np.tile(outcomes.columns, len(factor_names)),
+        'test': np.tile(np.where(binary, 'chi2', 'anova'), len(factor_names)),
+        'n': n.ravel().astype(int),
+        'groups': k.ravel().astype(int),
+        'statistic': statistic.ravel(),
+        'p_value': p_value.ravel(),
+        'eta_squared': eta_squared.ravel()
+    })
+    table['q_value'] = benjamini_hochberg(table['p_value'].to_numpy())
+    table['significant'] = table['q_value'] < SOCIODEMOGRAPHIC_SCAN_CONFIG['fdr_alpha']
+
+    return table.sort_values(['q_value', 'p_value'], na_position='last', kind='stable').reset_index(drop=True)
+
 def generate_correlation_report(df):
     """Génère un rapport complet sur les corrélations"""
     
@@ -202,16 +328,20 @@ def generate_correlation_report(df):
     age_corr = analyze_age_correlation(df)
     marital_corr = analyze_marital_status_correlation(df)
     combined = analyze_combined_factors(df)
+    factor_scan = scan_sociodemographic_factors(df)
     
     report = {
         'education': education_corr,
         'age': age_corr,
         'marital_status': marital_corr,
         'combined_analysis': combined,
+        'factor_scan': factor_scan.to_dict('records'),
         'summary': {
             'significant_correlations': [],
             'high_risk_count': combined['high_risk_profile']['count'],
-            'main_risk_factors': []
+            'main_risk_factors': [],
+            'scan_tests': int(factor_scan['p_value'].notna().sum()),
+            'scan_significant': factor_scan.loc[factor_scan['significant'], ['factor', 'outcome']].apply(tuple, axis=1).tolist()
         }
     }
     
@@ -228,6 +358,7 @@ def generate_correlation_report(df):
     
     print(f"\n1. Corrélation avec le niveau d'éducation:")
     print(f"   - Significative: {'Oui' if education_corr['correlation_stats']['significant'] else 'Non'}")
+    print(f"   - p-value: {education_corr['correlation_stats']['p_value']:.4f} (permutation: {education_corr['correlation_stats']['permutation_p_value']:.4f})")
     
     # Déterminer le message de tendance
     if education_corr['trend'] == 'negative':
@@ -239,9 +370,11 @@ def generate_correlation_report(df):
     print(f"\n2. Corrélation avec l'âge:")
     print(f"   - Coefficient de corrélation: {age_corr['correlation_stats']['pearson_r']:.3f}")
     print(f"   - Significative: {'Oui' if age_corr['correlation_stats']['significant'] else 'Non'}")
+    print(f"   - p-value: {age_corr['correlation_stats']['p_value']:.4f} (permutation: {age_corr['correlation_stats']['permutation_p_value']:.4f})")
     
     print(f"\n3. Corrélation avec la situation matrimoniale:")
     print(f"   - Significative: {'Oui' if marital_corr['correlation_stats']['significant'] else 'Non'}")
+    print(f"   - p-value: {marital_corr['correlation_stats']['p_value']:.4f} (permutation: {marital_corr['correlation_stats']['permutation_p_value']:.4f})")
     
     print(f"\n4. Profils à risque:")
     print(f"   - Nombre d'agriculteurs à haut risque: {combined['high_risk_profile']['count']}")
@@ -250,7 +383,12 @@ def generate_correlation_report(df):
     else:
         print(f"   - Âge moyen: Non disponible")
     
-    print("\n5. Recommandations prioritaires:")
+    print(f"\n5. Balayage facteurs x indicateurs ({report['summary']['scan_tests']} tests, FDR {SOCIODEMOGRAPHIC_SCAN_CONFIG['fdr_alpha']:.0%}):")
+    for row in factor_scan.dropna(subset=['p_value']).head(SOCIODEMOGRAPHIC_SCAN_CONFIG['top_n']).itertuples():
+        print(f"   - {row.factor} x {row.outcome}: {row.test} = {row.statistic:.2f}, p = {row.p_value:.4f}, "
+              f"q = {row.q_value:.4f}, eta² = {row.eta_squared:.2f}{' ✓' if row.significant else ''}")
+    
+    print("\n6. Recommandations prioritaires:")
     for key, rec in combined['targeted_recommendations'].items():
         if rec['target']:
             print(f"   - {rec['message']}")
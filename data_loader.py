@@ -3,14 +3,316 @@ Module de chargement et nettoyage des données
 """
 import pandas as pd
 import numpy as np
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from config import DATA_DIR, DATA_FILE, EDUCATION_LEVELS, AGE_GROUPS
+from functools import lru_cache
+from pathlib import Path
+from config import (DATA_DIR, DATA_FILE, DATA_FILE_PATTERN, DATA_SOURCE, STORE_DIR, COLUMN_ALIASES, INGEST_CHUNK_SIZE,
+                    STORE_STATE_FILE, CSV_EXTENSIONS, JSON_EXTENSIONS,
+                    KOBO_CONFIG, GEOPOINT_COLUMNS, GEOPOINT_PARTS, COLUMN_TYPES, DATETIME_TEXT_PATTERN,
+                    EDUCATION_LEVELS, AGE_GROUPS, SELECT_MULTIPLE_GROUPS, WATER_CONSUMPTION_BUCKETS,
+                    PROTECTION_WEIGHTS, DEFAULT_PROTECTION_WEIGHT)
+from text_index import get_text_index
 
-def load_data():
-    """Charge les données depuis le fichier Excel"""
-    file_path = DATA_DIR / DATA_FILE
+def _xlsform_aliases(xlsform_path):
+    """Noms XML -> libellés depuis les feuilles 'survey' et 'choices' d'un XLSForm
+    
+    Les libellés répétés sont suffixés comme les en-têtes de l'export (".1", ".2"...);
+    les options des choix multiples donnent les colonnes "question/option".
+    """
+    sheets = pd.read_excel(xlsform_path, sheet_name=['survey', 'choices'], dtype=str)
+    survey, choices = sheets['survey'], sheets['choices']
+    label_col = next(col for col in survey.columns if str(col).startswith('label'))
+    choice_label_col = next(col for col in choices.columns if str(col).startswith('label'))
+    survey = survey[survey['name'].notna() & survey[label_col].notna()]
+    survey = survey[~survey['type'].fillna('').str.match(r'(begin|end)[ _]')]
+    
+    aliases, seen = {}, {}
+    for field_type, name, label in zip(survey['type'], survey['name'], survey[label_col]):
+        count = seen.get(label, 0)
+        seen[label] = count + 1
+        aliases[name] = label if count == 0 else f'{label}.{count}'
+        if field_type.startswith('select_multiple '):
+            options = choices[choices['list_name'] == field_type.split()[1]]
+            for option, option_label in zip(options['name'], options[choice_label_col]):
+                aliases[f'{name}/{option}'] = f'{label}/{option_label}' + (f'.{count}' if count else '')
+    return aliases
+
+@lru_cache(maxsize=None)
+def load_column_aliases():
+    """Correspondance noms de champs XML (API Kobo) -> libellés de l'export
+    
+    Source : XLSForm du formulaire s'il est présent, sinon la table versionnée
+    (kobo_sync.py --table-alias); COLUMN_ALIASES complète ou remplace l'ensemble.
+    """
+    xlsform_path = Path(KOBO_CONFIG['xlsform_file'])
+    aliases_path = Path(KOBO_CONFIG['aliases_file'])
+    if xlsform_path.exists():
+        aliases = _xlsform_aliases(xlsform_path)
+    elif aliases_path.exists():
+        table = pd.read_csv(aliases_path, dtype=str, keep_default_na=False, encoding='utf-8')
+        aliases = dict(zip(table['name'], table['label']))
+    else:
+        aliases = {}
+    aliases.update(COLUMN_ALIASES)
+    return aliases
+
+def _rename_api_fields(columns):
+    """Libellé de l'export pour chaque colonne livrée par l'API (chemins de groupe "groupe/champ" retirés)
+    
+    Certains noms XML sont aussi des libellés d'autres questions ('preciser') :
+    un lot dont les colonnes sont déjà des libellés (export) n'est pas renommé.
+    """
+    aliases = load_column_aliases()
+    labels = set(aliases.values())
+    names_only, labels_only = aliases.keys() - labels, labels - aliases.keys()
+    fields = [col.rsplit('/', 1)[-1] if isinstance(col, str) else col for col in columns]
+    if sum(field in names_only for field in fields) < sum(col in labels_only for col in columns):
+        return {col: COLUMN_ALIASES[col] for col in columns if col in COLUMN_ALIASES}
+    
+    renamed = {}
+    for col, field in zip(columns, fields):
+        if col in aliases:
+            renamed[col] = aliases[col]
+        elif field in aliases and col not in labels:
+            renamed[col] = aliases[field]   # question dans un groupe
+    return renamed
+
+def _select_multiple_options():
+    """Questions à choix multiples -> {nom XML de l'option: colonne "question/option" de l'export}"""
+    aliases = load_column_aliases()
+    options = {parent: {} for parent in SELECT_MULTIPLE_GROUPS.values()}
+    for name, label in aliases.items():
+        field, _, option = name.partition('/')
+        if option and field in aliases:
+            options.setdefault(aliases[field], {})[option] = label
+    return options
+
+def fill_select_multiple(df):
+    """Options non cochées (absentes d'un bloc ou d'un lot) = 0 pour les questions renseignées"""
+    for parent in _select_multiple_options():
+        dummy_cols = [col for col in df.columns if col.startswith(parent + '/')]
+        if parent in df.columns and dummy_cols:
+            df[dummy_cols] = df[dummy_cols].fillna(0).where(df[parent].notna(), axis=0)
+    return df
+
+def apply_column_types(df):
+    """Impose les types de COLUMN_TYPES, quel que soit le format ou le bloc lu"""
+    for col, kind in COLUMN_TYPES.items():
+        if col not in df.columns:
+            continue
+        if kind == 'datetime':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif kind == 'date_or_value':
+            # Cellules de date de l'export Excel : reconvertir les dates sérialisées
+            values = df[col].astype(object)
+            is_date = values.astype('string').str.match(DATETIME_TEXT_PATTERN).fillna(False).to_numpy(dtype=bool)
+            values[is_date] = [pd.Timestamp(value).to_pydatetime() for value in values[is_date]]
+            df[col] = values
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(kind)
+    return df
+
+def harmonize_columns(df):
+    """Aligne des soumissions (API, exports texte) sur les colonnes de l'export Excel"""
+    df = df.rename(columns=_rename_api_fields(df.columns))
+    
+    # Questions non renseignées : l'API omet le champ, l'export garde une colonne vide
+    questions = [label for name, label in load_column_aliases().items() if '/' not in name]
+    missing = [label for label in questions if label not in df.columns]
+    if missing:
+        df = pd.concat([df, pd.DataFrame(np.nan, index=df.index, columns=missing, dtype=object)], axis=1)
+    
+    # Choix multiples livrés sous forme "option1 option2" : créer les colonnes "question/option"
+    for parent, option_labels in _select_multiple_options().items():
+        if (parent not in df.columns or any(label in df.columns for label in option_labels.values())
+                or any(col.startswith(parent + '/') for col in df.columns)):
+            continue
+        answered = df[parent].notna()
+        dummies = df[parent].fillna('').astype(str).str.get_dummies(sep=' ')
+        # Ordre des options de l'export (ordre des bits des colonnes Bitset_*)
+        extra = [option for option in dummies.columns if option not in option_labels]
+        dummies = dummies.reindex(columns=list(option_labels) + extra, fill_value=0)
+        labels = [option_labels.get(option, f'{parent}/{option}') for option in dummies.columns]
+        # Réponse en libellés d'options, comme dans l'export
+        option_texts = pd.Series([label[len(parent) + 1:] for label in labels], index=dummies.columns)
+        df[parent] = dummies.dot(option_texts + ' ').str.strip().where(answered)
+        dummies.columns = labels
+        df = pd.concat([df, dummies.where(answered)], axis=1)
+    
+    # Points GPS livrés sous forme "latitude longitude altitude précision"
+    for col in GEOPOINT_COLUMNS:
+        split_cols = [f'_{col}_{part}' for part in GEOPOINT_PARTS]
+        if col not in df.columns or split_cols[0] in df.columns:
+            continue
+        parts = df[col].astype('string').str.split(' ', expand=True).reindex(columns=range(len(GEOPOINT_PARTS)))
+        for split_col, (_, values) in zip(split_cols, parts.items()):
+            df[split_col] = pd.to_numeric(values, errors='coerce')
+    
+    df = apply_column_types(df)
+    
+    return df
+
+def read_store_state(store_dir=None):
+    """Lit le filigrane (_id / _submission_time) du magasin de soumissions"""
+    state_path = (store_dir or STORE_DIR) / STORE_STATE_FILE
+    if not state_path.exists():
+        return {'last_id': 0, 'last_submission_time': None, 'segments': []}
+    with open(state_path, encoding='utf-8') as f:
+        return json.load(f)
+
+def append_to_store(df, store_dir=None):
+    """Ajoute un lot de soumissions au magasin et avance le filigrane
+    
+    Le segment est écrit avant l'état : une interruption entre les deux laisse
+    au pire un segment en double, éliminé au chargement par _id.
+    """
+    store_dir = store_dir or STORE_DIR
+    store_dir.mkdir(parents=True, exist_ok=True)
+    state = read_store_state(store_dir)
+    
+    segment_name = f"segment_{len(state['segments']):06d}.pkl"
+    tmp_path = store_dir / (segment_name + '.tmp')
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, store_dir / segment_name)
+    
+    state['segments'].append(segment_name)
+    if '_id' in df.columns and df['_id'].notna().any():
+        state['last_id'] = max(state['last_id'], int(df['_id'].max()))
+    if '_submission_time' in df.columns and df['_submission_time'].notna().any():
+        last_time = df['_submission_time'].max().isoformat()
+        state['last_submission_time'] = max(filter(None, [state['last_submission_time'], last_time]))
+    
+    tmp_state = store_dir / (STORE_STATE_FILE + '.tmp')
+    with open(tmp_state, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_state, store_dir / STORE_STATE_FILE)
+    
+    return state
+
+def load_store(store_dir=None):
+    """Charge toutes les soumissions du magasin (dédoublonnées par _id, options absentes d'un segment = 0)"""
+    store_dir = store_dir or STORE_DIR
+    segments = sorted(store_dir.glob('segment_*.pkl'))
+    if not segments:
+        raise FileNotFoundError(f"Aucun segment dans {store_dir} - lancer d'abord kobo_sync.py")
+    
+    df = _concat_harmonized([pd.read_pickle(path) for path in segments])
+    if '_id' in df.columns:
+        df = df.drop_duplicates(subset='_id', keep='last').sort_values('_id', kind='mergesort')
+    return df.reset_index(drop=True)
+
+def _sniff_separator(file_path):
+    """Détecte le séparateur d'un export CSV (Kobo utilise ';' par défaut)"""
+    with open(file_path, encoding='utf-8-sig') as f:
+        header = f.readline()
+    return ';' if header.count(';') > header.count(',') else ','
+
+def iter_export_chunks(file_path, chunksize=None):
+    """Lit un export CSV ou JSON (une soumission par ligne) bloc par bloc
+    
+    Chaque bloc est harmonisé indépendamment; la mémoire utilisée par
+    l'itération ne dépend que de la taille des blocs, pas de celle du fichier.
+    """
+    file_path = Path(file_path)
+    chunksize = chunksize or INGEST_CHUNK_SIZE
+    extension = file_path.suffix.lower()
+    
+    if extension in CSV_EXTENSIONS:
+        reader = pd.read_csv(file_path, sep=_sniff_separator(file_path), chunksize=chunksize,
+                             encoding='utf-8-sig', low_memory=False)
+    elif extension in JSON_EXTENSIONS:
+        reader = pd.read_json(file_path, lines=True, chunksize=chunksize, convert_dates=False)
+    else:
+        raise ValueError(f"Format non pris en charge pour la lecture en flux: {extension}")
+    
+    with reader:
+        for chunk in reader:
+            yield harmonize_columns(chunk)
+
+def _concat_harmonized(chunks):
+    """Assemble des blocs harmonisés (options absentes d'un bloc = 0)"""
+    return fill_select_multiple(pd.concat(chunks, ignore_index=True))
+
+def ingest_export_to_store(file_path, chunksize=None, store_dir=None):
+    """Verse un export volumineux dans le magasin, bloc par bloc (mémoire constante)"""
+    total = 0
+    for chunk in iter_export_chunks(file_path, chunksize):
+        append_to_store(chunk, store_dir)
+        total += len(chunk)
+    print(f"✓ {total} enregistrements ajoutés au magasin depuis {Path(file_path).name}")
+    return total
+
+def read_export(file_path, chunksize=None):
+    """Lit un export (Excel, CSV ou JSON par lignes) et harmonise ses colonnes
+    
+    Les blocs lus en flux sont assemblés en un seul tableau : la mémoire croît
+    avec le fichier. Pour un export volumineux, utiliser ingest_export_to_store
+    (mémoire bornée) puis analyser le magasin.
+    """
+    file_path = Path(file_path)
+    if file_path.suffix.lower() in CSV_EXTENSIONS | JSON_EXTENSIONS:
+        return _concat_harmonized(iter_export_chunks(file_path, chunksize))
+    return harmonize_columns(pd.read_excel(file_path))
+
+def _read_export_timed(file_path):
+    """Lit un export dans un processus de travail et mesure sa durée"""
+    start = time.perf_counter()
+    df = read_export(file_path)
+    return df, time.perf_counter() - start
+
+def load_all_exports(pattern=None, max_workers=None):
+    """Lit en parallèle tous les exports correspondant au motif et les fusionne
+    
+    Les colonnes des différentes versions du formulaire sont réunies, puis les
+    soumissions présentes dans plusieurs fichiers sont dédoublonnées par _uuid
+    (la plus récente est conservée); les lignes sans _uuid sont toutes gardées.
+    """
+    paths = sorted(DATA_DIR.glob(pattern or DATA_FILE_PATTERN))
+    if not paths:
+        raise FileNotFoundError(f"Aucun export ne correspond à {pattern or DATA_FILE_PATTERN} dans {DATA_DIR}")
+    
+    start = time.perf_counter()
+    if len(paths) == 1:
+        results = [_read_export_timed(paths[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_read_export_timed, paths))
+    
+    for path, (frame, elapsed) in zip(paths, results):
+        print(f"  - {path.name}: {len(frame)} enregistrements en {elapsed:.2f} s")
+    
+    df = _concat_harmonized([frame for frame, _ in results])
+    n_rows = len(df)
+    if '_uuid' in df.columns:
+        if '_submission_time' in df.columns:
+            df = df.sort_values('_submission_time', kind='mergesort', na_position='first')
+        df = df[df['_uuid'].isna() | ~df.duplicated('_uuid', keep='last')].sort_index().reset_index(drop=True)
+    
+    print(f"✓ {len(paths)} exports fusionnés en {time.perf_counter() - start:.2f} s "
+          f"({n_rows - len(df)} doublons _uuid supprimés)")
+    return df
+
+def load_data(source=None):
+    """Charge les données depuis un export (Excel, CSV, JSON) ou le magasin synchronisé
+    
+    source: 'store', 'file' (DATA_FILE), 'all' (DATA_FILE_PATTERN) ou chemin vers un export.
+    Le tableau complet est chargé en mémoire quelle que soit la source; seule
+    l'ingestion d'un export dans le magasin se fait à mémoire constante.
+    """
+    source = source or DATA_SOURCE
     try:
-        df = pd.read_excel(file_path)
+        if source == 'store':
+            df = load_store()
+        elif source == 'all':
+            df = load_all_exports()
+        elif source == 'file':
+            df = read_export(DATA_DIR / DATA_FILE)
+        else:
+            df = read_export(source if Path(source).is_absolute() else DATA_DIR / source)
         print(f"✓ Données chargées: {len(df)} enregistrements")
         return df
     except Exception as e:
@@ -57,12 +359,7 @@ def clean_education_data(df):
 
 def clean_water_data(df):
     """Nettoie les données de consommation d'eau"""
-    water_mapping = {
-        '<10000m3': 8000,
-        '10000-13000m3': 11500,
-        '13001-16250m3': 14625,
-        '>16250m3': 20000
-    }
+    water_mapping = {bucket: (low + high) / 2 for bucket, (low, high) in WATER_CONSUMPTION_BUCKETS.items()}
     
     df['Water_consumption_m3'] = df["Quantité d'eau utilisée/ha en cas de pompage"].map(water_mapping)
     df['Water_consumption_m3'].fillna(0, inplace=True)
@@ -86,15 +383,8 @@ def clean_pesticide_data(df):
         df['Pesticide_exposure_score'] += df['sur une echelle de 1 a 100 notez la présence des pesticides dans les canaux'].fillna(0)
     
     # Protection utilisée
-    protection_map = {
-        'habit_lourd': 0.5,
-        'Voile': 0.7,
-        'Négligeable': 1.0,
-        'neant': 1.0
-    }
-    
-    df['Protection_factor'] = df['quels equipements de protection utilisez vous lors de l\'application de pesticides ou d\'engrais?'].map(protection_map)
-    df['Protection_factor'].fillna(1.0, inplace=True)
+    df['Protection_factor'] = df['quels equipements de protection utilisez vous lors de l\'application de pesticides ou d\'engrais?'].map(PROTECTION_WEIGHTS)
+    df['Protection_factor'].fillna(DEFAULT_PROTECTION_WEIGHT, inplace=True)
     
     # Score final d'exposition
     df['Pesticide_exposure_score'] = df['Pesticide_exposure_score'] * df['Protection_factor']
@@ -128,12 +418,47 @@ def clean_environmental_data(df):
     
     return df
 
-def prepare_data():
+def get_select_multiple_options(df, group):
+    """Retourne les colonnes indicatrices d'un groupe à choix multiples (ordre des bits)"""
+    prefix = SELECT_MULTIPLE_GROUPS[group] + '/'
+    return [col for col in df.columns if col.startswith(prefix)]
+
+def first_answer(df, columns):
+    """Première réponse renseignée parmi plusieurs versions d'une même question"""
+    columns = [col for col in columns if col in df.columns]
+    if not columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    answers = df[columns[0]].astype(object)
+    for col in columns[1:]:   # colonne par colonne (bfill(axis=1) traite ligne par ligne)
+        answers = answers.where(answers.notna(), df[col].astype(object))
+    return answers
+
+def pack_bitset(indicators):
+    """Encode une matrice 0/1 (exploitations x options) en entiers 64 bits"""
+    values = np.nan_to_num(np.asarray(indicators, dtype=float)) > 0
+    if values.shape[1] > 63:
+        raise ValueError(f"Trop d'options pour un bitset 64 bits: {values.shape[1]}")
+    weights = np.left_shift(np.int64(1), np.arange(values.shape[1], dtype=np.int64))
+    return values.astype(np.int64) @ weights
+
+def unpack_bitset(bits, n_options):
+    """Décode des bitsets en matrice booléenne (exploitations x options)"""
+    bits = np.asarray(bits, dtype=np.int64)
+    return ((bits[:, None] >> np.arange(n_options, dtype=np.int64)) & 1).astype(bool)
+
+def encode_select_multiple(df):
+    """Compacte chaque groupe à choix multiples en une colonne bitset"""
+    for group in SELECT_MULTIPLE_GROUPS:
+        options = get_select_multiple_options(df, group)
+        df[f'Bitset_{group}'] = pack_bitset(df[options].to_numpy()) if options else 0
+    return df
+
+def prepare_data(source=None):
     """Fonction principale pour préparer toutes les données"""
     print("Chargement et nettoyage des données...")
     
     # Charger les données
-    df = load_data()
+    df = load_data(source)
     if df is None:
         return None
     
@@ -143,9 +468,13 @@ def prepare_data():
     df = clean_water_data(df)
     df = clean_pesticide_data(df)
     df = clean_environmental_data(df)
+    df = encode_select_multiple(df)
     
     print(f"✓ Données nettoyées: {len(df)} enregistrements")
     
+    # Index des réponses libres (chargé depuis le disque s'il est à jour)
+    get_text_index(df)
+    
     # Afficher un résumé
     print("\nRésumé des données:")
     print(f"- Âge moyen: {df['Age_clean'].mean():.1f} ans")
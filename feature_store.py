@@ -0,0 +1,110 @@
+"""
+Magasin de variables dérivées partagées entre les analyses
+"""
+import hashlib
+import weakref
+import pandas as pd
+import numpy as np
+from config import FEATURE_STORE_CONFIG
+
+# Registre global: nom -> (dépendances, fonction de calcul, version)
+FEATURE_REGISTRY = {}
+
+def register_feature(name, depends_on, version=1):
+    """Décorateur déclarant une variable dérivée et ses dépendances
+
+    Les dépendances sont des colonnes du DataFrame ou d'autres variables
+    enregistrées; la fonction reçoit leurs valeurs en arguments positionnels
+    (None pour une colonne absente) et retourne une Series alignée sur le DataFrame.
+    """
+    def decorator(func):
+        FEATURE_REGISTRY[name] = {'depends_on': list(depends_on), 'compute': func, 'version': version}
+        return func
+    return decorator
+
+def _read_only(series):
+    """Rend les valeurs d'une Series non modifiables"""
+    values = series.to_numpy()
+    if isinstance(values, np.ndarray):
+        values.flags.writeable = False
+    return series
+
+class FeatureStore:
+    """Calcul paresseux et mise en cache des variables dérivées d'un DataFrame
+
+    Le DataFrame source n'est jamais modifié: les analyses lisent les variables
+    via get() au lieu d'ajouter des colonnes, ce qui rend les résultats
+    indépendants de l'ordre d'appel.
+    """
+
+    def __init__(self, df, disk_cache=None):
+        self._df = weakref.ref(df)
+        self._cache = {}
+        self.disk_cache = FEATURE_STORE_CONFIG['disk_cache'] if disk_cache is None else disk_cache
+
+    @property
+    def df(self):
+        df = self._df()
+        if df is None:
+            raise RuntimeError("Le DataFrame associé au magasin de variables n'existe plus")
+        return df
+
+    def _dependency_values(self, name):
+        spec = FEATURE_REGISTRY[name]
+        values = {}
+        for dependency in spec['depends_on']:
+            if dependency in FEATURE_REGISTRY:
+                values[dependency] = self.get(dependency)
+            elif dependency in self.df.columns:
+                values[dependency] = self.df[dependency]
+            else:
+                values[dependency] = None  # colonne absente de cet export
+        return values
+
+    def _disk_path(self, name, dependencies):
+        """Chemin du cache disque, dérivé du contenu des dépendances"""
+        digest = hashlib.sha1(f"{name}:{FEATURE_REGISTRY[name]['version']}:{len(self.df)}".encode())
+        for dependency, values in dependencies.items():
+            digest.update(dependency.encode())
+            if values is not None:
+                digest.update(pd.util.hash_pandas_object(values, index=True).to_numpy().tobytes())
+        return FEATURE_STORE_CONFIG['cache_dir'] / f"{name}_{digest.hexdigest()[:16]}.pkl"
+
+    def get(self, name):
+        """Retourne une variable dérivée (calculée une seule fois, en lecture seule)"""
+        if name in self._cache:
+            return self._cache[name]
+        if name not in FEATURE_REGISTRY:
+            raise KeyError(f"Variable dérivée inconnue: {name}")
+
+        dependencies = self._dependency_values(name)
+        path = self._disk_path(name, dependencies) if self.disk_cache else None
+
+        if path is not None and path.exists():
+            series = pd.read_pickle(path)
+        else:
+            series = FEATURE_REGISTRY[name]['compute'](*dependencies.values())
+            series = pd.Series(series, index=self.df.index, name=name) if not isinstance(series, pd.Series) else series.rename(name)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                series.to_pickle(path)
+
+        self._cache[name] = _read_only(series)
+        return self._cache[name]
+
+    def get_frame(self, names):
+        """Retourne plusieurs variables dérivées sous forme de DataFrame"""
+        return pd.concat([self.get(name) for name in names], axis=1)
+
+# Un magasin par DataFrame, libéré avec lui
+_STORES = {}
+
+def get_feature_store(df):
+    """Retourne le magasin de variables associé à un DataFrame"""
+    key = id(df)
+    store = _STORES.get(key)
+    if store is None or store._df() is not df:
+        store = FeatureStore(df)
+        _STORES[key] = store
+        weakref.finalize(df, _STORES.pop, key, None)
+    return store
@@ -3,22 +3,21 @@ Analyse de l'exposition humaine aux pesticides et engrais
 """
 import pandas as pd
 import numpy as np
+from config import THRESHOLDS, SYMPTOM_TEXT_COLUMN
+from feature_store import register_feature, get_feature_store
+from text_index import get_text_index
+from product_normalizer import count_products
+
+# Listes de mots-clés des réponses libres
+COMMON_SYMPTOMS = ['intoxication', 'yeux', 'plaie', 'rhumatisme', 'respiratoire']
+DANGEROUS_WASTE_PRACTICES = ['brûlé', 'enfouissement', 'canal', 'jeté']
 
 def analyze_pesticide_exposure(df):
     """Analyse l'exposition aux pesticides"""
     
-    # Types de pesticides utilisés
-    pesticides_mentioned = []
+    # Types de pesticides utilisés (orthographes ramenées aux noms canoniques)
     pesticide_column = 'quels sont les pesticides que vous  utiliser '
-    
-    for _, row in df.iterrows():
-        if pd.notna(row[pesticide_column]):
-            pesticides = str(row[pesticide_column]).lower().split(',')
-            pesticides_mentioned.extend([p.strip() for p in pesticides])
-    
-    # Compter les types de pesticides
-    from collections import Counter
-    pesticide_counts = Counter(pesticides_mentioned)
+    pesticide_counts = count_products(df[pesticide_column]) if pesticide_column in df.columns else pd.Series(dtype=int)
     
     # Analyser les cas d'intoxication
     # CORRECTION: Vérifier d'abord si la colonne existe
@@ -54,17 +53,12 @@ def analyze_pesticide_exposure(df):
             disease_cases = (df[col] == 'oui').sum()
             break
     
-    # Analyser les symptômes mentionnés
-    symptom_column = 'comment ca se manifeste'
-    symptoms = []
-    if symptom_column in df.columns:
-        for _, row in df.iterrows():
-            if pd.notna(row[symptom_column]):
-                symptoms.append(str(row[symptom_column]).lower())
-    
-    # Identifier les symptômes courants
-    common_symptoms = ['intoxication', 'yeux', 'plaie', 'rhumatisme', 'respiratoire']
-    symptom_counts = {symptom: sum(1 for s in symptoms if symptom in s) for symptom in common_symptoms}
+    # Identifier les symptômes courants (recherche par préfixe dans l'index texte)
+    text_index = get_text_index(df)
+    symptom_counts = {
+        symptom: int(text_index.match_rows(f'{symptom}*', columns=[SYMPTOM_TEXT_COLUMN]).sum())
+        for symptom in COMMON_SYMPTOMS
+    }
     
     # Vérifier la colonne de formation
     training_column = 'avez vous suivi une formation sur l\'utilisation des produits agrochimiques'
@@ -75,12 +69,15 @@ def analyze_pesticide_exposure(df):
         trained = (df[training_column] == 'oui').sum()
         not_trained = (df[training_column] == 'non').sum()
     
+    # Niveaux d'exposition selon les seuils partagés (analyse de sensibilité, balayage)
+    high, medium = THRESHOLDS['pesticide_exposure_risk'], THRESHOLDS['pesticide_exposure_medium']
+    
     results = {
-        'pesticide_types': dict(pesticide_counts.most_common(10)),
+        'pesticide_types': pesticide_counts.head(10).to_dict(),
         'exposure_levels': {
-            'high': (df['Pesticide_exposure_score'] > 50).sum() if 'Pesticide_exposure_score' in df.columns else 0,
-            'medium': ((df['Pesticide_exposure_score'] > 20) & (df['Pesticide_exposure_score'] <= 50)).sum() if 'Pesticide_exposure_score' in df.columns else 0,
-            'low': (df['Pesticide_exposure_score'] <= 20).sum() if 'Pesticide_exposure_score' in df.columns else 0
+            'high': (df['Pesticide_exposure_score'] > high).sum() if 'Pesticide_exposure_score' in df.columns else 0,
+            'medium': ((df['Pesticide_exposure_score'] > medium) & (df['Pesticide_exposure_score'] <= high)).sum() if 'Pesticide_exposure_score' in df.columns else 0,
+            'low': (df['Pesticide_exposure_score'] <= medium).sum() if 'Pesticide_exposure_score' in df.columns else 0
         },
         'protection_usage': {
             'adequate': (df['Protection_factor'] < 0.5).sum() if 'Protection_factor' in df.columns else 0,
@@ -100,30 +97,32 @@ def analyze_pesticide_exposure(df):
     
     return results
 
+FERTILIZER_COLUMN = 'quelle quantite d\'engrais chimique utiliser vous'
+
+@register_feature('fertilizer_quantity_clean', depends_on=[FERTILIZER_COLUMN])
+def compute_fertilizer_quantity(quantity):
+    """Quantité d'engrais numérique (0 si la question est absente)"""
+    if quantity is None:
+        return 0
+    return pd.to_numeric(quantity, errors='coerce')
+
+@register_feature('fertilizer_category', depends_on=['fertilizer_quantity_clean'])
+def compute_fertilizer_category(quantity):
+    """Catégorie d'utilisation d'engrais"""
+    categories = np.select(
+        [quantity.isna(), quantity <= 3, quantity <= 6],
+        ['non_specifie', 'faible', 'moyen'],
+        default='eleve'
+    )
+    return pd.Series(categories, index=quantity.index, dtype=object)
+
 def analyze_fertilizer_exposure(df):
     """Analyse l'exposition aux engrais chimiques"""
     
-    # Quantité d'engrais utilisée
-    fertilizer_column = 'quelle quantite d\'engrais chimique utiliser vous'
-    
-    # Nettoyer les données d'engrais
-    if fertilizer_column in df.columns:
-        df['fertilizer_quantity_clean'] = pd.to_numeric(df[fertilizer_column], errors='coerce')
-    else:
-        df['fertilizer_quantity_clean'] = 0
-    
-    # Catégoriser l'utilisation
-    def categorize_fertilizer_use(quantity):
-        if pd.isna(quantity):
-            return 'non_specifie'
-        elif quantity <= 3:
-            return 'faible'
-        elif quantity <= 6:
-            return 'moyen'
-        else:
-            return 'eleve'
-    
-    df['fertilizer_category'] = df['fertilizer_quantity_clean'].apply(categorize_fertilizer_use)
+    # Quantité et catégorie d'engrais (variables dérivées, sans modifier df)
+    features = get_feature_store(df)
+    fertilizer_quantity = features.get('fertilizer_quantity_clean')
+    fertilizer_category = features.get('fertilizer_category')
     
     # Analyser les méthodes de gestion des déchets
     waste_column = 'que faites vous des contenants vides de produits agrochimiques (sacs, bidons) après usage'
@@ -139,10 +138,9 @@ def analyze_fertilizer_exposure(df):
     waste_counts = Counter(waste_methods)
     
     # Identifier les pratiques dangereuses
-    dangerous_practices = ['brûlé', 'enfouissement', 'canal', 'jeté']
     dangerous_waste_handling = sum(
         1 for method in waste_methods 
-        if any(practice in method for practice in dangerous_practices)
+        if any(practice in method for practice in DANGEROUS_WASTE_PRACTICES)
     )
     
     # Vérifier le système de collecte
@@ -152,8 +150,8 @@ def analyze_fertilizer_exposure(df):
         has_collection = (df[collection_column] != 'neant').sum()
     
     results = {
-        'fertilizer_usage': df['fertilizer_category'].value_counts().to_dict(),
-        'average_quantity': df['fertilizer_quantity_clean'].mean(),
+        'fertilizer_usage': fertilizer_category.value_counts().to_dict(),
+        'average_quantity': fertilizer_quantity.mean(),
         'waste_management': dict(waste_counts.most_common()),
         'dangerous_practices_count': dangerous_waste_handling,
         'has_collection_system': has_collection
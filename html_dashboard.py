@@ -0,0 +1,314 @@
+"""
+Tableau de bord HTML autonome (agrégats pré-calculés, filtrage dans le navigateur)
+"""
+import json
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+from config import DASHBOARD_CONFIG, REPORTS_DIR, RECOMMENDATION_RULES, HARMFUL_PRACTICES
+from batch_reports import KEY_INDICATORS, farmer_indicators, practice_labels, dimension_codes
+
+# Titres des synthèses de all_reports reprises dans le tableau de bord
+REPORT_TITLES = {
+    'impact': "Impacts environnementaux",
+    'biodiversity': "Biodiversité",
+    'health': "Exposition sanitaire",
+    'water': "Utilisation de l'eau",
+    'correlation': "Facteurs socio-démographiques",
+    'risk_model': "Modèle de risque",
+    'recommendations': "Recommandations",
+    'associations': "Associations catégorielles",
+    'trends': "Évolution temporelle",
+    'cooccurrence': "Co-occurrences",
+    'thresholds': "Sensibilité aux seuils",
+    'sensitivity': "Robustesse du score d'exposition",
+    'text_clusters': "Réponses libres"
+}
+
+def indicator_metadata(columns):
+    """Libellé et mode d'agrégation de chaque indicateur ('mean' : moyenne, 'count' : nombre d'agriculteurs)"""
+    labels = dict(zip((f'pratique:{name}' for name in HARMFUL_PRACTICES), practice_labels()))
+    metadata = []
+    for col in columns:
+        if col in KEY_INDICATORS:
+            metadata.append({'key': col, 'group': 'cle', 'label': KEY_INDICATORS[col][0], 'kind': 'mean'})
+        elif col.startswith('pratique:'):
+            metadata.append({'key': col, 'group': 'pratique', 'label': labels[col], 'kind': 'mean'})
+        elif col.startswith('reco:'):
+            rule = RECOMMENDATION_RULES[col.split(':', 1)[1]]
+            metadata.append({'key': col, 'group': 'reco', 'label': rule['message'], 'kind': 'count',
+                             'priority': rule['priority']})
+    return metadata
+
+def build_cube(df, dimensions=None):
+    """Cube d'agrégats : sommes et effectifs de chaque indicateur par cellule (village x commune x âge...)
+
+    Chaque cellule est une combinaison observée des dimensions; toute
+    sélection du navigateur se calcule en additionnant les cellules retenues
+    (moyenne = somme des sommes / somme des effectifs), sans données brutes.
+    Les agrégats sont obtenus en un seul produit par la matrice creuse
+    d'appartenance aux cellules.
+    """
+    dimensions = dimensions or DASHBOARD_CONFIG['dimensions']
+    dimensions = {label: col for label, col in dimensions.items() if col in df.columns}
+    indicators = farmer_indicators(df)
+
+    codes, values = {}, {}
+    for label, col in dimensions.items():
+        codes[label], values[label] = dimension_codes(df[col])
+    # Combinaison des codes en un entier unique par cellule
+    sizes = [len(values[label]) for label in dimensions]
+    keys = np.ravel_multi_index(list(codes.values()), sizes) if codes else np.zeros(len(df), dtype=int)
+    cell_keys, cell_index = np.unique(keys, return_inverse=True)
+    cells = np.column_stack(np.unravel_index(cell_keys, sizes)) if codes else np.zeros((len(cell_keys), 0), dtype=int)
+
+    matrix = indicators.to_numpy(dtype=float)
+    present = ~np.isnan(matrix)
+    membership = sparse.csr_matrix((np.ones(len(df)), (cell_index, np.arange(len(df)))), shape=(len(cells), len(df)))
+    aggregates = membership @ np.hstack([np.where(present, matrix, 0.0), present, np.ones((len(df), 1))])
+
+    n_indicators = matrix.shape[1]
+    decimals = DASHBOARD_CONFIG['decimals']
+    farmers = aggregates[:, -1].astype(int)
+    sums = np.round(aggregates[:, :n_indicators], decimals)
+    counts = aggregates[:, n_indicators:-1].astype(int)
+
+    return {
+        'dimensions': [{'label': label, 'values': values[label]} for label in dimensions],
+        'indicators': indicator_metadata(indicators.columns),
+        'cells': cells.T.tolist(),
+        'farmers': farmers.tolist(),
+        'sums': sums.T.tolist(),
+        # Effectifs par indicateur seulement s'il a des valeurs manquantes (sinon = farmers)
+        'counts': [None if present[:, j].all() else counts[:, j].tolist() for j in range(n_indicators)]
+    }
+
+def json_scalar(value):
+    """Valeur scalaire sérialisable (types numpy convertis, NaN -> null); None si non scalaire"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, DASHBOARD_CONFIG['decimals']) if np.isfinite(value) else None
+    if isinstance(value, (bool, int, str)) or value is None:
+        return value
+    return None
+
+def report_summaries(all_reports):
+    """Synthèses scalaires de chaque rapport (valeurs d'ensemble, non filtrées)"""
+    summaries = []
+    for key, report in all_reports.items():
+        summary = report.get('summary') if isinstance(report, dict) else None
+        if not summary:
+            continue
+        items = [[name.replace('_', ' '), json_scalar(value)] for name, value in summary.items()
+                 if json_scalar(value) is not None]
+        if items:
+            summaries.append({'title': REPORT_TITLES.get(key, key), 'items': items})
+    return summaries
+
+def dashboard_data(df, all_reports):
+    """Données du tableau de bord : cube d'agrégats et synthèses des rapports"""
+    return {
+        'date': datetime.now().strftime('%d/%m/%Y'),
+        'cube': build_cube(df),
+        'summaries': report_summaries(all_reports)
+    }
+
+def serialize_dashboard_data(data):
+    """JSON compact (sans espaces), '</' échappé pour l'insertion dans une balise <script>"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), allow_nan=False).replace('</', '<\\/')
+
+DASHBOARD_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Tableau de bord - Pratiques rizicoles</title>
+<style>
+body { font-family: Helvetica, Arial, sans-serif; margin: 0; background: #f4f6f8; color: #222; }
+header { background: #2E86AB; color: #fff; padding: 16px 24px; }
+header h1 { margin: 0; font-size: 20px; }
+header p { margin: 4px 0 0; font-size: 13px; opacity: 0.85; }
+main { padding: 16px 24px; max-width: 1200px; }
+section { background: #fff; border-radius: 6px; padding: 12px 16px; margin-bottom: 16px; }
+h2 { font-size: 16px; color: #2E86AB; margin: 0 0 10px; }
+.filters { display: flex; flex-wrap: wrap; gap: 16px; align-items: end; }
+.filters label { font-size: 12px; display: flex; flex-direction: column; gap: 4px; }
+.filters select { min-width: 180px; padding: 4px; }
+.cards { display: flex; flex-wrap: wrap; gap: 12px; }
+.card { flex: 1 1 160px; border: 1px solid #dde3e8; border-radius: 6px; padding: 10px; }
+.card .value { font-size: 22px; font-weight: bold; }
+.card .label, .card .ref { font-size: 12px; color: #555; }
+.bar-row { display: grid; grid-template-columns: 45% 1fr 60px; gap: 8px; align-items: center; font-size: 13px; margin: 4px 0; }
+.bar { position: relative; background: #eef1f4; height: 16px; border-radius: 3px; }
+.bar .fill { background: #E63946; height: 100%; border-radius: 3px; }
+.bar .mark { position: absolute; top: -3px; width: 2px; height: 22px; background: #222; }
+table { border-collapse: collapse; width: 100%; font-size: 13px; }
+th, td { border-bottom: 1px solid #e3e7eb; padding: 4px 6px; text-align: left; }
+td.num { text-align: right; }
+.summaries { columns: 2 320px; }
+.summaries div { break-inside: avoid; margin-bottom: 10px; font-size: 13px; }
+.empty { color: #888; font-style: italic; }
+</style>
+</head>
+<body>
+<header>
+<h1>Impacts environnementaux et sanitaires de la riziculture</h1>
+<p id="subtitle"></p>
+</header>
+<main>
+<section><h2>Filtres</h2><div class="filters" id="filters"></div></section>
+<section><h2>Indicateurs clés</h2><div class="cards" id="cards"></div></section>
+<section><h2>Pratiques agricoles nuisibles (% des agriculteurs, trait : ensemble)</h2><div id="practices"></div></section>
+<section><h2>Recommandations ciblées</h2><table id="recommendations"></table></section>
+<section><h2>Synthèse des analyses (ensemble de l'enquête)</h2><div class="summaries" id="summaries"></div></section>
+</main>
+<script id="dashboard-data" type="application/json">__DASHBOARD_DATA__</script>
+<script>
+(function () {
+  var data = JSON.parse(document.getElementById('dashboard-data').textContent);
+  var cube = data.cube, nCells = cube.farmers.length, selection = cube.dimensions.map(function () { return -1; });
+
+  function el(tag, text, cls) {
+    var node = document.createElement(tag);
+    if (text !== undefined) node.textContent = text;
+    if (cls) node.className = cls;
+    return node;
+  }
+  function fmt(value, digits) {
+    return value === null || isNaN(value) ? 'N/A' : value.toLocaleString('fr-FR', {maximumFractionDigits: digits, minimumFractionDigits: digits});
+  }
+
+  // Agrégation des cellules retenues par les filtres (moyennes = sommes / effectifs)
+  function aggregate(filtered) {
+    var farmers = 0, sums = cube.sums.map(function () { return 0; }), counts = sums.slice();
+    for (var c = 0; c < nCells; c++) {
+      if (filtered && !selection.every(function (code, d) { return code < 0 || cube.cells[d][c] === code; })) continue;
+      farmers += cube.farmers[c];
+      for (var i = 0; i < sums.length; i++) {
+        sums[i] += cube.sums[i][c];
+        counts[i] += cube.counts[i] ? cube.counts[i][c] : cube.farmers[c];
+      }
+    }
+    var values = cube.indicators.map(function (ind, i) {
+      return ind.kind === 'count' ? sums[i] : (counts[i] > 0 ? sums[i] / counts[i] : null);
+    });
+    return {farmers: farmers, values: values};
+  }
+  var overall = aggregate(false);
+
+  function render() {
+    var current = aggregate(true);
+    document.getElementById('subtitle').textContent = 'Rapport du ' + data.date + ' - ' + current.farmers +
+      ' agriculteur(s) sélectionné(s) sur ' + overall.farmers;
+
+    var cards = document.getElementById('cards'), practices = document.getElementById('practices'),
+        table = document.getElementById('recommendations');
+    cards.replaceChildren(); practices.replaceChildren(); table.replaceChildren();
+    var header = el('tr'); ['Priorité', 'Recommandation', 'Agriculteurs', '%'].forEach(function (t) { header.appendChild(el('th', t)); });
+    table.appendChild(header);
+
+    var recommendations = [];
+    cube.indicators.forEach(function (ind, i) {
+      var value = current.values[i], reference = overall.values[i];
+      if (ind.group === 'cle') {
+        var card = el('div', undefined, 'card');
+        card.appendChild(el('div', fmt(value, ind.key === 'eau_m3' ? 0 : 1), 'value'));
+        card.appendChild(el('div', ind.label, 'label'));
+        card.appendChild(el('div', 'Ensemble : ' + fmt(reference, ind.key === 'eau_m3' ? 0 : 1), 'ref'));
+        cards.appendChild(card);
+      } else if (ind.group === 'pratique') {
+        var row = el('div', undefined, 'bar-row'), bar = el('div', undefined, 'bar'),
+            fill = el('div', undefined, 'fill'), mark = el('div', undefined, 'mark');
+        fill.style.width = (value || 0) + '%';
+        mark.style.left = (reference || 0) + '%';
+        bar.appendChild(fill); bar.appendChild(mark);
+        row.appendChild(el('div', ind.label)); row.appendChild(bar); row.appendChild(el('div', fmt(value, 1) + ' %'));
+        practices.appendChild(row);
+      } else if (value > 0) {
+        recommendations.push([ind.priority, -value, ind.label, value]);
+      }
+    });
+
+    recommendations.sort(function (a, b) { return a[0] - b[0] || a[1] - b[1]; });
+    recommendations.forEach(function (r) {
+      var tr = el('tr');
+      tr.appendChild(el('td', 'P' + r[0])); tr.appendChild(el('td', r[2]));
+      tr.appendChild(el('td', fmt(r[3], 0), 'num'));
+      tr.appendChild(el('td', fmt(current.farmers ? r[3] / current.farmers * 100 : null, 1), 'num'));
+      table.appendChild(tr);
+    });
+    if (!recommendations.length) {
+      var none = el('tr'), cell = el('td', 'Aucune recommandation pour cette sélection.', 'empty');
+      cell.colSpan = 4; none.appendChild(cell); table.appendChild(none);
+    }
+  }
+
+  var filters = document.getElementById('filters');
+  cube.dimensions.forEach(function (dimension, d) {
+    var label = el('label', dimension.label), select = el('select');
+    select.appendChild(new Option('Tous', -1));
+    dimension.values.forEach(function (value, code) { select.appendChild(new Option(value, code)); });
+    select.addEventListener('change', function () { selection[d] = parseInt(select.value, 10); render(); });
+    label.appendChild(select);
+    filters.appendChild(label);
+  });
+
+  var summaries = document.getElementById('summaries');
+  data.summaries.forEach(function (summary) {
+    var block = el('div'), list = el('table');
+    block.appendChild(el('strong', summary.title));
+    summary.items.forEach(function (item) {
+      var tr = el('tr'), value = item[1];
+      tr.appendChild(el('td', item[0]));
+      tr.appendChild(el('td', typeof value === 'number' ? fmt(value, Number.isInteger(value) ? 0 : 2) : String(value), 'num'));
+      list.appendChild(tr);
+    });
+    block.appendChild(list);
+    summaries.appendChild(block);
+  });
+
+  render();
+})();
+</script>
+</body>
+</html>
+"""
+
+def generate_html_dashboard(df, all_reports, output_file=None):
+    """Génère le tableau de bord HTML autonome (consultable hors ligne)"""
+
+    print("Génération du tableau de bord HTML...")
+
+    output_file = output_file or REPORTS_DIR / DASHBOARD_CONFIG['output_file']
+    data = dashboard_data(df, all_reports)
+    serialized = serialize_dashboard_data(data)
+    output_file.write_text(DASHBOARD_TEMPLATE.replace('__DASHBOARD_DATA__', serialized), encoding='utf-8')
+
+    cube = data['cube']
+    report = {
+        'file': str(output_file),
+        'summary': {
+            'cells': len(cube['farmers']),
+            'dimensions': [dimension['label'] for dimension in cube['dimensions']],
+            'indicators': len(cube['indicators']),
+            'data_bytes': len(serialized.encode('utf-8')),
+            'file_bytes': output_file.stat().st_size
+        }
+    }
+
+    # Afficher le résumé
+    print(f"✓ Tableau de bord généré : {output_file}")
+    print(f"   - {report['summary']['cells']} cellules pré-agrégées ({', '.join(report['summary']['dimensions'])}), "
+          f"{report['summary']['indicators']} indicateurs")
+    print(f"   - Données intégrées: {report['summary']['data_bytes'] / 1024:.1f} Ko")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    from impact_analysis import generate_impact_report
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_html_dashboard(df, {'impact': generate_impact_report(df)})
@@ -4,62 +4,132 @@ Analyse des impacts environnementaux des pratiques agricoles
 import pandas as pd
 import numpy as np
 from collections import Counter
+import operator
 import re
+from config import HARMFUL_PRACTICES, THRESHOLDS, DEFORESTATION_TEXT_COLUMNS, BIODIVERSITY_TEXT_COLUMN
+from text_index import get_text_index, keyword_query
+from data_loader import first_answer
+
+# Catégories d'impact sur la biodiversité (mots-clés des réponses libres)
+BIODIVERSITY_IMPACT_CATEGORIES = {
+    'disparition': ['disparition', 'disparu'],
+    'diminution': ['diminution', 'réduit', 'baisse'],
+    'proliferation_negative': ['prolifération', 'herbe', 'adventice', 'mauvaise'],
+    'pas_de_changement': ['pas de changement', 'rien', 'néant', 'non']
+}
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+# Comptes sur une grille de seuils : côté de la recherche dans les valeurs triées
+# et sens du compte (valeurs après le point d'insertion pour '>' et '>=')
+THRESHOLD_SEARCH = {
+    '>': ('right', True),
+    '>=': ('left', True),
+    '<': ('left', False),
+    '<=': ('right', False)
+}
+
+def resolve_rule(rule):
+    """Règle déclarative d'après son nom dans HARMFUL_PRACTICES, ou telle quelle"""
+    return HARMFUL_PRACTICES[rule] if isinstance(rule, str) else rule
+
+def rule_columns(rule):
+    """Colonnes évaluées par une règle (versions successives d'une même question)"""
+    return rule['column'] if isinstance(rule['column'], list) else [rule['column']]
+
+def rule_values(df, rule):
+    """Réponses évaluées par une règle (première réponse renseignée si plusieurs versions)"""
+    columns = [col for col in rule_columns(rule) if col in df.columns]
+    return df[columns[0]] if len(columns) == 1 else first_answer(df, columns)
+
+def compile_rule(rule):
+    """Compile une règle déclarative en fonction vectorisée df -> masque booléen
+    
+    'column' peut être une liste : versions successives d'une même question,
+    la première réponse renseignée est évaluée. Le seuil nommé ('threshold')
+    est lu dans THRESHOLDS à chaque évaluation (scénarios what-if).
+    """
+    columns = rule_columns(rule)
+    inverse = rule.get('inverse', False)
+    
+    if rule['operator'] == 'contains':
+        pattern = re.compile(rule['pattern'], re.IGNORECASE)
+        def condition(values):
+            return values.astype('string').str.contains(pattern, na=False).to_numpy(dtype=bool)
+    else:
+        compare = OPERATORS[rule['operator']]
+        def condition(values):
+            value = THRESHOLDS[rule['threshold']] if 'threshold' in rule else rule['value']
+            return compare(pd.to_numeric(values, errors='coerce').to_numpy(dtype=float), value)
+    
+    def evaluate(df):
+        if not any(col in df.columns for col in columns):
+            print(f"⚠️ Colonne absente pour la règle: {columns[0][:60]}")
+            return np.zeros(len(df), dtype=bool)
+        values = rule_values(df, rule)
+        mask = condition(values)
+        if inverse:
+            # Seules les réponses renseignées peuvent violer la règle
+            mask = ~mask & values.notna().to_numpy()
+        return mask
+    
+    return evaluate
+
+def compile_rules(rules):
+    """Compile un ensemble de règles (nom -> fonction vectorisée)"""
+    return {name: compile_rule(rule) for name, rule in rules.items()}
+
+def evaluate_rules(df, compiled_rules):
+    """Évalue toutes les règles compilées: matrice booléenne (exploitations x règles)"""
+    if not compiled_rules:
+        return np.zeros((len(df), 0), dtype=bool)
+    return np.column_stack([evaluate(df) for evaluate in compiled_rules.values()])
+
+def threshold_counts(df, rule, grid):
+    """Nombre d'exploitations satisfaisant une règle à seuil pour chaque seuil d'une grille
+
+    Un seul tri suivi de recherches dichotomiques: O((n + g) log n) au lieu
+    d'une évaluation complète de la règle par seuil.
+    """
+    if rule['operator'] not in THRESHOLD_SEARCH:
+        raise ValueError(f"Opérateur non pris en charge pour un balayage: {rule['operator']}")
+    side, above = THRESHOLD_SEARCH[rule['operator']]
+    answers = rule_values(df, rule)
+    values = pd.to_numeric(answers, errors='coerce').to_numpy(dtype=float)
+    values = np.sort(values[~np.isnan(values)])
+    positions = np.searchsorted(values, np.asarray(grid, dtype=float), side=side)
+    counts = len(values) - positions if above else positions
+    if rule.get('inverse', False):
+        # Comme compile_rule : toute réponse renseignée (même non numérique) viole la règle
+        counts = int(answers.notna().sum()) - counts
+    return counts
+
+# Règles compilées une seule fois au chargement du module (seuils résolus à l'évaluation)
+COMPILED_HARMFUL_PRACTICES = compile_rules(HARMFUL_PRACTICES)
 
 def analyze_harmful_practices(df):
     """Identifie les pratiques agricoles nuisibles"""
     
-    harmful_practices = {
-        'pesticides_chimiques': {
-            'column': 'quels sont  les intrants  et  fertilisants que vous recevez ou utilisez/Herbicide',
-            'description': 'Utilisation d\'herbicides chimiques',
-            'impact': 'Pollution des sols et de l\'eau, risques sanitaires'
-        },
-        'engrais_chimiques': {
-            'column': 'quels sont  les intrants  et  fertilisants que vous recevez ou utilisez/engrais chimiques(uree, NPk...)',
-            'description': 'Utilisation d\'engrais chimiques (urée, NPK)',
-            'impact': 'Eutrophisation, pollution des nappes phréatiques'
-        },
-        'brulage_dechets': {
-            'indicator': lambda row: 'brûl' in str(row['que faites vous des contenants vides de produits agrochimiques (sacs, bidons) après usage']).lower(),
-            'description': 'Brûlage des contenants de produits chimiques',
-            'impact': 'Pollution atmosphérique, émission de dioxines'
-        },
-        'pas_de_protection': {
-            'indicator': lambda row: row['Protection_factor'] >= 0.7,
-            'description': 'Absence ou insuffisance d\'équipements de protection',
-            'impact': 'Exposition directe aux produits toxiques'
-        },
-        'surconsommation_eau': {
-            'indicator': lambda row: row['Water_consumption_m3'] > 16250,
-            'description': 'Surconsommation d\'eau (>16250 m³/ha)',
-            'impact': 'Épuisement des ressources hydriques'
-        },
-        'pas_de_rotation': {
-            'column': 'utilisez vous des pratiques pour limiter l\'impact de la riziculture sur l\'environnement en adoptant ces mesures/rotation ',
-            'description': 'Absence de rotation des cultures',
-            'impact': 'Épuisement des sols, prolifération des ravageurs',
-            'inverse': True  # 0 signifie pas de rotation
-        }
-    }
+    matrix = evaluate_rules(df, COMPILED_HARMFUL_PRACTICES)
+    counts = matrix.sum(axis=0)
     
     results = {}
     
-    for practice, config in harmful_practices.items():
-        if 'column' in config:
-            if config.get('inverse', False):
-                count = (df[config['column']] == 0).sum()
-            else:
-                count = df[config['column']].sum()
-        else:
-            count = df.apply(config['indicator'], axis=1).sum()
-        
+    for (practice, config), count in zip(HARMFUL_PRACTICES.items(), counts):
+        threshold = THRESHOLDS.get(config.get('threshold'), config.get('value'))
         percentage = (count / len(df)) * 100
         
         results[practice] = {
             'count': count,
             'percentage': percentage,
-            'description': config['description'],
+            'description': config['description'].format(threshold=threshold),
             'impact': config['impact']
         }
     
@@ -68,51 +138,25 @@ def analyze_harmful_practices(df):
 def analyze_deforestation_evolution(df):
     """Analyse l'évolution de la déforestation"""
     
-    # Analyser les mentions de déforestation
-    deforestation_indicators = []
-    
-    # Colonnes contenant des informations sur la déforestation
-    text_columns = [
-        'depuis l\'installation de la rizière, avez vous constaté une diminution, une prolifération ou une disparition des espèces végétales ou animale',
-        'comment ca se manifeste',
-        'Avez vous beneficié d\'une extention de vos surfaces rizicoles, si oui expliquez'
-    ]
-    
     deforestation_keywords = ['déforestation', 'coupe', 'arbres', 'défrichement', 'déboisement']
     
-    for _, row in df.iterrows():
-        mentions = []
-        for col in text_columns:
-            if pd.notna(row[col]):
-                text = str(row[col]).lower()
-                for keyword in deforestation_keywords:
-                    if keyword in text:
-                        mentions.append({
-                            'keyword': keyword,
-                            'context': text[:100],
-                            'column': col
-                        })
-        
-        deforestation_indicators.append({
-            'has_deforestation': len(mentions) > 0,
-            'mentions': mentions,
-            'surface_2023': row.get('Surperficie cultivée en 2023', 0),
-            'surface_2024': row.get('Superficie cultivée en 2024', 0),
-            'surface_2025': row.get('Superficie cultivée en 2025', 0)
-        })
+    # Recherche par préfixe dans l'index texte: une mention = une réponse contenant le mot-clé
+    text_index = get_text_index(df)
+    keyword_docs = {keyword: text_index.match_docs(f'{keyword}*', columns=DEFORESTATION_TEXT_COLUMNS) for keyword in deforestation_keywords}
+    has_deforestation = np.zeros(len(df), dtype=bool)
+    for docs in keyword_docs.values():
+        has_deforestation[text_index.doc_row[docs]] = True
     
     # Calculer les statistiques
-    df_defor = pd.DataFrame(deforestation_indicators)
-    
     results = {
-        'total_mentions': df_defor['has_deforestation'].sum(),
-        'percentage': (df_defor['has_deforestation'].sum() / len(df)) * 100,
+        'total_mentions': has_deforestation.sum(),
+        'percentage': (has_deforestation.sum() / len(df)) * 100,
         'surface_evolution': {
             '2023': df['Surperficie cultivée en 2023'].sum(),
             '2024': df['Superficie cultivée en 2024'].sum(),
             '2025': df['Superficie cultivée en 2025'].sum()
         },
-        'keywords_frequency': Counter([m['keyword'] for ind in deforestation_indicators for m in ind['mentions']])
+        'keywords_frequency': Counter({keyword: int(docs.sum()) for keyword, docs in keyword_docs.items() if docs.any()})
     }
     
     return results
@@ -120,38 +164,17 @@ def analyze_deforestation_evolution(df):
 def analyze_biodiversity_loss(df):
     """Analyse la perte de biodiversité"""
     
-    biodiversity_column = 'depuis l\'installation de la rizière, avez vous constaté une diminution, une prolifération ou une disparition des espèces végétales ou animale'
-    
-    # Catégoriser les impacts
-    impact_categories = {
-        'disparition': ['disparition', 'disparu'],
-        'diminution': ['diminution', 'réduit', 'baisse'],
-        'proliferation_negative': ['prolifération', 'herbe', 'adventice', 'mauvaise'],
-        'pas_de_changement': ['pas de changement', 'rien', 'néant', 'non']
-    }
-    
-    impacts = []
+    # Première catégorie correspondante (préfixes et expressions recherchés dans l'index texte)
+    text_index = get_text_index(df)
+    category_masks = [
+        text_index.match_rows(keyword_query(keywords), columns=[BIODIVERSITY_TEXT_COLUMN])
+        for keywords in BIODIVERSITY_IMPACT_CATEGORIES.values()
+    ]
     
-    for _, row in df.iterrows():
-        response = str(row[biodiversity_column]).lower() if pd.notna(row[biodiversity_column]) else ''
-        
-        impact_type = 'non_specifie'
-        details = ''
-        
-        for category, keywords in impact_categories.items():
-            if any(keyword in response for keyword in keywords):
-                impact_type = category
-                details = response
-                break
-        
-        impacts.append({
-            'type': impact_type,
-            'details': details,
-            'uses_pesticides': row.get('Uses_pesticides', False),
-            'water_consumption': row.get('Water_consumption_m3', 0)
-        })
-    
-    df_impacts = pd.DataFrame(impacts)
+    df_impacts = pd.DataFrame({
+        'type': np.select(category_masks, list(BIODIVERSITY_IMPACT_CATEGORIES), default='non_specifie'),
+        'uses_pesticides': df['Uses_pesticides'].to_numpy(dtype=bool) if 'Uses_pesticides' in df.columns else False
+    }, index=df.index)
     
     # Calculer les statistiques
     results = {
@@ -0,0 +1,243 @@
+"""
+Synchronisation incrémentale des soumissions depuis l'API Kobo (v2)
+"""
+import json
+import re
+import sys
+import time
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+from config import KOBO_CONFIG, DATA_DIR, DATA_FILE, GEOPOINT_COLUMNS, GEOPOINT_PARTS
+from data_loader import harmonize_columns, append_to_store, read_store_state
+
+# Métadonnées Kobo : même nom dans l'API et dans l'export
+METADATA_FIELDS = {'start', 'end', 'start-geopoint', 'username', 'deviceid', 'phonenumber', 'audit', 'background-audio'}
+
+class KoboSyncClient:
+    """Client de synchronisation paginée avec reprise sur filigrane _id"""
+
+    def __init__(self, server_url=None, asset_uid=None, token=None, page_size=None, store_dir=None):
+        self.server_url = (server_url or KOBO_CONFIG['server_url']).rstrip('/')
+        self.asset_uid = asset_uid or KOBO_CONFIG['asset_uid']
+        if not self.asset_uid:
+            raise ValueError("Identifiant du formulaire Kobo manquant (variable KOBO_ASSET_UID ou asset_uid)")
+        self.token = token if token is not None else KOBO_CONFIG['token']
+        self.page_size = page_size or KOBO_CONFIG['page_size']
+        self.store_dir = store_dir
+
+    def data_url(self, since_id, start=0):
+        """Construit l'URL d'une page de soumissions postérieures au filigrane"""
+        params = {
+            'format': 'json',
+            'limit': self.page_size,
+            'start': start,
+            'sort': json.dumps({'_id': 1}),
+            'query': json.dumps({'_id': {'$gt': since_id}})
+        }
+        return f"{self.server_url}/api/v2/assets/{self.asset_uid}/data/?{urllib.parse.urlencode(params)}"
+
+    def _get_json(self, url):
+        """Télécharge une page JSON avec nouvelles tentatives"""
+        headers = {'Accept': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+
+        for attempt in range(1, KOBO_CONFIG['max_retries'] + 1):
+            try:
+                request = urllib.request.Request(url, headers=headers)
+                with urllib.request.urlopen(request, timeout=KOBO_CONFIG['timeout']) as response:
+                    return json.loads(response.read().decode('utf-8'))
+            except (urllib.error.URLError, TimeoutError) as e:
+                if attempt == KOBO_CONFIG['max_retries']:
+                    raise
+                print(f"⚠️ Échec de la requête ({e}) - nouvelle tentative {attempt + 1}")
+                time.sleep(2 ** attempt)
+
+    def iter_pages(self, since_id):
+        """Parcourt les pages de soumissions en suivant les liens 'next'"""
+        url = self.data_url(since_id)
+        while url:
+            payload = self._get_json(url)
+            results = payload.get('results', [])
+            if results:
+                yield results
+            url = payload.get('next')
+
+    def sync(self):
+        """Récupère les nouvelles soumissions et les écrit dans le magasin
+
+        Le filigrane est avancé après chaque page : une synchronisation
+        interrompue reprend à la première page non enregistrée.
+        """
+        state = read_store_state(self.store_dir)
+        print(f"Synchronisation Kobo depuis _id > {state['last_id']}...")
+
+        new_records = 0
+        for page in self.iter_pages(state['last_id']):
+            df = harmonize_columns(pd.DataFrame.from_records(page))
+            state = append_to_store(df, self.store_dir)
+            new_records += len(df)
+            print(f"✓ {len(df)} soumissions enregistrées (filigrane _id={state['last_id']})")
+
+        print(f"✓ Synchronisation terminée: {new_records} nouvelles soumissions")
+        return new_records
+
+class _LocalKoboHandler(BaseHTTPRequestHandler):
+    """Imite l'endpoint /api/v2/assets/<uid>/data/ de Kobo"""
+
+    records = []
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        if not parsed.path.rstrip('/').endswith('/data'):
+            self.send_error(404)
+            return
+
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        limit = int(params.get('limit', 100))
+        start = int(params.get('start', 0))
+        query = json.loads(params.get('query', '{}'))
+
+        matching = self.records
+        for field, condition in query.items():
+            threshold = condition.get('$gt') if isinstance(condition, dict) else None
+            if threshold is not None:
+                matching = [r for r in matching if r.get(field) is not None and r[field] > threshold]
+        matching = sorted(matching, key=lambda r: r.get('_id', 0))
+
+        page = matching[start:start + limit]
+        next_url = None
+        if start + limit < len(matching):
+            params['start'] = start + limit
+            next_url = f"http://{self.headers['Host']}{parsed.path}?{urllib.parse.urlencode(params)}"
+
+        body = json.dumps({'count': len(matching), 'next': next_url, 'previous': None, 'results': page}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def kobo_field_name(label, used=()):
+    """Nom XML attribué par le constructeur de formulaires Kobo à partir d'un libellé
+
+    Caractères hors [A-Za-z0-9_] remplacés par '_', tirets bas fusionnés et
+    retirés aux extrémités, 40 caractères au plus, '_' initial si le nom ne
+    commence pas par une lettre; les doublons reçoivent le suffixe _001, _002...
+    """
+    name = re.sub(r'[^A-Za-z0-9_]', '_', label.strip())
+    name = re.sub(r'_+', '_', name).strip('_')[:40]
+    if not re.match(r'[A-Za-z_]', name):
+        name = '_' + name
+    candidate, number = name, 0
+    while candidate in used:
+        number += 1
+        candidate = f"{name}_{number:03d}"
+    return candidate
+
+def export_field_names(columns):
+    """Libellé de l'export -> nom XML pour chaque question et option d'un export Excel
+
+    Sont écartés les métadonnées Kobo, les coordonnées GPS éclatées, les liens
+    de pièces jointes (_URL) et les colonnes sans en-tête. Un en-tête répété
+    ("Age.1") reprend le libellé de base, dont le nom reçoit alors un suffixe.
+    Les colonnes "question/option" des choix multiples, qui suivent leur
+    question dans l'export, sont nommées "champ/option" comme les valeurs
+    livrées par l'API.
+    """
+    headers = set(columns)
+    used, names, options = set(), {}, {}
+    latest = {}   # libellé de base -> dernière colonne de cette question ("question.1"...)
+    for col in columns:
+        if (col in METADATA_FIELDS or col.startswith('_') or col.startswith('Unnamed:')
+                or col.endswith('_URL')):
+            continue
+        parent = next((col[:i] for i, char in enumerate(col) if char == '/' and col[:i] in latest), None)
+        if parent is not None:
+            option = col[len(parent) + 1:]
+            suffix = latest[parent][len(parent):]
+            if suffix and option.endswith(suffix):
+                option = option[:-len(suffix)]
+            options.setdefault(latest[parent], []).append((col, option))
+            continue
+        duplicate = re.match(r'^(.*)\.\d+$', col)
+        label = duplicate.group(1) if duplicate and duplicate.group(1) in headers else col
+        latest[label] = col
+        names[col] = kobo_field_name(label, used)
+        used.add(names[col])
+
+    for parent, parent_options in options.items():
+        used_options = set()
+        for col, option in parent_options:
+            option_name = kobo_field_name(option, used_options)
+            used_options.add(option_name)
+            names[col] = f"{names[parent]}/{option_name}"
+    return names
+
+def write_alias_table(file_path=None, output=None):
+    """Écrit la table versionnée nom XML -> libellé déduite des en-têtes d'un export Excel"""
+    output = output or KOBO_CONFIG['aliases_file']
+    columns = pd.read_excel(file_path or DATA_DIR / DATA_FILE, nrows=0).columns
+    names = export_field_names(list(columns))
+    table = pd.DataFrame({'name': list(names.values()), 'label': list(names.keys())})
+    table.to_csv(output, index=False, encoding='utf-8')
+    print(f"✓ Table d'alias: {len(table)} champs et options dans {output}")
+    return table
+
+def records_from_export(file_path=None, field_names=True):
+    """Convertit un export Excel en soumissions JSON (pour le serveur local)
+
+    field_names: rejoue la forme des réponses de l'API (noms XML, choix
+    multiples en "option1 option2", points GPS non éclatés, champs non
+    renseignés omis).
+    """
+    df = pd.read_excel(file_path or DATA_DIR / DATA_FILE)
+    if field_names:
+        names = export_field_names(list(df.columns))
+        selected = {}
+        for col, name in names.items():
+            if '/' in name:
+                field, option = name.rsplit('/', 1)
+                selected.setdefault(field, []).append(df[col].eq(1).map({True: option, False: ''}))
+        geopoint_parts = {f'_{col}_{part}' for col in GEOPOINT_COLUMNS for part in GEOPOINT_PARTS}
+        keep = [col for col in df.columns if (col in names and '/' not in names[col]) or col in METADATA_FIELDS
+                or (col.startswith('_') and col not in geopoint_parts)]
+        df = df[keep].rename(columns=names)
+        for field, flags in selected.items():
+            # Versions du formulaire où la question était à choix unique : réponse telle quelle
+            multiple = pd.concat(flags, axis=1).agg(' '.join, axis=1).str.split().str.join(' ')
+            df[field] = multiple.where(multiple != '', df[field]).where(df[field].notna())
+    records = json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+    if field_names:
+        records = [{field: value for field, value in record.items() if value is not None} for record in records]
+    return records
+
+def start_local_server(records, host='127.0.0.1', port=0):
+    """Démarre un serveur local compatible Kobo dans un thread; retourne (serveur, url)"""
+    handler = type('LocalKoboHandler', (_LocalKoboHandler,), {'records': list(records)})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--table-alias':
+        write_alias_table()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        # Serveur de substitution alimenté par l'export Excel local
+        server, url = start_local_server(records_from_export(), port=8000)
+        print(f"Serveur Kobo local: {url}/api/v2/assets/local/data/ (Ctrl+C pour arrêter)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        KoboSyncClient().sync()
@@ -2,16 +2,31 @@
 Script principal pour l'analyse environnementale et sanitaire des pratiques rizicoles
 """
 import sys
+import argparse
 import warnings
 warnings.filterwarnings('ignore')
 
 from data_loader import prepare_data
 from impact_analysis import generate_impact_report
+from biodiversity_analysis import generate_biodiversity_report
 from health_analysis import generate_health_report
 from water_analysis import generate_water_report
 from correlation_analysis import generate_correlation_report
-from visualization import generate_all_visualizations
+from risk_model import generate_risk_model_report
+from recommendation_engine import generate_recommendation_report
+from association_analysis import generate_association_report
+from trend_analysis import generate_trend_report
+from cooccurrence_analysis import generate_cooccurrence_report
+from threshold_sweep import generate_threshold_sweep_report
+from sensitivity_analysis import generate_sensitivity_report
+from text_clustering import generate_text_clustering_report
+from visualization import generate_all_visualizations, apply_render_profile
+from chart_registry import CHART_REGISTRY
+from config import RESULTS_DIR, DASHBOARD_CONFIG
 from report_generator import ReportGenerator, create_summary_table
+from batch_reports import generate_batch_reports
+from html_dashboard import generate_html_dashboard
+from small_multiples import generate_small_multiples
 
 def print_header():
     """Affiche l'en-tête du programme"""
@@ -21,10 +36,29 @@ def print_header():
     print("="*70)
     print()
 
-def main():
+def parse_arguments(argv=None):
+    """Options de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Analyse environnementale et sanitaire des pratiques rizicoles")
+    parser.add_argument('--rapports-par', metavar='COLONNE', dest='group_by',
+                        help="génère aussi un rapport PDF par groupe (ex. village, commune)")
+    parser.add_argument('--processus', type=int, default=None, dest='n_jobs',
+                        help="nombre de processus pour les rapports par groupe")
+    parser.add_argument('--petits-multiples', metavar='COLONNE', dest='multiples_by',
+                        help="planches de petits multiples des pratiques nuisibles par groupe (ex. village, \"Nom de l'enqueteur\")")
+    parser.add_argument('--apercu', action='store_true', dest='preview',
+                        help="aperçu rapide : graphiques en résolution écran et rapport PDF de travail avec vignettes")
+    return parser.parse_args(argv)
+
+def main(args=None):
     """Fonction principale"""
+    args = args or parse_arguments([])
     print_header()
     
+    # Profil de rendu : aperçu rapide ou publication (300 dpi)
+    profile = apply_render_profile('preview' if args.preview else 'publication')
+    if args.preview:
+        print("⚠️ Mode aperçu : graphiques en résolution écran, rapport PDF de travail\n")
+    
     # Étape 1: Chargement et nettoyage des données
     print("ÉTAPE 1: CHARGEMENT DES DONNÉES")
     print("-"*40)
@@ -44,6 +78,10 @@ def main():
     print("\n>>> Analyse des impacts environnementaux...")
     impact_report = generate_impact_report(df)
     
+    # Analyse des changements de faune et de flore
+    print("\n>>> Analyse de la biodiversité...")
+    biodiversity_report = generate_biodiversity_report(df)
+    
     # Analyse de l'exposition sanitaire
     print("\n>>> Analyse de l'exposition sanitaire...")
     health_report = generate_health_report(df)
@@ -56,14 +94,55 @@ def main():
     print("\n>>> Analyse des corrélations socio-démographiques...")
     correlation_report = generate_correlation_report(df)
     
+    # Modèle de risque par agriculteur
+    print("\n>>> Modélisation du risque par agriculteur...")
+    risk_report = generate_risk_model_report(df)
+    
+    # Recommandations personnalisées par agriculteur
+    print("\n>>> Recommandations par agriculteur...")
+    recommendation_report = generate_recommendation_report(df)
+    
+    # Associations entre questions catégorielles
+    print("\n>>> Analyse des associations catégorielles...")
+    association_report = generate_association_report(df)
+    
+    # Analyse de l'évolution temporelle
+    print("\n>>> Analyse de l'évolution temporelle...")
+    trend_report = generate_trend_report(df)
+    
+    # Analyse des co-occurrences des choix multiples
+    print("\n>>> Analyse des co-occurrences...")
+    cooccurrence_report = generate_cooccurrence_report(df)
+    
+    # Sensibilité des indicateurs aux seuils
+    print("\n>>> Balayage des seuils d'analyse...")
+    threshold_report = generate_threshold_sweep_report(df)
+    
+    # Robustesse du score d'exposition
+    print("\n>>> Analyse de sensibilité du score d'exposition...")
+    sensitivity_report = generate_sensitivity_report(df)
+    
+    # Catégories proposées pour les réponses libres
+    print("\n>>> Regroupement des réponses libres...")
+    text_clustering_report = generate_text_clustering_report(df)
+    
     print("\n" + "="*70 + "\n")
     
     # Compilation de tous les rapports
     all_reports = {
         'impact': impact_report,
+        'biodiversity': biodiversity_report,
         'health': health_report,
         'water': water_report,
-        'correlation': correlation_report
+        'correlation': correlation_report,
+        'risk_model': risk_report,
+        'recommendations': recommendation_report,
+        'associations': association_report,
+        'trends': trend_report,
+        'cooccurrence': cooccurrence_report,
+        'thresholds': threshold_report,
+        'sensitivity': sensitivity_report,
+        'text_clusters': text_clustering_report
     }
     
     # Étape 3: Génération des visualisations
@@ -78,12 +157,33 @@ def main():
     print("-"*40)
     
     # Générer le rapport PDF
-    report_gen = ReportGenerator()
+    report_gen = ReportGenerator("rapport_analyse_environnementale_apercu.pdf" if profile == 'preview'
+                                 else "rapport_analyse_environnementale.pdf")
     report_gen.generate_report(all_reports)
     
     # Créer le résumé exécutif
     create_summary_table(all_reports)
     
+    # Tableau de bord HTML interactif (filtrage par village, commune, tranche d'âge)
+    all_reports['dashboard'] = generate_html_dashboard(df, all_reports)
+    
+    # Rapports par groupe (village, commune, coopérative...)
+    if args.group_by:
+        if args.group_by in df.columns:
+            all_reports['batch_reports'] = generate_batch_reports(df, group_by=args.group_by, n_jobs=args.n_jobs)
+        else:
+            print(f"⚠️ Colonne de regroupement introuvable: {args.group_by}")
+    
+    # Petits multiples par groupe (village, enquêteur...)
+    if args.multiples_by:
+        if args.multiples_by in df.columns:
+            all_reports['small_multiples'] = generate_small_multiples(df, group_by=args.multiples_by)
+        else:
+            print(f"⚠️ Colonne de regroupement introuvable: {args.multiples_by}")
+    
+    # Fin des exports PNG (écrits pendant la construction du rapport)
+    CHART_REGISTRY.wait()
+    
     print("\n" + "="*70 + "\n")
     
     # Résumé final
@@ -91,9 +191,11 @@ def main():
     print("-"*40)
     print("\nFichiers générés:")
     print("✓ Données nettoyées: data/cleaned_data.csv")
-    print("✓ Graphiques: resultats/graphiques/")
-    print("✓ Rapport PDF: resultats/rapports/rapport_analyse_environnementale.pdf")
+    if CHART_REGISTRY.export_png:
+        print(f"✓ Graphiques: {CHART_REGISTRY.export_dir.relative_to(RESULTS_DIR.parent)}/")
+    print(f"✓ Rapport PDF: resultats/rapports/{report_gen.filename.name}")
     print("✓ Résumé exécutif: resultats/rapports/resume_executif.txt")
+    print(f"✓ Tableau de bord interactif: resultats/rapports/{DASHBOARD_CONFIG['output_file']}")
     
     print("\n" + "="*70)
     print("\nRECOMMANDATIONS PRINCIPALES:")
@@ -113,7 +215,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        main(parse_arguments())
     except KeyboardInterrupt:
         print("\n\n✗ Analyse interrompue par l'utilisateur")
         sys.exit(0)
@@ -0,0 +1,96 @@
+"""
+Tests de permutation vectorisés (ANOVA, corrélation de Pearson, test t)
+"""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from config import PERMUTATION_CONFIG
+
+def anova_statistic(values, labels, permutations):
+    """Statistique F de l'ANOVA à un facteur pour chaque permutation des groupes
+
+    Les effectifs des groupes ne changent pas sous permutation : seules les
+    sommes par groupe sont recalculées, par un bincount sur toutes les
+    permutations à la fois.
+    """
+    n_groups = labels.max() + 1
+    n_perm, n = permutations.shape
+    counts = np.bincount(labels, minlength=n_groups)
+
+    permuted = labels[permutations] + n_groups * np.arange(n_perm)[:, None]
+    sums = np.bincount(permuted.ravel(), weights=np.broadcast_to(values, (n_perm, n)).ravel(),
+                       minlength=n_perm * n_groups).reshape(n_perm, n_groups)
+
+    total_ss = ((values - values.mean()) ** 2).sum()
+    between_ss = (sums ** 2 / counts).sum(axis=1) - values.sum() ** 2 / n
+    within_ss = np.maximum(total_ss - between_ss, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (between_ss / (n_groups - 1)) / (within_ss / (n - n_groups))
+
+def pearson_statistic(values, labels, permutations):
+    """Coefficient de Pearson (valeur absolue) pour chaque permutation"""
+    x = values - values.mean()
+    y = labels - labels.mean()
+    denominator = np.sqrt((x ** 2).sum() * (y ** 2).sum())
+    return np.abs(y[permutations] @ x) / denominator if denominator > 0 else np.full(len(permutations), np.nan)
+
+def ttest_statistic(values, labels, permutations):
+    """Statistique t de Student (variances égales, valeur absolue) pour chaque permutation"""
+    labels = labels.astype(bool)
+    n, n1 = len(values), labels.sum()
+    n0 = n - n1
+
+    sum1 = labels[permutations] @ values
+    mean1, mean0 = sum1 / n1, (values.sum() - sum1) / n0
+    mean = values.mean()
+
+    within_ss = ((values - mean) ** 2).sum() - n1 * (mean1 - mean) ** 2 - n0 * (mean0 - mean) ** 2
+    pooled = np.maximum(within_ss, 0) / (n - 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(mean1 - mean0) / np.sqrt(pooled * (1 / n1 + 1 / n0))
+
+STATISTICS = {
+    'anova': anova_statistic,
+    'pearson': pearson_statistic,
+    'ttest': ttest_statistic
+}
+
+def _permuted_statistics(kind, values, labels, task):
+    """Statistiques d'un lot de permutations générées à partir de sa propre graine"""
+    seed, size = task
+    rng = np.random.default_rng(seed)
+    permutations = rng.permuted(np.broadcast_to(np.arange(len(values)), (size, len(values))), axis=1)
+    return STATISTICS[kind](values, labels, permutations)
+
+def permutation_test(kind, values, labels, n_permutations=None, n_jobs=None, seed=None):
+    """Test de permutation bilatéral; retourne (statistique observée, p-value)
+
+    Les permutations sont générées et évaluées par lots (matrices de labels
+    permutés, taille bornée par PERMUTATION_CONFIG['max_chunk_bytes']); chaque
+    lot a sa graine dérivée, de sorte que le résultat ne dépend pas de n_jobs.
+    """
+    n_permutations = n_permutations or PERMUTATION_CONFIG['n_permutations']
+    n_jobs = n_jobs or PERMUTATION_CONFIG['n_jobs']
+    seed = PERMUTATION_CONFIG['seed'] if seed is None else seed
+
+    values = np.asarray(values, dtype=float)
+    labels = np.asarray(labels)
+    observed = STATISTICS[kind](values, labels, np.arange(len(values))[None, :])[0]
+    if np.isnan(observed):
+        return observed, np.nan
+
+    chunk_size = max(1, min(n_permutations, PERMUTATION_CONFIG['max_chunk_bytes'] // (3 * 8 * max(len(values), 1))))
+    sizes = [min(chunk_size, n_permutations - start) for start in range(0, n_permutations, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    evaluate = partial(_permuted_statistics, kind, values, labels)
+
+    if n_jobs > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(evaluate, zip(seeds, sizes)))
+    else:
+        results = [evaluate(task) for task in zip(seeds, sizes)]
+
+    permuted = np.concatenate(results)
+    tolerance = 1e-12 * max(abs(observed), 1)
+    exceed = np.count_nonzero(permuted >= observed - tolerance)
+    return observed, (exceed + 1) / (n_permutations + 1)
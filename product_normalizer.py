@@ -0,0 +1,97 @@
+"""
+Normalisation des noms de produits phytosanitaires (rapprochement approximatif par n-grammes)
+"""
+import re
+from functools import lru_cache
+import pandas as pd
+import numpy as np
+from config import PESTICIDE_PRODUCTS, PRODUCT_MATCHING_CONFIG
+from text_index import fold_text
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+def char_ngrams(word, n=None):
+    """n-grammes de caractères d'un mot, avec bornes de début et de fin"""
+    n = n or PRODUCT_MATCHING_CONFIG['ngram_size']
+    padded = ' ' * (n - 1) + word + ' '
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+class ProductNormalizer:
+    """Associe chaque orthographe à un nom canonique via un index de n-grammes
+
+    Les noms canoniques et leurs variantes connues sont indexés une fois; une
+    orthographe inconnue est comparée aux seules entrées partageant au moins un
+    n-gramme (coefficient de Dice), puis mémorisée.
+    """
+
+    def __init__(self, products=None, min_similarity=None):
+        products = products or PESTICIDE_PRODUCTS
+        self.min_similarity = min_similarity or PRODUCT_MATCHING_CONFIG['min_similarity']
+
+        self.entries = []      # orthographes indexées
+        self.canonical = []    # nom canonique de chaque entrée
+        for name, variants in products.items():
+            for spelling in [name] + list(variants):
+                self.entries.append(fold_text(spelling))
+                self.canonical.append(name)
+        self.canonical = np.array(self.canonical, dtype=object)
+
+        postings = {}
+        for entry_id, entry in enumerate(self.entries):
+            for gram in char_ngrams(entry):
+                postings.setdefault(gram, []).append(entry_id)
+        self.postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+        self.entry_sizes = np.array([len(char_ngrams(entry)) for entry in self.entries])
+
+        self.cache = {entry: name for entry, name in zip(self.entries, self.canonical)}
+
+    def resolve(self, word):
+        """Nom canonique d'un mot (None si aucun produit assez proche)"""
+        if word in self.cache:
+            return self.cache[word]
+
+        grams = char_ngrams(word)
+        candidates = [self.postings[gram] for gram in grams if gram in self.postings]
+        name = None
+        if candidates:
+            shared = np.bincount(np.concatenate(candidates), minlength=len(self.entries))
+            similarity = 2 * shared / (len(grams) + self.entry_sizes)
+            best = similarity.argmax()
+            if similarity[best] >= self.min_similarity:
+                name = self.canonical[best]
+
+        self.cache[word] = name
+        return name
+
+    def normalize_answer(self, answer):
+        """Liste des produits cités dans une réponse libre (noms canoniques, sans doublon)
+
+        Les mots non reconnus sont conservés tels quels (normalisés) pour ne
+        perdre aucune mention.
+        """
+        stop_words = PRODUCT_MATCHING_CONFIG['stop_words']
+        products = []
+        for word in WORD_PATTERN.findall(fold_text(answer)):
+            if len(word) < PRODUCT_MATCHING_CONFIG['min_length'] or word in stop_words:
+                continue
+            product = self.resolve(word) or word
+            if product not in products:
+                products.append(product)
+        return products
+
+    def normalize_series(self, series):
+        """Applique la normalisation à toute une colonne (une fois par réponse distincte)"""
+        answers = series.dropna().astype(str)
+        unique = pd.unique(answers)
+        resolved = dict(zip(unique, (self.normalize_answer(answer) for answer in unique)))
+        return answers.map(resolved).reindex(series.index)
+
+@lru_cache(maxsize=1)
+def get_product_normalizer():
+    """Normaliseur partagé (le cache des orthographes persiste entre les analyses)"""
+    return ProductNormalizer()
+
+def count_products(series):
+    """Compte les exploitations citant chaque produit (noms canoniques)"""
+    products = get_product_normalizer().normalize_series(series).dropna().explode().dropna()
+    return products.value_counts()
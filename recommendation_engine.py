@@ -0,0 +1,133 @@
+"""
+Recommandations personnalisées par agriculteur (moteur de règles vectorisé)
+"""
+import pandas as pd
+import numpy as np
+from config import RECOMMENDATION_RULES, RECOMMENDATION_CONFIG, HARMFUL_PRACTICES, REPORTS_DIR
+from impact_analysis import compile_rule, evaluate_rules
+
+def collect_conditions(rules):
+    """Conditions distinctes de toutes les règles et matrice d'incidence (conditions x règles)
+
+    Une condition est soit le nom d'une pratique nuisible (HARMFUL_PRACTICES),
+    soit une règle déclarative de même syntaxe. Une condition partagée par
+    plusieurs recommandations n'est compilée et évaluée qu'une fois.
+    """
+    conditions, keys = {}, []
+    incidence = []
+    for rule in rules.values():
+        members = []
+        for condition in rule['when']:
+            key = condition if isinstance(condition, str) else repr(sorted(condition.items()))
+            if key not in conditions:
+                conditions[key] = compile_rule(HARMFUL_PRACTICES[condition] if isinstance(condition, str) else condition)
+                keys.append(key)
+            members.append(keys.index(key))
+        incidence.append(members)
+
+    matrix = np.zeros((len(keys), len(rules)), dtype=np.float32)
+    for j, members in enumerate(incidence):
+        matrix[members, j] = 1
+    return conditions, matrix
+
+def applicable_rules(df, rules=None):
+    """Matrice booléenne (agriculteurs x recommandations) des recommandations applicables
+
+    Les conditions sont évaluées une fois chacune (colonnes de C); une
+    recommandation s'applique quand toutes ses conditions sont vraies, soit
+    C @ incidence == nombre de conditions.
+    """
+    rules = rules or RECOMMENDATION_RULES
+    conditions, incidence = collect_conditions(rules)
+    condition_matrix = evaluate_rules(df, conditions).astype(np.float32)
+    return condition_matrix @ incidence == incidence.sum(axis=0)
+
+def rank_recommendations(applicable, rules=None, max_per_farmer=None):
+    """Indices des recommandations classées par priorité pour chaque agriculteur (-1 = aucune)
+
+    La clé de tri combine la priorité (1 = la plus urgente) et l'ordre de
+    déclaration; un unique argsort par ligne classe toute la population.
+    """
+    rules = rules or RECOMMENDATION_RULES
+    max_per_farmer = max_per_farmer or RECOMMENDATION_CONFIG['max_per_farmer']
+    priorities = np.array([rule['priority'] for rule in rules.values()])
+    keys = priorities * len(rules) + np.arange(len(rules))
+
+    sort_keys = np.where(applicable, keys, np.iinfo(np.int64).max)
+    ranked = np.argsort(sort_keys, axis=1, kind='stable')[:, :max_per_farmer]
+    return np.where(np.take_along_axis(applicable, ranked, axis=1), ranked, -1)
+
+def recommendation_table(df, ranked, rules=None):
+    """Tableau long (agriculteur, rang, recommandation) pour l'export en masse"""
+    rules = rules or RECOMMENDATION_RULES
+    names = np.array(list(rules))
+    messages = np.array([rule['message'] for rule in rules.values()])
+    categories = np.array([rule['category'] for rule in rules.values()])
+
+    rows, ranks = np.nonzero(ranked >= 0)
+    ids = ranked[rows, ranks]
+    table = pd.DataFrame({'row': rows, 'rank': ranks + 1})
+    for col, name in RECOMMENDATION_CONFIG['id_columns'].items():
+        if col in df.columns:
+            table[name] = df[col].to_numpy()[rows]
+    table['recommendation'] = names[ids]
+    table['category'] = categories[ids]
+    table['message'] = messages[ids]
+    return table
+
+def export_recommendations(table, export_file=None):
+    """Exporte les recommandations par agriculteur (CSV pour les agents de vulgarisation)"""
+    export_file = export_file or REPORTS_DIR / RECOMMENDATION_CONFIG['export_file']
+    table.to_csv(export_file, index=False, encoding='utf-8-sig')
+    print(f"✓ Recommandations exportées : {export_file} ({len(table)} lignes)")
+    return export_file
+
+def generate_recommendation_report(df, export=True):
+    """Évalue toutes les recommandations pour chaque agriculteur et les exporte"""
+
+    print("Calcul des recommandations par agriculteur...")
+
+    applicable = applicable_rules(df)
+    ranked = rank_recommendations(applicable)
+    table = recommendation_table(df, ranked)
+    export_file = export_recommendations(table) if export else None
+
+    counts = applicable.sum(axis=0)
+    per_farmer = applicable.sum(axis=1)
+    by_rule = {
+        name: {
+            'count': int(count),
+            'percentage': count / len(df) * 100 if len(df) > 0 else 0,
+            'priority': rule['priority'],
+            'category': rule['category'],
+            'message': rule['message']
+        }
+        for (name, rule), count in zip(RECOMMENDATION_RULES.items(), counts)
+    }
+
+    report = {
+        'by_rule': by_rule,
+        'export_file': str(export_file) if export_file else None,
+        'summary': {
+            'farmers': len(df),
+            'farmers_with_recommendations': int((per_farmer > 0).sum()),
+            'avg_recommendations': float(per_farmer.mean()) if len(df) > 0 else 0.0,
+            'most_frequent': max(by_rule, key=lambda name: by_rule[name]['count']) if by_rule else None
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DES RECOMMANDATIONS ===")
+    print(f"   - Agriculteurs concernés: {report['summary']['farmers_with_recommendations']}/{len(df)} "
+          f"({report['summary']['avg_recommendations']:.1f} recommandations en moyenne)")
+    for name, data in sorted(by_rule.items(), key=lambda item: (item[1]['priority'], -item[1]['count'])):
+        print(f"   - [P{data['priority']}] {name}: {data['count']} agriculteurs ({data['percentage']:.1f}%)")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_recommendation_report(df)
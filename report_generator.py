@@ -3,46 +3,114 @@ Générateur de rapport PDF complet
 """
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
 from datetime import datetime
-import os
-from config import REPORTS_DIR, GRAPHS_DIR
+from functools import lru_cache
+from config import REPORTS_DIR, GRAPH_CONFIG
+from chart_registry import CHART_REGISTRY
 
-class ReportGenerator:
-    def __init__(self, filename="rapport_analyse_environnementale.pdf"):
-        self.filename = REPORTS_DIR / filename
-        self.doc = SimpleDocTemplate(str(self.filename), pagesize=A4)
-        self.styles = getSampleStyleSheet()
-        self.story = []
+# Textes statiques (identiques dans le rapport national et les rapports par groupe)
+METHODOLOGY_TEXT = """
+        <b>Collecte des données :</b><br/>
+        Les données ont été collectées via des enquêtes terrain auprès des riziculteurs de la vallée du fleuve Sénégal 
+        entre juin et juillet 2025. Un questionnaire structuré a permis de recueillir des informations sur :
         
-        # Styles personnalisés
-        self.title_style = ParagraphStyle(
+        • Les pratiques agricoles et l'utilisation d'intrants<br/>
+        • La consommation d'eau et les méthodes d'irrigation<br/>
+        • L'exposition aux pesticides et les mesures de protection<br/>
+        • Les impacts environnementaux observés<br/>
+        • Les caractéristiques socio-démographiques<br/>
+        
+        <b>Analyse des données :</b><br/>
+        L'analyse a porté sur l'identification des pratiques nuisibles, l'évaluation des impacts environnementaux, 
+        l'analyse de l'exposition sanitaire et l'étude des corrélations socio-démographiques.
+        """
+
+RECOMMENDATIONS_TEXT = """
+        <b>1. Formation et sensibilisation :</b><br/>
+        • Mettre en place des programmes de formation obligatoires sur l'utilisation sécurisée des pesticides<br/>
+        • Développer des supports pédagogiques adaptés aux agriculteurs peu scolarisés<br/>
+        • Organiser des démonstrations pratiques sur le terrain<br/><br/>
+        
+        <b>2. Amélioration des pratiques agricoles :</b><br/>
+        • Promouvoir activement le Système de Riziculture Intensive (SRI)<br/>
+        • Encourager la rotation des cultures et l'utilisation de fertilisants organiques<br/>
+        • Subventionner l'acquisition d'équipements de protection individuelle<br/><br/>
+        
+        <b>3. Gestion environnementale :</b><br/>
+        • Établir un système de collecte et traitement des déchets agrochimiques<br/>
+        • Créer des zones tampons autour des cours d'eau<br/>
+        • Lancer un programme de reboisement des berges<br/><br/>
+        
+        <b>4. Gestion de l'eau :</b><br/>
+        • Moderniser les systèmes d'irrigation pour réduire la consommation<br/>
+        • Promouvoir l'utilisation de l'énergie solaire pour le pompage<br/>
+        • Former les agriculteurs aux techniques d'irrigation économes<br/><br/>
+        
+        <b>5. Protection des groupes vulnérables :</b><br/>
+        • Interdire strictement le travail des enfants dans les rizières<br/>
+        • Fournir des équipements de protection adaptés aux femmes<br/>
+        • Créer des programmes spécifiques pour les jeunes agriculteurs<br/><br/>
+        
+        <b>6. Suivi et évaluation :</b><br/>
+        • Mettre en place un système de monitoring environnemental<br/>
+        • Effectuer des contrôles réguliers de la qualité de l'eau<br/>
+        • Créer une base de données pour suivre l'évolution des pratiques
+        """
+
+@lru_cache(maxsize=1)
+def get_report_styles():
+    """Feuille de styles du rapport (construite une fois par processus, partagée entre documents)"""
+    styles = getSampleStyleSheet()
+    return {
+        'sheet': styles,
+        'title': ParagraphStyle(
             'CustomTitle',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=24,
             textColor=colors.HexColor('#2E86AB'),
             spaceAfter=30,
             alignment=TA_CENTER
-        )
-        
-        self.heading_style = ParagraphStyle(
+        ),
+        'heading': ParagraphStyle(
             'CustomHeading',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=16,
             textColor=colors.HexColor('#2E86AB'),
             spaceAfter=12
-        )
-        
-        self.normal_style = ParagraphStyle(
+        ),
+        'normal': ParagraphStyle(
             'CustomNormal',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=11,
             alignment=TA_JUSTIFY,
             spaceAfter=12
         )
+    }
+
+def draw_draft_mark(canvas, doc):
+    """Mention en pied de page des rapports d'aperçu (graphiques basse résolution)"""
+    canvas.saveState()
+    canvas.setFont('Helvetica-Oblique', 8)
+    canvas.setFillColor(colors.grey)
+    canvas.drawCentredString(A4[0] / 2, 0.4*inch, "APERÇU - version de travail, graphiques basse résolution (non destiné à la diffusion)")
+    canvas.restoreState()
+
+class ReportGenerator:
+    def __init__(self, filename="rapport_analyse_environnementale.pdf"):
+        self.filename = REPORTS_DIR / filename
+        self.doc = SimpleDocTemplate(str(self.filename), pagesize=A4)
+        self.story = []
+        
+        # Styles personnalisés
+        styles = get_report_styles()
+        self.styles = styles['sheet']
+        self.title_style = styles['title']
+        self.heading_style = styles['heading']
+        self.normal_style = styles['normal']
     
     def add_title_page(self, report_data):
         """Ajoute la page de titre"""
@@ -111,21 +179,7 @@ class ReportGenerator:
         """Ajoute la section méthodologie"""
         self.story.append(Paragraph("MÉTHODOLOGIE", self.heading_style))
         
-        methodology_text = """
-        <b>Collecte des données :</b><br/>
-        Les données ont été collectées via des enquêtes terrain auprès des riziculteurs de la vallée du fleuve Sénégal 
-        entre juin et juillet 2025. Un questionnaire structuré a permis de recueillir des informations sur :
-        
-        • Les pratiques agricoles et l'utilisation d'intrants<br/>
-        • La consommation d'eau et les méthodes d'irrigation<br/>
-        • L'exposition aux pesticides et les mesures de protection<br/>
-        • Les impacts environnementaux observés<br/>
-        • Les caractéristiques socio-démographiques<br/>
-        
-        <b>Analyse des données :</b><br/>
-        L'analyse a porté sur l'identification des pratiques nuisibles, l'évaluation des impacts environnementaux, 
-        l'analyse de l'exposition sanitaire et l'étude des corrélations socio-démographiques.
-        """
+        methodology_text = METHODOLOGY_TEXT
         
         methodology = Paragraph(methodology_text, self.normal_style)
         self.story.append(methodology)
@@ -138,12 +192,17 @@ class ReportGenerator:
         if content:
             self.story.append(Paragraph(content, self.normal_style))
         
-        if image_name and os.path.exists(GRAPHS_DIR / image_name):
-            self.story.append(Spacer(1, 0.2*inch))
+        if image_name:
             try:
-                img = Image(str(GRAPHS_DIR / image_name), width=6*inch, height=4*inch)
-                self.story.append(img)
-                self.story.append(Spacer(1, 0.3*inch))
+                # Graphique du registre (rendu en mémoire pendant cette exécution)
+                width, height = (size * inch for size in GRAPH_CONFIG['report_chart_size'])
+                img = CHART_REGISTRY.flowable(image_name, width, height)
+                if img is None:
+                    print(f"⚠️ Graphique manquant dans le rapport: {image_name}")
+                else:
+                    self.story.append(Spacer(1, 0.2*inch))
+                    self.story.append(img)
+                    self.story.append(Spacer(1, 0.3*inch))
             except Exception as e:
                 print(f"⚠️ Impossible de charger l'image {image_name}: {e}")
     
@@ -193,6 +252,38 @@ class ReportGenerator:
             "biodiversite_impact.png"
         )
     
+    def add_biodiversity_section(self, report_data):
+        """Ajoute la section sur les changements de faune et de flore"""
+        summary = report_data.get('summary', {})
+        change_labels = {
+            'disparition': "Disparition d'espèces",
+            'diminution': "Diminution des populations",
+            'augmentation': "Augmentation / prolifération",
+            'deplacement': "Déplacement d'espèces",
+            'pas_de_changement': "Pas de changement"
+        }
+        
+        content = f"""
+        <b>Changements déclarés :</b> {report_data.get('n_respondents', 0)} agriculteurs ont décrit l'évolution 
+        de la faune et de la flore depuis l'installation des rizières.<br/><br/>
+        """
+        
+        for key, label in change_labels.items():
+            content += f"• <b>{label} :</b> {report_data.get('change_counts', {}).get(key, 0)} agriculteurs<br/>"
+        
+        practice, gap = summary.get('strongest_practice_association', ('aucune', 0))
+        content += f"""<br/>
+        Le groupe le plus cité est <b>{summary.get('most_cited_taxon', 'N/A')}</b>. 
+        {summary.get('negative_change_rate', 0):.1f}% des réponses signalent une disparition ou une diminution; 
+        l'écart le plus marqué concerne la pratique <b>{practice}</b> ({gap:+.1f} points par rapport aux autres agriculteurs).
+        """
+        
+        self.add_section_with_image(
+            "BIODIVERSITÉ : FAUNE ET FLORE",
+            content,
+            "biodiversite_pratiques.png"
+        )
+    
     def add_health_exposure_section(self, report_data):
         """Ajoute la section sur l'exposition sanitaire"""
         pesticide = report_data.get('pesticide_exposure', {})
@@ -228,12 +319,16 @@ class ReportGenerator:
         irrigation = report_data.get('irrigation', {})
         management = report_data.get('management', {})
         summary = report_data.get('summary', {})
+        monte_carlo = report_data.get('monte_carlo', {}).get('total_volume_m3', {})
         
         content = f"""
         <b>Consommation d'eau :</b><br/>
         • Moyenne : {consumption.get('statistics', {}).get('mean', 0):,.0f} m³/ha<br/>
-        • Volume total estimé : {consumption.get('total_estimation', {}).get('total_water_volume_m3', 0):,.0f} m³<br/>
-        • Surconsommation (>16250 m³/ha) : {summary.get('high_consumption_percentage', 0):.1f}% des agriculteurs<br/><br/>
+        • Volume total estimé par campagne : {consumption.get('total_estimation', {}).get('total_water_volume_m3', 0):,.0f} m³<br/>
+        • Volume annuel estimé (campagnes déclarées) : {consumption.get('total_estimation', {}).get('annual_water_volume_m3', 0):,.0f} m³<br/>
+        • Surconsommation (>16250 m³/ha) : {summary.get('high_consumption_percentage', 0):.1f}% des agriculteurs<br/>
+        • Volume annuel (Monte Carlo) : {monte_carlo.get('median', 0):,.0f} m³ 
+        (intervalle {monte_carlo.get('low', 0):,.0f} - {monte_carlo.get('high', 0):,.0f} m³)<br/><br/>
         
         <b>Méthodes d'irrigation :</b><br/>
         • Pompage : {irrigation.get('efficiency_indicators', {}).get('pompage_percentage', 0):.1f}%<br/>
@@ -251,6 +346,12 @@ class ReportGenerator:
             content,
             "consommation_eau.png"
         )
+        
+        self.add_section_with_image(
+            "",
+            "",
+            "volume_eau_monte_carlo.png"
+        )
     
     def add_correlation_section(self, report_data):
         """Ajoute la section sur les corrélations"""
@@ -262,10 +363,16 @@ class ReportGenerator:
         <b>Corrélations identifiées :</b><br/>
         
         • <b>Niveau d'éducation :</b> {('Corrélation significative' if education.get('correlation_stats', {}).get('significant', False) else 'Pas de corrélation significative')} 
-        avec l'exposition aux pesticides (tendance {education.get('trend', 'N/A')})<br/><br/>
+        avec l'exposition aux pesticides (tendance {education.get('trend', 'N/A')}; 
+        p = {education.get('correlation_stats', {}).get('p_value', float('nan')):.3f}, p de permutation = {education.get('correlation_stats', {}).get('permutation_p_value', float('nan')):.3f})<br/><br/>
         
         • <b>Âge :</b> Coefficient de corrélation = {age.get('correlation_stats', {}).get('pearson_r', 0):.3f} 
-        {('(significatif)' if age.get('correlation_stats', {}).get('significant', False) else '(non significatif)')}<br/><br/>
+        {('(significatif)' if age.get('correlation_stats', {}).get('significant', False) else '(non significatif)')} 
+        — p = {age.get('correlation_stats', {}).get('p_value', float('nan')):.3f}, p de permutation = {age.get('correlation_stats', {}).get('permutation_p_value', float('nan')):.3f}<br/><br/>
+        
+        • <b>Balayage facteurs × indicateurs :</b> {report_data.get('summary', {}).get('scan_tests', 0)} tests, 
+        {len(report_data.get('summary', {}).get('scan_significant', []))} associations significatives après correction FDR 
+        {('(' + ', '.join(f'{factor} × {outcome}' for factor, outcome in report_data.get('summary', {}).get('scan_significant', [])[:5]) + ')') if report_data.get('summary', {}).get('scan_significant') else ''}<br/><br/>
         
         • <b>Profils à risque :</b> {combined.get('high_risk_profile', {}).get('count', 0)} agriculteurs identifiés comme à haut risque<br/>
         Âge moyen : {combined.get('high_risk_profile', {}).get('avg_age', 0):.1f} ans<br/><br/>
@@ -283,44 +390,131 @@ class ReportGenerator:
             "analyse_sociodemographique.png"
         )
     
-    def add_recommendations(self):
-        """Ajoute les recommandations finales"""
-        self.story.append(PageBreak())
-        self.story.append(Paragraph("RECOMMANDATIONS", self.heading_style))
+    def add_risk_model_section(self, report_data):
+        """Ajoute la section sur le modèle de risque par agriculteur"""
+        summary = report_data.get('summary', {})
+        if not summary.get('fitted', False):
+            return
+        target = ("d'un accident ou d'une intoxication liés aux produits chimiques" if report_data.get('target') == 'incident'
+                  else "de correspondre au profil à risque (exposition élevée, protection insuffisante)")
         
-        recommendations = """
-        <b>1. Formation et sensibilisation :</b><br/>
-        • Mettre en place des programmes de formation obligatoires sur l'utilisation sécurisée des pesticides<br/>
-        • Développer des supports pédagogiques adaptés aux agriculteurs peu scolarisés<br/>
-        • Organiser des démonstrations pratiques sur le terrain<br/><br/>
+        content = f"""
+        Une régression logistique régularisée estime pour chaque agriculteur la probabilité 
+        {target} 
+        ({summary.get('positive_rate', 0):.1f}% de cas observés, AUC en validation croisée {summary.get('cv_auc', 0):.2f}).<br/><br/>
+        • <b>Agriculteurs à risque :</b> {summary.get('high_risk_count', 0)} selon le modèle, 
+        contre {summary.get('rule_high_risk_count', 0)} selon la règle fixe (exposition et protection)<br/>
+        • <b>Facteurs les plus influents :</b> {', '.join(summary.get('top_factors', []))}<br/>
+        """
         
-        <b>2. Amélioration des pratiques agricoles :</b><br/>
-        • Promouvoir activement le Système de Riziculture Intensive (SRI)<br/>
-        • Encourager la rotation des cultures et l'utilisation de fertilisants organiques<br/>
-        • Subventionner l'acquisition d'équipements de protection individuelle<br/><br/>
+        self.add_section_with_image("MODÈLE DE RISQUE PAR AGRICULTEUR", content)
+    
+    def add_association_section(self, report_data):
+        """Ajoute la section sur les associations entre questions catégorielles"""
+        summary = report_data.get('summary', {})
         
-        <b>3. Gestion environnementale :</b><br/>
-        • Établir un système de collecte et traitement des déchets agrochimiques<br/>
-        • Créer des zones tampons autour des cours d'eau<br/>
-        • Lancer un programme de reboisement des berges<br/><br/>
+        content = f"""
+        La force d'association entre {summary.get('n_questions', 0)} questions catégorielles 
+        ({summary.get('n_pairs', 0)} paires) est mesurée par le V de Cramér corrigé et l'information mutuelle. 
+        {summary.get('strong_associations', 0)} paires présentent une association forte (V ≥ 0,5).<br/><br/>
+        <b>Associations les plus fortes :</b><br/>
+        """
         
-        <b>4. Gestion de l'eau :</b><br/>
-        • Moderniser les systèmes d'irrigation pour réduire la consommation<br/>
-        • Promouvoir l'utilisation de l'énergie solaire pour le pompage<br/>
-        • Former les agriculteurs aux techniques d'irrigation économes<br/><br/>
+        for pair in report_data.get('top_pairs', [])[:8]:
+            content += (f"• {pair.get('question_1', '').strip()[:60]} × {pair.get('question_2', '').strip()[:60]} : "
+                        f"V = {pair.get('cramers_v', 0):.2f}<br/>")
         
-        <b>5. Protection des groupes vulnérables :</b><br/>
-        • Interdire strictement le travail des enfants dans les rizières<br/>
-        • Fournir des équipements de protection adaptés aux femmes<br/>
-        • Créer des programmes spécifiques pour les jeunes agriculteurs<br/><br/>
+        self.add_section_with_image(
+            "ASSOCIATIONS ENTRE QUESTIONS",
+            content,
+            "associations_categorielles.png"
+        )
+    
+    def add_trend_section(self, report_data):
+        """Ajoute la section sur l'évolution temporelle des indicateurs"""
+        summary = report_data.get('summary', {})
         
-        <b>6. Suivi et évaluation :</b><br/>
-        • Mettre en place un système de monitoring environnemental<br/>
-        • Effectuer des contrôles réguliers de la qualité de l'eau<br/>
-        • Créer une base de données pour suivre l'évolution des pratiques
+        content = f"""
+        <b>Période couverte :</b> {summary.get('period_start', 'N/A')} - {summary.get('period_end', 'N/A')} 
+        ({summary.get('windows', 0)} fenêtres, moyenne glissante sur {report_data.get('rolling_windows', 0)} fenêtres)<br/><br/>
+        """
+        
+        for name, data in report_data.get('indicators', {}).items():
+            content += f"• <b>{data.get('label', name)} :</b> {data.get('first', 0):.1f} → {data.get('last', 0):.1f}<br/>"
+        
+        self.add_section_with_image(
+            "ÉVOLUTION TEMPORELLE",
+            content,
+            "tendances_temporelles.png"
+        )
+    
+    def add_threshold_sweep_section(self, report_data):
+        """Ajoute la section de sensibilité aux seuils d'analyse"""
+        content = """
+        Les indicateurs principaux dépendent des seuils fixés dans la configuration. 
+        Les courbes ci-dessous montrent leur évolution sur une plage de seuils :<br/><br/>
+        """
+        
+        for key, curve in report_data.get('curves', {}).items():
+            percentages = curve.get('percentages', [0])
+            content += (f"• <b>{curve.get('label', key)} :</b> {curve.get('current_percentage', 0):.1f}% au seuil actuel "
+                        f"({curve.get('current_threshold', 0):g}), de {min(percentages):.1f}% à {max(percentages):.1f}% selon le seuil<br/>")
+        
+        self.add_section_with_image(
+            "SENSIBILITÉ AUX SEUILS",
+            content,
+            "analyse_seuils.png"
+        )
+    
+    def add_sensitivity_section(self, report_data):
+        """Ajoute la section de robustesse du score d'exposition"""
+        robustness = report_data.get('robustness', {})
+        labels = {
+            'high_exposure': "Exposition élevée",
+            'medium_exposure': "Exposition moyenne",
+            'high_risk_profile': "Profils à haut risque"
+        }
+        
+        content = f"""
+        Les facteurs de protection par équipement et la contribution du score de présence des pesticides 
+        dans les canaux ont été perturbés sur {report_data.get('n_evaluations', 0)} jeux de paramètres 
+        (indices de Sobol).<br/><br/>
         """
         
+        for key, label in labels.items():
+            data = robustness.get(key, {})
+            content += (f"• <b>{label} :</b> {data.get('nominal', 0)} agriculteurs "
+                        f"(intervalle P5-P95 : {data.get('low', 0):.0f} - {data.get('high', 0):.0f})<br/>")
+        
+        content += f"<br/>Paramètre le plus influent : {report_data.get('summary', {}).get('most_influential_parameter', 'N/A')}"
+        
+        self.add_section_with_image(
+            "ROBUSTESSE DU SCORE D'EXPOSITION",
+            content
+        )
+    
+    def add_recommendations(self, recommendation_report=None):
+        """Ajoute les recommandations finales (et le bilan des recommandations personnalisées)"""
+        self.story.append(PageBreak())
+        self.story.append(Paragraph("RECOMMANDATIONS", self.heading_style))
+        
+        recommendations = RECOMMENDATIONS_TEXT
+        
         self.story.append(Paragraph(recommendations, self.normal_style))
+        
+        if recommendation_report:
+            summary = recommendation_report.get('summary', {})
+            targeted = f"""
+            <b>Recommandations personnalisées :</b> {summary.get('farmers_with_recommendations', 0)} agriculteurs sur 
+            {summary.get('farmers', 0)} reçoivent au moins une recommandation 
+            ({summary.get('avg_recommendations', 0):.1f} en moyenne), listées par agriculteur dans le fichier d'export.<br/>
+            """
+            by_rule = recommendation_report.get('by_rule', {})
+            for name, data in sorted(by_rule.items(), key=lambda item: (item[1].get('priority', 0), -item[1].get('count', 0))):
+                if data.get('count', 0) > 0:
+                    targeted += f"• [Priorité {data.get('priority', 0)}] {data.get('message', 'N/A')} : {data.get('count', 0)} agriculteurs<br/>"
+            self.story.append(Spacer(1, 0.2*inch))
+            self.story.append(Paragraph(targeted, self.normal_style))
     
     def generate_report(self, all_reports):
         """Génère le rapport complet"""
@@ -344,6 +538,10 @@ class ReportGenerator:
                 self.add_environmental_impact_section(all_reports['impact'])
                 self.story.append(PageBreak())
             
+            if 'biodiversity' in all_reports:
+                self.add_biodiversity_section(all_reports['biodiversity'])
+                self.story.append(PageBreak())
+            
             if 'health' in all_reports:
                 self.add_health_exposure_section(all_reports['health'])
                 self.story.append(PageBreak())
@@ -355,11 +553,32 @@ class ReportGenerator:
             if 'correlation' in all_reports:
                 self.add_correlation_section(all_reports['correlation'])
             
+            if 'risk_model' in all_reports:
+                self.add_risk_model_section(all_reports['risk_model'])
+            
+            if 'associations' in all_reports:
+                self.story.append(PageBreak())
+                self.add_association_section(all_reports['associations'])
+            
+            if 'trends' in all_reports:
+                self.story.append(PageBreak())
+                self.add_trend_section(all_reports['trends'])
+            
+            if 'thresholds' in all_reports:
+                self.story.append(PageBreak())
+                self.add_threshold_sweep_section(all_reports['thresholds'])
+            
+            if 'sensitivity' in all_reports:
+                self.add_sensitivity_section(all_reports['sensitivity'])
+            
             # Recommandations
-            self.add_recommendations()
+            self.add_recommendations(all_reports.get('recommendations'))
             
-            # Générer le PDF
-            self.doc.build(self.story)
+            # Générer le PDF (mention « aperçu » sur chaque page du rapport de travail)
+            if GRAPH_CONFIG['draft_report']:
+                self.doc.build(self.story, onFirstPage=draw_draft_mark, onLaterPages=draw_draft_mark)
+            else:
+                self.doc.build(self.story)
             print(f"✓ Rapport généré : {self.filename}")
             
         except Exception as e:
@@ -0,0 +1,275 @@
+"""
+Modèle de risque par agriculteur (régression logistique régularisée L2)
+"""
+import re
+import hashlib
+import pandas as pd
+import numpy as np
+from scipy import optimize
+from scipy.special import expit
+from config import RISK_MODEL_CONFIG, THRESHOLDS, REPORTS_DIR
+from text_index import fold_text
+from data_loader import first_answer
+
+NEGATIVE_ANSWER_PATTERN = re.compile(RISK_MODEL_CONFIG['negative_answer_pattern'])
+POSITIVE_ANSWER_PATTERN = re.compile(RISK_MODEL_CONFIG['positive_answer_pattern'])
+
+def build_risk_target(df):
+    """Variable à prédire (1 = à risque, NaN = non renseigné)
+
+    'incident' : l'agriculteur rapporte un accident ou une intoxication (« oui »,
+    « intoxication », « mort »...) ou non (« non », « néant », « pas de cas »...);
+    les réponses inexploitables restent non renseignées.
+    'high_risk_rule' : profil à risque défini par la règle fixe (exposition
+    élevée et protection insuffisante).
+    """
+    if RISK_MODEL_CONFIG['target'] == 'high_risk_rule':
+        rule = (df['Pesticide_exposure_score'] > THRESHOLDS['pesticide_exposure_risk']) & \
+               (df['Protection_factor'] >= THRESHOLDS['protection_insufficient'])
+        return rule.astype(float)
+
+    answers = first_answer(df, RISK_MODEL_CONFIG['incident_columns'])
+    return answers.dropna().astype(str).map(classify_answer).astype(float).reindex(df.index)
+
+def classify_answer(answer):
+    """1 si la réponse rapporte un cas, 0 si elle le nie, NaN si elle est inexploitable"""
+    answer = fold_text(answer).strip()
+    if NEGATIVE_ANSWER_PATTERN.match(answer):
+        return 0.0
+    if POSITIVE_ANSWER_PATTERN.search(answer):
+        return 1.0
+    return np.nan
+
+def feature_frame(df):
+    """Variables explicatives brutes (numériques et catégorielles) d'après la configuration"""
+    features = {}
+    for name, col in RISK_MODEL_CONFIG['numeric_features'].items():
+        features[name] = pd.to_numeric(df[col], errors='coerce') if col in df.columns else pd.Series(np.nan, index=df.index)
+    for name, columns in RISK_MODEL_CONFIG['categorical_features'].items():
+        features[name] = first_answer(df, columns if isinstance(columns, list) else [columns])
+    return pd.DataFrame(features, index=df.index)
+
+class RiskModel:
+    """Régression logistique sur variables standardisées et codage disjonctif
+
+    Les paramètres de prétraitement (moyennes, écarts-types, modalités) sont
+    figés à l'apprentissage : noter de nouvelles soumissions revient à
+    construire leur matrice de variables puis à faire un seul produit matriciel.
+    """
+
+    def __init__(self, l2=None):
+        self.l2 = RISK_MODEL_CONFIG['l2'] if l2 is None else l2
+        self.means = {}
+        self.scales = {}
+        self.levels = {}
+        self.feature_names = []
+        self.coef = None
+        self.intercept = 0.0
+        self.converged = False
+        self.fingerprint = None
+
+    def _learn_preprocessing(self, features):
+        self.feature_names = []
+        for name in RISK_MODEL_CONFIG['numeric_features']:
+            values = features[name].astype(float)
+            self.means[name] = values.mean() if values.notna().any() else 0.0
+            std = values.std()
+            self.scales[name] = std if std > 0 else 1.0
+            self.feature_names += [name, f'{name}_manquant']
+        for name in RISK_MODEL_CONFIG['categorical_features']:
+            counts = features[name].value_counts()
+            self.levels[name] = list(counts[counts >= RISK_MODEL_CONFIG['min_level_count']].index)
+            self.feature_names += [f'{name}={level}' for level in self.levels[name]]
+
+    def design_matrix(self, features):
+        """Matrice (agriculteurs x variables) : numériques imputées et standardisées, indicateurs de modalité"""
+        blocks = []
+        for name in RISK_MODEL_CONFIG['numeric_features']:
+            values = features[name].astype(float).to_numpy()
+            missing = np.isnan(values)
+            blocks.append(np.where(missing, 0.0, (values - self.means[name]) / self.scales[name]))
+            blocks.append(missing.astype(float))
+        for name in RISK_MODEL_CONFIG['categorical_features']:
+            codes = pd.Categorical(features[name], categories=self.levels[name]).codes
+            onehot = np.zeros((len(features), len(self.levels[name])))
+            known = np.flatnonzero(codes >= 0)
+            onehot[known, codes[known]] = 1.0
+            blocks.append(onehot)
+        return np.column_stack(blocks) if blocks else np.zeros((len(features), 0))
+
+    def fit(self, features, target):
+        """Apprentissage par L-BFGS (log-vraisemblance pénalisée, gradient analytique)"""
+        self._learn_preprocessing(features)
+        X = self.design_matrix(features)
+        y = np.asarray(target, dtype=float)
+        n, p = X.shape
+
+        def loss(params):
+            w, b = params[:p], params[p]
+            z = X @ w + b
+            # log(1 + exp(z)) - y z, stable numériquement
+            value = (np.logaddexp(0, z) - y * z).sum() / n + 0.5 * self.l2 * (w @ w) / n
+            residual = (expit(z) - y) / n
+            gradient = np.append(X.T @ residual + self.l2 * w / n, residual.sum())
+            return value, gradient
+
+        result = optimize.minimize(loss, np.zeros(p + 1), jac=True, method='L-BFGS-B',
+                                   options={'maxiter': RISK_MODEL_CONFIG['max_iter']})
+        self.coef, self.intercept = result.x[:p], result.x[p]
+        self.converged = bool(result.success)
+        return self
+
+    def score_matrix(self, X):
+        """Probabilités de risque d'une matrice de variables déjà construite"""
+        return expit(X @ self.coef + self.intercept)
+
+    def score(self, df):
+        """Probabilité de risque de chaque agriculteur d'un DataFrame"""
+        return self.score_matrix(self.design_matrix(feature_frame(df)))
+
+    def coefficients(self):
+        """Coefficients classés par importance (valeur absolue)"""
+        coefficients = pd.Series(self.coef, index=self.feature_names)
+        return coefficients.reindex(coefficients.abs().sort_values(ascending=False).index)
+
+def training_fingerprint(features, target):
+    """Empreinte des données d'apprentissage et de la configuration (validité du modèle persisté)"""
+    digest = hashlib.sha1(repr(sorted((k, str(v)) for k, v in RISK_MODEL_CONFIG.items())).encode())
+    digest.update(pd.util.hash_pandas_object(features.astype('string'), index=False).to_numpy().tobytes())
+    digest.update(np.nan_to_num(np.asarray(target, dtype=float), nan=-1).tobytes())
+    return digest.hexdigest()
+
+def load_or_fit_model(df, model_file=None):
+    """Charge les coefficients persistés s'ils correspondent aux données, sinon réapprend le modèle"""
+    model_file = model_file or RISK_MODEL_CONFIG['model_file']
+    features, target = feature_frame(df), build_risk_target(df)
+    labelled = target.notna()
+    fingerprint = training_fingerprint(features[labelled], target[labelled])
+
+    if model_file.exists():
+        try:
+            model = pd.read_pickle(model_file)
+            if isinstance(model, RiskModel) and model.fingerprint == fingerprint:
+                return model
+        except Exception as e:
+            print(f"⚠️ Modèle de risque illisible, réapprentissage: {e}")
+
+    if target[labelled].nunique() < 2:
+        print("⚠️ Une seule classe observée, modèle de risque non appris")
+        return None
+
+    model = RiskModel().fit(features[labelled], target[labelled])
+    model.fingerprint = fingerprint
+    pd.to_pickle(model, model_file)
+    print(f"✓ Modèle de risque appris sur {labelled.sum()} agriculteurs ({len(model.feature_names)} variables)")
+    return model
+
+def roc_auc(target, scores):
+    """Aire sous la courbe ROC (statistique de Mann-Whitney, rangs moyens pour les ex aequo)"""
+    target = np.asarray(target, dtype=bool)
+    n_pos, n_neg = target.sum(), (~target).sum()
+    if n_pos == 0 or n_neg == 0:
+        return np.nan
+    ranks = pd.Series(scores).rank().to_numpy()
+    return (ranks[target].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+def cross_validated_auc(features, target, n_folds=None, seed=None):
+    """AUC des probabilités prédites hors échantillon (validation croisée stratifiée)
+
+    Le nombre de plis est réduit à l'effectif de la classe minoritaire;
+    retourne (AUC, nombre de plis effectivement utilisés).
+    """
+    n_folds = n_folds or RISK_MODEL_CONFIG['cv_folds']
+    seed = RISK_MODEL_CONFIG['seed'] if seed is None else seed
+    y = np.asarray(target, dtype=float)
+    n_folds = min(n_folds, int((y == 1).sum()), int((y == 0).sum()))
+    if n_folds < 2:
+        return np.nan, n_folds
+
+    # Plis stratifiés : chaque classe est mélangée puis répartie à tour de rôle
+    rng = np.random.default_rng(seed)
+    folds = np.empty(len(y), dtype=int)
+    for label in (0.0, 1.0):
+        rows = rng.permutation(np.flatnonzero(y == label))
+        folds[rows] = np.arange(len(rows)) % n_folds
+
+    predictions = np.empty(len(y))
+    for fold in range(n_folds):
+        train = folds != fold
+        model = RiskModel().fit(features[train], y[train])
+        predictions[~train] = model.score_matrix(model.design_matrix(features[~train]))
+    return roc_auc(y, predictions), n_folds
+
+def export_risk_table(risk_table, export_file=None):
+    """Exporte la probabilité de risque de chaque agriculteur (CSV)"""
+    export_file = export_file or REPORTS_DIR / RISK_MODEL_CONFIG['export_file']
+    risk_table.to_csv(export_file, index=False, encoding='utf-8-sig')
+    print(f"✓ Risque par agriculteur exporté : {export_file} ({len(risk_table)} lignes)")
+    return export_file
+
+def generate_risk_model_report(df, export=True):
+    """Apprend (ou recharge) le modèle de risque et note chaque agriculteur"""
+
+    print("Modélisation du risque par agriculteur...")
+
+    model = load_or_fit_model(df)
+    target = build_risk_target(df)
+    if model is None:
+        return {'risk_table': [], 'coefficients': {}, 'export_file': None, 'summary': {'fitted': False, 'high_risk_count': 0}}
+
+    probabilities = model.score(df)
+    threshold = RISK_MODEL_CONFIG['high_risk_threshold']
+    rule = (df['Pesticide_exposure_score'] > THRESHOLDS['pesticide_exposure_risk']) & \
+           (df['Protection_factor'] >= THRESHOLDS['protection_insufficient'])
+
+    risk_table = pd.DataFrame({
+        'row': np.arange(len(df)),
+        'uuid': df['_uuid'].to_numpy() if '_uuid' in df.columns else None,
+        'village': df['village'].to_numpy() if 'village' in df.columns else None,
+        'risk_probability': probabilities,
+        'high_risk': probabilities >= threshold,
+        'high_risk_rule': rule.to_numpy(),
+        'observed': target.to_numpy()
+    }).sort_values('risk_probability', ascending=False, kind='stable')
+
+    labelled = target.notna().to_numpy()
+    coefficients = model.coefficients()
+    cv_auc, cv_folds = cross_validated_auc(feature_frame(df)[labelled], target[labelled])
+    export_file = export_risk_table(risk_table) if export else None
+
+    report = {
+        'target': RISK_MODEL_CONFIG['target'],
+        'risk_table': risk_table.to_dict('records'),
+        'coefficients': coefficients.to_dict(),
+        'export_file': str(export_file) if export_file else None,
+        'summary': {
+            'fitted': True,
+            'converged': model.converged,
+            'training_size': int(labelled.sum()),
+            'positive_rate': float(target[labelled].mean() * 100),
+            'cv_auc': cv_auc,
+            'cv_folds': cv_folds,
+            'high_risk_count': int((probabilities >= threshold).sum()),
+            'rule_high_risk_count': int(rule.sum()),
+            'top_factors': list(coefficients.index[:5])
+        }
+    }
+
+    # Afficher le résumé
+    summary = report['summary']
+    print("\n=== RÉSUMÉ DU MODÈLE DE RISQUE ===")
+    print(f"   - Cible: {RISK_MODEL_CONFIG['target']} ({summary['positive_rate']:.1f}% de cas sur {summary['training_size']} agriculteurs renseignés)")
+    print(f"   - AUC en validation croisée ({summary['cv_folds']} plis): {summary['cv_auc']:.2f}")
+    print(f"   - Agriculteurs à risque (p >= {threshold:.2f}): {summary['high_risk_count']} (règle fixe: {summary['rule_high_risk_count']})")
+    for name, value in coefficients.head(5).items():
+        print(f"   - {name}: {value:+.2f}")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        import risk_model  # classe du module (et non de __main__) dans le modèle persisté
+        report = risk_model.generate_risk_model_report(df)
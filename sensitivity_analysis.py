@@ -0,0 +1,149 @@
+"""
+Analyse de sensibilité du score d'exposition aux pesticides
+"""
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from config import THRESHOLDS, PROTECTION_WEIGHTS, DEFAULT_PROTECTION_WEIGHT, SENSITIVITY_CONFIG
+
+CANAL_COLUMN = 'sur une echelle de 1 a 100 notez la présence des pesticides dans les canaux'
+PROTECTION_COLUMN = 'quels equipements de protection utilisez vous lors de l\'application de pesticides ou d\'engrais?'
+
+# Paramètres du modèle: un facteur par équipement, le facteur par défaut et le poids du score canal
+PARAMETER_NAMES = list(PROTECTION_WEIGHTS) + ['non_reconnu', 'poids_canal']
+NOMINAL_PARAMETERS = np.array(list(PROTECTION_WEIGHTS.values()) + [DEFAULT_PROTECTION_WEIGHT, 1.0])
+
+OUTPUTS = ['high_exposure', 'medium_exposure', 'high_risk_profile']
+
+def build_design(df):
+    """Prépare les entrées fixes du modèle: score canal et codage one-hot de l'équipement"""
+    canal = pd.to_numeric(df[CANAL_COLUMN], errors='coerce').fillna(0).to_numpy(dtype=float) if CANAL_COLUMN in df.columns else np.zeros(len(df))
+
+    equipment = df[PROTECTION_COLUMN] if PROTECTION_COLUMN in df.columns else pd.Series(np.nan, index=df.index)
+    categories = list(PROTECTION_WEIGHTS)
+    codes = pd.Categorical(equipment, categories=categories).codes
+    codes = np.where(codes < 0, len(categories), codes)  # équipement non reconnu -> facteur par défaut
+
+    onehot = np.zeros((len(df), len(categories) + 1))
+    onehot[np.arange(len(df)), codes] = 1.0
+    return canal, onehot
+
+def parameter_bounds():
+    """Bornes de variation de chaque paramètre"""
+    perturbation = SENSITIVITY_CONFIG['weight_perturbation']
+    weights = NOMINAL_PARAMETERS[:-1]
+    lows = np.append(np.clip(weights * (1 - perturbation), 0, 1), SENSITIVITY_CONFIG['canal_weight_range'][0])
+    highs = np.append(np.clip(weights * (1 + perturbation), 0, 1), SENSITIVITY_CONFIG['canal_weight_range'][1])
+    return lows, highs
+
+def evaluate_parameter_sets(canal, onehot, params):
+    """Évalue un lot de jeux de paramètres (P x d) par produits matriciels
+
+    Retourne une matrice (P x sorties) : exposition élevée, moyenne et profils à haut risque.
+    """
+    protection = onehot @ params[:, :-1].T                 # exploitations x P
+    scores = canal[:, None] * protection * params[:, -1]   # exploitations x P
+
+    high = scores > THRESHOLDS['pesticide_exposure_risk']
+    medium = (scores > THRESHOLDS['pesticide_exposure_medium']) & ~high
+    high_risk = high & (protection >= THRESHOLDS['protection_insufficient'])
+
+    return np.column_stack([high.sum(axis=0), medium.sum(axis=0), high_risk.sum(axis=0)])
+
+def evaluate_in_batches(canal, onehot, params, batch_size=None, n_jobs=None):
+    """Évalue de nombreux jeux de paramètres par lots, éventuellement dans un pool de processus"""
+    batch_size = batch_size or SENSITIVITY_CONFIG['batch_size']
+    n_jobs = n_jobs or SENSITIVITY_CONFIG['n_jobs']
+    batches = [params[i:i + batch_size] for i in range(0, len(params), batch_size)]
+    evaluate = partial(evaluate_parameter_sets, canal, onehot)
+
+    if n_jobs > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(evaluate, batches))
+    else:
+        results = [evaluate(batch) for batch in batches]
+
+    return np.vstack(results) if results else np.zeros((0, len(OUTPUTS)))
+
+def sobol_indices(canal, onehot, n_base=None, seed=None):
+    """Indices de Sobol du premier ordre et totaux (estimateurs de Saltelli et Jansen)
+
+    Les n x (d + 2) jeux de paramètres sont générés puis évalués en une seule passe
+    par lots.
+    """
+    n_base = n_base or SENSITIVITY_CONFIG['n_base_samples']
+    seed = SENSITIVITY_CONFIG['seed'] if seed is None else seed
+    rng = np.random.default_rng(seed)
+    lows, highs = parameter_bounds()
+    d = len(lows)
+
+    a = lows + (highs - lows) * rng.random((n_base, d))
+    b = lows + (highs - lows) * rng.random((n_base, d))
+    ab = np.repeat(a[None, :, :], d, axis=0)
+    ab[np.arange(d), :, np.arange(d)] = b[:, np.arange(d)].T   # AB_i: colonne i prise dans B
+
+    outputs = evaluate_in_batches(canal, onehot, np.vstack([a, b, ab.reshape(-1, d)]))
+    f_a, f_b = outputs[:n_base], outputs[n_base:2 * n_base]
+    f_ab = outputs[2 * n_base:].reshape(d, n_base, -1)
+
+    variance = np.var(np.vstack([f_a, f_b]), axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first_order = np.where(variance > 0, np.mean(f_b * (f_ab - f_a), axis=1) / variance, 0.0)
+        total = np.where(variance > 0, 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / variance, 0.0)
+
+    return {
+        'samples': np.vstack([f_a, f_b]),
+        'first_order': pd.DataFrame(first_order, index=PARAMETER_NAMES, columns=OUTPUTS),
+        'total': pd.DataFrame(total, index=PARAMETER_NAMES, columns=OUTPUTS)
+    }
+
+def generate_sensitivity_report(df):
+    """Génère le rapport de robustesse des comptes d'exposition élevée"""
+
+    print("Analyse de sensibilité du score d'exposition...")
+
+    canal, onehot = build_design(df)
+    nominal = evaluate_parameter_sets(canal, onehot, NOMINAL_PARAMETERS[None, :])[0]
+    sobol = sobol_indices(canal, onehot)
+    samples = sobol['samples']
+
+    robustness = {
+        output: {
+            'nominal': int(nominal[k]),
+            'mean': float(samples[:, k].mean()),
+            'low': float(np.percentile(samples[:, k], 5)),
+            'high': float(np.percentile(samples[:, k], 95)),
+            'probability_change': float((samples[:, k] != nominal[k]).mean() * 100)
+        }
+        for k, output in enumerate(OUTPUTS)
+    }
+
+    report = {
+        'parameter_bounds': dict(zip(PARAMETER_NAMES, zip(*(bound.tolist() for bound in parameter_bounds())))),
+        'n_evaluations': len(samples) + len(PARAMETER_NAMES) * len(samples) // 2,
+        'robustness': robustness,
+        'first_order': sobol['first_order'].to_dict(),
+        'total_order': sobol['total'].to_dict(),
+        'summary': {
+            'high_exposure_interval': (robustness['high_exposure']['low'], robustness['high_exposure']['high']),
+            'most_influential_parameter': sobol['total']['high_exposure'].idxmax() if sobol['total']['high_exposure'].max() > 0 else 'aucun'
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DE L'ANALYSE DE SENSIBILITÉ ===")
+    print(f"   - Jeux de paramètres évalués: {report['n_evaluations']}")
+    for output, data in robustness.items():
+        print(f"   - {output}: {data['nominal']} (P5-P95: {data['low']:.0f} - {data['high']:.0f}, "
+              f"modifié dans {data['probability_change']:.1f}% des scénarios)")
+    print(f"   - Paramètre le plus influent: {report['summary']['most_influential_parameter']}")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_sensitivity_report(df)
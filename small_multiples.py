@@ -0,0 +1,187 @@
+"""
+Petits multiples : indicateurs par village, commune ou enquêteur sur des planches de panneaux
+"""
+import re
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.patches import Patch, Rectangle
+from matplotlib.lines import Line2D
+from matplotlib.transforms import IdentityTransform
+from config import SMALL_MULTIPLES_CONFIG, GRAPH_CONFIG, HARMFUL_PRACTICES
+from batch_reports import compute_group_aggregates, practice_labels, unique_filenames
+from text_index import fold_text
+
+class SmallMultiples:
+    """Grille de panneaux créée une fois et réutilisée pour toutes les tranches
+
+    La figure, les axes, les barres et les textes sont construits une seule
+    fois; le fond statique (axes, graduations, légende, repères de l'ensemble)
+    est rendu une fois puis restauré pour chaque planche. Seuls les artistes
+    animés (hauteurs des barres, titres) sont mis à jour en place et redessinés
+    (blitting sur le canevas Agg). Le rendu du texte étant le poste le plus
+    coûteux, chaque panneau n'a qu'un texte variable (titre et effectif).
+    """
+
+    def __init__(self, labels, reference=None, rows=None, cols=None, ylim=(0, 100), ylabel='%'):
+        self.rows = rows or SMALL_MULTIPLES_CONFIG['rows']
+        self.cols = cols or SMALL_MULTIPLES_CONFIG['cols']
+        width, height = SMALL_MULTIPLES_CONFIG['panel_size']
+        colors = [GRAPH_CONFIG['colors'][i % len(GRAPH_CONFIG['colors'])] for i in range(len(labels))]
+        small_size = GRAPH_CONFIG['legend_size'] - 2
+        legend_height = 0.22 * np.ceil((len(labels) + (reference is not None)) / 2) + 0.2   # pouces, légende sur 2 colonnes
+
+        self.fig = Figure(figsize=(self.cols * width, self.rows * height + legend_height), dpi=SMALL_MULTIPLES_CONFIG['dpi'])
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.axes = self.fig.subplots(self.rows, self.cols, sharex=True, sharey=True, squeeze=False).ravel()
+
+        positions = np.arange(len(labels))
+        self.bars, self.titles = [], []
+        for ax in self.axes:
+            self.bars.append(ax.bar(positions, np.zeros(len(labels)), width=0.7, color=colors, animated=True))
+            if reference is not None:
+                ax.plot(positions, reference, linestyle='none', marker='_', markersize=10, markeredgewidth=2, color='black')
+            # Texte provisoire : la mise en page réserve sa place (non dessiné dans le fond)
+            self.titles.append(ax.text(0.5, 1.03, 'Xg', transform=ax.transAxes, ha='center', va='bottom',
+                                       fontsize=GRAPH_CONFIG['legend_size'], fontweight='bold', animated=True))
+            ax.set_ylim(*ylim)
+            ax.set_xticks([])
+            ax.tick_params(labelsize=small_size)
+        for ax in self.axes[::self.cols]:
+            ax.set_ylabel(ylabel, fontsize=small_size)
+
+        handles = [Patch(color=color, label=label) for color, label in zip(colors, labels)]
+        if reference is not None:
+            handles.append(Line2D([], [], linestyle='none', marker='_', markersize=10, markeredgewidth=2,
+                                  color='black', label='Ensemble'))
+        self.fig.legend(handles=handles, loc='lower center', ncol=2, fontsize=small_size, frameon=False)
+        self.fig.tight_layout(rect=(0, legend_height / self.fig.get_figheight(), 1, 1))
+
+        self._capture_background()
+
+    def _capture_background(self):
+        """Rend le fond statique une fois et mémorise l'emprise de chaque panneau"""
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        renderer = self.canvas.get_renderer()
+        self.panel_boxes = [ax.get_tightbbox(renderer) for ax in self.axes]
+
+        # Caches des panneaux inutilisés (dernière planche incomplète)
+        self.covers = []
+        for box in self.panel_boxes:
+            box = box.padded(3)   # traits des axes débordant de l'emprise (anticrénelage)
+            cover = Rectangle((box.x0, box.y0), box.width, box.height, transform=IdentityTransform(),
+                              facecolor=self.fig.get_facecolor(), edgecolor='none', animated=True)
+            self.fig.add_artist(cover)
+            self.covers.append(cover)
+
+    def render_page(self, slices):
+        """Planche RGBA (hauteur x largeur x 4) pour au plus rows x cols tranches (titre, valeurs)"""
+        self.canvas.restore_region(self.background)
+        for i, ax in enumerate(self.axes):
+            if i >= len(slices):
+                self.fig.draw_artist(self.covers[i])
+                continue
+            title, values = slices[i]
+            for bar, value in zip(self.bars[i], values):
+                bar.set_height(0 if np.isnan(value) else value)
+                ax.draw_artist(bar)
+            self.titles[i].set_text(title)
+            ax.draw_artist(self.titles[i])
+        return np.asarray(self.canvas.buffer_rgba()).copy()
+
+    def panel_images(self, page, count=None):
+        """Découpe les panneaux d'une planche (images RGBA individuelles)"""
+        height = page.shape[0]
+        images = []
+        for box in self.panel_boxes[:count]:
+            top, bottom = int(height - box.y1), int(np.ceil(height - box.y0))
+            images.append(page[max(top, 0):bottom, max(int(box.x0), 0):int(np.ceil(box.x1))])
+        return images
+
+    def render(self, slices):
+        """Itère sur les planches successives de toutes les tranches"""
+        per_page = self.rows * self.cols
+        for start in range(0, len(slices), per_page):
+            yield self.render_page(slices[start:start + per_page])
+
+def group_slices(df, group_by=None, min_farmers=None):
+    """Groupes, tranches (titre, valeurs) des pratiques nuisibles par groupe et valeurs de l'ensemble"""
+    group_by = group_by or SMALL_MULTIPLES_CONFIG['group_by']
+    min_farmers = min_farmers or SMALL_MULTIPLES_CONFIG['min_farmers']
+    aggregates, national = compute_group_aggregates(df, group_by)
+    aggregates = aggregates[aggregates['farmers'] >= min_farmers]
+
+    columns = [f'pratique:{name}' for name in HARMFUL_PRACTICES]
+    values = aggregates[columns].to_numpy(dtype=float)
+    slices = [(f"{group} (n={int(farmers)})", row)
+              for group, row, farmers in zip(aggregates.index, values, aggregates['farmers'])]
+    return list(aggregates.index), slices, national[columns].to_numpy(dtype=float)
+
+def slice_filename(group_by, title):
+    """Nom de fichier sûr pour le panneau d'un groupe"""
+    slug = re.sub(r'[^a-z0-9]+', '_', fold_text(title)).strip('_') or 'sans_nom'
+    return f"{re.sub(r'[^a-z0-9]+', '_', fold_text(group_by)).strip('_')}_{slug}.png"
+
+def generate_small_multiples(df, group_by=None, export_panels=None):
+    """Génère les planches de petits multiples des pratiques nuisibles par groupe"""
+    group_by = group_by or SMALL_MULTIPLES_CONFIG['group_by']
+    export_panels = SMALL_MULTIPLES_CONFIG['export_panels'] if export_panels is None else export_panels
+    output_dir = SMALL_MULTIPLES_CONFIG['output_dir']
+    output_dir.mkdir(parents=True, exist_ok=True)
+    prefix = re.sub(r'[^a-z0-9]+', '_', fold_text(group_by)).strip('_')
+
+    print(f"Génération des petits multiples par {group_by.strip()}...")
+
+    groups, slices, national = group_slices(df, group_by)
+    start = time.perf_counter()
+    grid = SmallMultiples(practice_labels(), reference=national)
+    setup_seconds = time.perf_counter() - start
+
+    pages = list(grid.render(slices))
+    render_seconds = time.perf_counter() - start - setup_seconds
+
+    files = []
+    per_page = grid.rows * grid.cols
+    # Groupes distincts dont le nom simplifié coïncide : suffixes _2, _3...
+    panel_files = unique_filenames([slice_filename(group_by, str(group)) for group in groups])
+    for number, page in enumerate(pages, start=1):
+        path = output_dir / f"petits_multiples_{prefix}_{number:02d}.png"
+        plt.imsave(path, page)
+        files.append(str(path))
+        if export_panels:
+            page_files = panel_files[(number - 1) * per_page:number * per_page]
+            for filename, image in zip(page_files, grid.panel_images(page, len(page_files))):
+                plt.imsave(output_dir / filename, image)
+    total_seconds = time.perf_counter() - start
+
+    report = {
+        'group_by': group_by,
+        'files': files,
+        'summary': {
+            'panels': len(slices),
+            'pages': len(pages),
+            'setup_seconds': setup_seconds,
+            'render_seconds': render_seconds,
+            'panels_per_second': len(slices) / render_seconds if render_seconds > 0 else float('nan'),
+            'total_seconds': total_seconds
+        }
+    }
+
+    # Afficher le résumé
+    print(f"\n=== RÉSUMÉ DES PETITS MULTIPLES PAR {group_by.strip().upper()} ===")
+    print(f"   - Panneaux: {len(slices)} sur {len(pages)} planche(s) dans {output_dir}")
+    print(f"   - Mise en page: {setup_seconds:.2f} s, rendu: {render_seconds:.2f} s "
+          f"({report['summary']['panels_per_second']:.0f} panneaux/s), total avec export: {total_seconds:.2f} s")
+
+    return report
+
+if __name__ == "__main__":
+    import sys
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_small_multiples(df, group_by=sys.argv[1] if len(sys.argv) > 1 else None)
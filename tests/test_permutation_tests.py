@@ -0,0 +1,43 @@
+"""
+Tests de permutation : les statistiques vectorisées doivent égaler celles de
+scipy.stats calculées sur chaque permutation des groupes
+"""
+import numpy as np
+import pytest
+from scipy import stats
+
+from config import PERMUTATION_CONFIG
+from permutation_tests import anova_statistic, pearson_statistic, ttest_statistic, permutation_test
+
+@pytest.fixture
+def sample():
+    rng = np.random.default_rng(0)
+    values = rng.normal(50, 10, 40)
+    groups = np.repeat(np.arange(4), 10)
+    binary = np.repeat([0, 1], [15, 25])
+    ordinal = rng.integers(0, 5, 40).astype(float)
+    permutations = np.vstack([np.arange(40)] + [rng.permutation(40) for _ in range(5)])
+    return values, groups, binary, ordinal, permutations
+
+def test_anova_matches_scipy(sample):
+    values, groups, _, _, permutations = sample
+    expected = [stats.f_oneway(*(values[groups[p] == g] for g in range(4))).statistic for p in permutations]
+    np.testing.assert_allclose(anova_statistic(values, groups, permutations), expected, rtol=1e-9)
+
+def test_ttest_matches_scipy(sample):
+    values, _, binary, _, permutations = sample
+    expected = [abs(stats.ttest_ind(values[binary[p] == 1], values[binary[p] == 0]).statistic) for p in permutations]
+    np.testing.assert_allclose(ttest_statistic(values, binary, permutations), expected, rtol=1e-9)
+
+def test_pearson_matches_scipy(sample):
+    values, _, _, ordinal, permutations = sample
+    expected = [abs(stats.pearsonr(values, ordinal[p]).statistic) for p in permutations]
+    np.testing.assert_allclose(pearson_statistic(values, ordinal, permutations), expected, rtol=1e-9)
+
+def test_p_value_does_not_depend_on_jobs(sample, monkeypatch):
+    values, groups, _, _, _ = sample
+    monkeypatch.setitem(PERMUTATION_CONFIG, 'max_chunk_bytes', 3 * 8 * 40 * 64)   # lots de 64 permutations
+    serial = permutation_test('anova', values, groups, n_permutations=500, n_jobs=1, seed=1)
+    parallel = permutation_test('anova', values, groups, n_permutations=500, n_jobs=2, seed=1)
+    assert serial == parallel
+    assert 0 < serial[1] <= 1
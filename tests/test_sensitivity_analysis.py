@@ -0,0 +1,69 @@
+"""
+Analyse de sensibilité : l'évaluation matricielle des jeux de paramètres doit
+égaler le calcul exploitation par exploitation, et les estimateurs de Sobol
+doivent attribuer une influence nulle aux paramètres qui n'interviennent pas
+"""
+import numpy as np
+import pandas as pd
+
+from config import THRESHOLDS, PROTECTION_WEIGHTS
+from sensitivity_analysis import (CANAL_COLUMN, PROTECTION_COLUMN, PARAMETER_NAMES, NOMINAL_PARAMETERS, OUTPUTS,
+                                  build_design, evaluate_parameter_sets, evaluate_in_batches, parameter_bounds,
+                                  sobol_indices)
+
+def synthetic_farms(equipment, n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        CANAL_COLUMN: rng.integers(1, 101, n).astype(float),
+        PROTECTION_COLUMN: rng.choice(equipment, n)
+    })
+
+def brute_force_counts(df, params):
+    """Comptes recalculés exploitation par exploitation pour un jeu de paramètres"""
+    factors = dict(zip(PARAMETER_NAMES, params))
+    high = medium = high_risk = 0
+    for canal, equipment in zip(df[CANAL_COLUMN], df[PROTECTION_COLUMN]):
+        protection = factors[equipment] if equipment in PROTECTION_WEIGHTS else factors['non_reconnu']
+        score = canal * protection * factors['poids_canal']
+        if score > THRESHOLDS['pesticide_exposure_risk']:
+            high += 1
+            high_risk += protection >= THRESHOLDS['protection_insufficient']
+        elif score > THRESHOLDS['pesticide_exposure_medium']:
+            medium += 1
+    return [high, medium, high_risk]
+
+def test_parameter_sets_match_brute_force():
+    df = synthetic_farms(list(PROTECTION_WEIGHTS) + ['autre', None])
+    canal, onehot = build_design(df)
+    lows, highs = parameter_bounds()
+    params = np.vstack([NOMINAL_PARAMETERS, lows, highs,
+                        lows + (highs - lows) * np.random.default_rng(1).random((20, len(lows)))])
+
+    outputs = evaluate_parameter_sets(canal, onehot, params)
+    assert outputs.tolist() == [brute_force_counts(df, p) for p in params]
+
+def test_batches_do_not_change_results():
+    df = synthetic_farms(list(PROTECTION_WEIGHTS))
+    canal, onehot = build_design(df)
+    lows, highs = parameter_bounds()
+    params = lows + (highs - lows) * np.random.default_rng(2).random((50, len(lows)))
+
+    expected = evaluate_parameter_sets(canal, onehot, params)
+    np.testing.assert_array_equal(evaluate_in_batches(canal, onehot, params, batch_size=7), expected)
+
+def test_unused_parameters_have_zero_indices():
+    # Tous les agriculteurs portent un voile : seuls 'Voile' et 'poids_canal' interviennent
+    df = synthetic_farms(['Voile'])
+    sobol = sobol_indices(*build_design(df), n_base=256, seed=3)
+
+    unused = [name for name in PARAMETER_NAMES if name not in ('Voile', 'poids_canal')]
+    assert (sobol['first_order'].loc[unused] == 0).all().all()
+    assert (sobol['total'].loc[unused] == 0).all().all()
+    assert sobol['total'].loc[['Voile', 'poids_canal'], 'high_exposure'].gt(0).all()
+
+def test_constant_output_gives_zero_indices():
+    df = synthetic_farms(list(PROTECTION_WEIGHTS))
+    df[CANAL_COLUMN] = 0.0
+    sobol = sobol_indices(*build_design(df), n_base=64, seed=4)
+    assert list(sobol['total'].columns) == OUTPUTS
+    assert (sobol['first_order'] == 0).all().all() and (sobol['total'] == 0).all().all()
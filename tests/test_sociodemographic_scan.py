@@ -0,0 +1,81 @@
+"""
+Balayage facteurs socio-démographiques x indicateurs : les tests obtenus à
+partir des agrégats matriciels doivent égaler scipy.stats paire par paire
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from config import DATA_DIR, DATA_FILE, SOCIODEMOGRAPHIC_SCAN_CONFIG
+from data_loader import prepare_data
+from correlation_analysis import build_scan_outcomes, scan_sociodemographic_factors, benjamini_hochberg
+
+def synthetic_survey(n=120, seed=0):
+    """Réponses tirées au hasard pour chaque facteur et chaque indicateur (valeurs manquantes incluses)"""
+    rng = np.random.default_rng(seed)
+
+    def answers(levels, missing=0.1):
+        values = rng.choice(levels, n).astype(object)
+        values[rng.random(n) < missing] = None
+        return values
+
+    df = pd.DataFrame({col: answers([f'{name}_{i}' for i in range(2 + i % 3)])
+                       for i, (name, col) in enumerate(SOCIODEMOGRAPHIC_SCAN_CONFIG['factors'].items())})
+    exposure = rng.uniform(0, 100, n)
+    exposure[rng.random(n) < 0.1] = np.nan
+    df['Pesticide_exposure_score'] = exposure + 10 * (df['Sexe'] == 'sexe_1')
+    df['Protection_factor'] = rng.choice([0.5, 0.7, 1.0], n)
+    df['Water_consumption_m3'] = np.where(rng.random(n) < 0.3, np.nan, rng.choice([9000, 12000, 20000], n))
+    df[SOCIODEMOGRAPHIC_SCAN_CONFIG['training_columns'][0]] = answers(['oui', 'non'], missing=0.2)
+    df[SOCIODEMOGRAPHIC_SCAN_CONFIG['child_labor_column']] = answers(['oui', 'non'])
+    return df
+
+@pytest.fixture(scope='module', params=['synthetic', 'export'])
+def df(request):
+    if request.param == 'synthetic':
+        return synthetic_survey()
+    if not (DATA_DIR / DATA_FILE).exists():
+        pytest.skip(f"Export absent: {DATA_DIR / DATA_FILE}")
+    return prepare_data()
+
+@pytest.fixture(scope='module')
+def scan(df):
+    return scan_sociodemographic_factors(df)
+
+def pair_groups(df, factor, outcome):
+    """Valeurs de l'indicateur par modalité du facteur (réponses renseignées des deux côtés)"""
+    pairs = pd.DataFrame({
+        'factor': df[SOCIODEMOGRAPHIC_SCAN_CONFIG['factors'][factor]],
+        'outcome': build_scan_outcomes(df)[outcome]
+    }).dropna()
+    return pairs, [values.to_numpy() for _, values in pairs.groupby('factor')['outcome']]
+
+def test_anova_pairs_match_scipy(df, scan):
+    tested = scan[(scan['test'] == 'anova') & scan['p_value'].notna()]
+    # L'export n'a que quelques scores d'exposition renseignés : aucune ANOVA réalisable
+    assert len(tested) > 0 or df['Pesticide_exposure_score'].notna().sum() < SOCIODEMOGRAPHIC_SCAN_CONFIG['min_answers']
+    for row in tested.itertuples():
+        pairs, groups = pair_groups(df, row.factor, row.outcome)
+        expected = stats.f_oneway(*groups)
+        assert row.n == len(pairs) and row.groups == len(groups)
+        assert row.statistic == pytest.approx(expected.statistic, rel=1e-8)
+        assert row.p_value == pytest.approx(expected.pvalue, rel=1e-6, abs=1e-12)
+
+def test_chi2_pairs_match_scipy(df, scan):
+    tested = scan[(scan['test'] == 'chi2') & scan['p_value'].notna()]
+    assert len(tested) > 0
+    for row in tested.itertuples():
+        pairs, _ = pair_groups(df, row.factor, row.outcome)
+        expected = stats.chi2_contingency(pd.crosstab(pairs['factor'], pairs['outcome']), correction=False)
+        assert row.statistic == pytest.approx(expected.statistic, rel=1e-8)
+        assert row.p_value == pytest.approx(expected.pvalue, rel=1e-6, abs=1e-12)
+
+def test_q_values_follow_benjamini_hochberg(scan):
+    p_values = scan['p_value'].to_numpy()
+    tested = ~np.isnan(p_values)
+    ranked = np.sort(p_values[tested])
+    m = len(ranked)
+    expected = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1].clip(max=1)
+    np.testing.assert_allclose(np.sort(benjamini_hochberg(p_values)[tested]), expected)
+    assert np.isnan(scan.loc[~tested, 'q_value']).all()
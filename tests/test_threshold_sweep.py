@@ -0,0 +1,47 @@
+"""
+Balayage des seuils : les comptes obtenus par tri et recherche dichotomique
+doivent égaler l'évaluation directe des règles à chaque point de la grille
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import DATA_DIR, DATA_FILE, THRESHOLDS, THRESHOLD_SWEEPS
+from data_loader import prepare_data
+from impact_analysis import compile_rule, resolve_rule, threshold_counts
+from threshold_sweep import build_grid, sweep_threshold
+
+@pytest.fixture(scope='module')
+def df():
+    if not (DATA_DIR / DATA_FILE).exists():
+        pytest.skip(f"Export absent: {DATA_DIR / DATA_FILE}")
+    return prepare_data()
+
+@pytest.mark.parametrize('key', list(THRESHOLD_SWEEPS))
+def test_sweep_matches_rule_evaluation(df, key, monkeypatch):
+    curve = sweep_threshold(df, key)
+    evaluate = compile_rule(resolve_rule(THRESHOLD_SWEEPS[key]['rule']))
+    for threshold, count in zip(curve.index, curve['count']):
+        monkeypatch.setitem(THRESHOLDS, key, threshold)
+        assert evaluate(df).sum() == count, f"{key} = {threshold}"
+
+def test_grid_includes_current_threshold():
+    for key in THRESHOLD_SWEEPS:
+        grid = build_grid(key)
+        assert np.isclose(grid, THRESHOLDS[key]).sum() == 1
+        assert np.all(np.diff(grid) > 0)
+
+@pytest.mark.parametrize('operator', ['>', '>=', '<', '<='])
+@pytest.mark.parametrize('inverse', [False, True])
+def test_threshold_counts_ties_and_missing_values(operator, inverse):
+    # Valeurs ex aequo, seuils égaux aux valeurs, réponses non numériques ou manquantes
+    data = pd.DataFrame({'x': [1, 2, 2, 3, np.nan, 5, 'n/a', 2, 0]})
+    grid = [-1, 0, 1, 2, 2.5, 3, 5, 6]
+    counts = threshold_counts(data, {'column': 'x', 'operator': operator, 'inverse': inverse}, grid)
+    expected = [compile_rule({'column': 'x', 'operator': operator, 'value': t, 'inverse': inverse})(data).sum()
+                for t in grid]
+    assert list(counts) == expected
+
+def test_threshold_counts_rejects_text_rules():
+    with pytest.raises(ValueError):
+        threshold_counts(pd.DataFrame({'x': ['a']}), {'column': 'x', 'operator': 'contains', 'pattern': 'a'}, [0])
@@ -0,0 +1,216 @@
+"""
+Découverte automatique de catégories dans les réponses libres (TF-IDF creux et k-means par mini-lots)
+"""
+import numpy as np
+from scipy import sparse
+from config import TEXT_CLUSTERING_CONFIG
+from text_index import get_text_index, keyword_query
+from health_analysis import COMMON_SYMPTOMS, DANGEROUS_WASTE_PRACTICES
+from impact_analysis import BIODIVERSITY_IMPACT_CATEGORIES
+
+# Listes de mots-clés écrites à la main, comparées aux catégories proposées
+EXISTING_KEYWORDS = {
+    'symptomes': COMMON_SYMPTOMS,
+    'dechets': DANGEROUS_WASTE_PRACTICES,
+    'biodiversite': [keyword for keywords in BIODIVERSITY_IMPACT_CATEGORIES.values() for keyword in keywords]
+}
+
+def tfidf_matrix(text_index, column, min_df=None, max_df=None):
+    """Matrice TF-IDF creuse (réponses x termes) d'une colonne, construite depuis l'index
+
+    Les listes de postings donnent directement les triplets (réponse, terme,
+    fréquence) : aucun texte n'est re-découpé. Pondération tf sous-linéaire,
+    idf lissé et normalisation L2 des lignes.
+    """
+    min_df = min_df or TEXT_CLUSTERING_CONFIG['min_df']
+    max_df = max_df or TEXT_CLUSTERING_CONFIG['max_df']
+    stop_words = set(TEXT_CLUSTERING_CONFIG['stop_words'])
+
+    field = text_index.columns.index(column)
+    field_docs = np.flatnonzero(text_index.doc_field == field)
+    local = np.full(text_index.n_docs, -1, dtype=np.int64)
+    local[field_docs] = np.arange(len(field_docs))
+    n_docs = len(field_docs)
+
+    rows, cols, counts, terms = [], [], [], []
+    for term in text_index.terms:
+        if term in stop_words or term.isdigit():
+            continue
+        docs, frequencies = text_index.term_docs(term)
+        positions = local[docs]
+        keep = positions >= 0
+        df_term = int(keep.sum())
+        if df_term < min_df or df_term > max_df * n_docs:
+            continue
+        rows.append(positions[keep])
+        cols.append(np.full(df_term, len(terms)))
+        counts.append(frequencies[keep])
+        terms.append(term)
+
+    if not terms:
+        return sparse.csr_matrix((n_docs, 0)), [], text_index.doc_row[field_docs]
+
+    rows, cols, counts = np.concatenate(rows), np.concatenate(cols), np.concatenate(counts)
+    matrix = sparse.csr_matrix(((1 + np.log(counts)).astype(np.float64), (rows, cols)), shape=(n_docs, len(terms)))
+
+    document_frequency = np.bincount(cols, minlength=len(terms))
+    idf = np.log((1 + n_docs) / (1 + document_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    matrix = sparse.diags(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)) @ matrix
+
+    return matrix.tocsr(), terms, text_index.doc_row[field_docs]
+
+def _init_centers(matrix, n_clusters, rng, sample_size):
+    """Initialisation k-means++ (distance cosinus) sur un échantillon de réponses"""
+    sample = matrix[rng.choice(matrix.shape[0], min(sample_size, matrix.shape[0]), replace=False)]
+    centers = [sample[rng.integers(sample.shape[0])].toarray().ravel()]
+    distance = 1 - sample @ centers[0]
+    for _ in range(1, n_clusters):
+        weights = np.clip(distance, 0, None)
+        if weights.sum() <= 0:
+            break
+        choice = rng.choice(sample.shape[0], p=weights / weights.sum())
+        centers.append(sample[choice].toarray().ravel())
+        distance = np.minimum(distance, 1 - sample @ centers[-1])
+    return np.vstack(centers)
+
+def assign_clusters(matrix, centers, batch_size=None):
+    """Affecte chaque réponse au centre le plus proche (similarité cosinus), par lots"""
+    batch_size = batch_size or TEXT_CLUSTERING_CONFIG['batch_size']
+    labels = np.empty(matrix.shape[0], dtype=np.int64)
+    for start in range(0, matrix.shape[0], batch_size):
+        labels[start:start + batch_size] = np.asarray(matrix[start:start + batch_size] @ centers.T).argmax(axis=1)
+    return labels
+
+def minibatch_kmeans(matrix, n_clusters, batch_size=None, n_iter=None, seed=None):
+    """k-means sphérique par mini-lots sur une matrice creuse normalisée
+
+    Chaque mini-lot déplace les centres vers la moyenne des réponses affectées
+    avec un pas 1/effectif cumulé; seules des opérations creuses x denses sont
+    utilisées, la mémoire reste proportionnelle à la taille des lots.
+    """
+    batch_size = batch_size or TEXT_CLUSTERING_CONFIG['batch_size']
+    n_iter = n_iter or TEXT_CLUSTERING_CONFIG['n_iter']
+    seed = TEXT_CLUSTERING_CONFIG['seed'] if seed is None else seed
+    rng = np.random.default_rng(seed)
+
+    centers = _init_centers(matrix, n_clusters, rng, sample_size=10 * batch_size)
+    totals = np.zeros(len(centers))
+
+    for _ in range(n_iter):
+        batch = matrix[rng.choice(matrix.shape[0], min(batch_size, matrix.shape[0]), replace=False)]
+        labels = np.asarray(batch @ centers.T).argmax(axis=1)
+        membership = sparse.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))), shape=(len(centers), len(labels)))
+        batch_counts = np.bincount(labels, minlength=len(centers))
+        totals += batch_counts
+
+        updated = batch_counts > 0
+        step = batch_counts[updated] / totals[updated]
+        batch_means = np.asarray((membership @ batch)[updated].todense()) / batch_counts[updated, None]
+        centers[updated] += step[:, None] * (batch_means - centers[updated])
+
+        norms = np.linalg.norm(centers, axis=1, keepdims=True)
+        centers = np.divide(centers, norms, out=centers, where=norms > 0)
+
+    return centers, assign_clusters(matrix, centers, batch_size)
+
+def cluster_column(df, column, n_clusters=None, top_terms=None):
+    """Propose des catégories de mots-clés pour une colonne de texte libre"""
+    n_clusters = n_clusters or TEXT_CLUSTERING_CONFIG['n_clusters']
+    top_terms = top_terms or TEXT_CLUSTERING_CONFIG['top_terms']
+    text_index = get_text_index(df)
+
+    matrix, terms, answer_rows = tfidf_matrix(text_index, column)
+    represented = matrix.getnnz(axis=1) > 0
+    n_answers = len(answer_rows)
+    matrix, rows = matrix[represented], answer_rows[represented]
+
+    if matrix.shape[0] == 0 or not terms:
+        return {'n_answers': n_answers, 'n_terms': len(terms), 'categories': [], 'proposed_keywords': [], 'coverage': 0.0}
+
+    centers, labels = minibatch_kmeans(matrix, min(n_clusters, matrix.shape[0]))
+
+    categories = []
+    for k, center in enumerate(centers):
+        members = labels == k
+        if not members.any():
+            continue
+        keywords = [terms[j] for j in np.argsort(-center)[:top_terms] if center[j] > 0]
+        keyword_ids = [terms.index(keyword) for keyword in keywords]
+        with_keyword = matrix[members][:, keyword_ids].getnnz(axis=1) > 0
+        categories.append({
+            'keywords': keywords,
+            'size': int(members.sum()),
+            'share': members.sum() / n_answers * 100,
+            'keyword_coverage': with_keyword.mean() * 100,
+            'examples': df[column].iloc[rows[members][:3]].astype(str).tolist()
+        })
+
+    categories.sort(key=lambda category: -category['size'])
+    proposed = sorted({keyword for category in categories for keyword in category['keywords']})
+    proposed_rows = text_index.match_rows(' '.join(proposed), columns=[column])
+
+    return {
+        'n_answers': n_answers,
+        'n_terms': len(terms),
+        'categories': categories,
+        'proposed_keywords': proposed,
+        'coverage': proposed_rows[answer_rows].mean() * 100
+    }
+
+def generate_text_clustering_report(df):
+    """Génère les catégories proposées pour chaque question ouverte configurée"""
+
+    print("Regroupement automatique des réponses libres...")
+
+    text_index = get_text_index(df)
+    columns = {}
+    for name, column in TEXT_CLUSTERING_CONFIG['columns'].items():
+        if column not in text_index.columns:
+            print(f"⚠️ Colonne non indexée pour le regroupement {name}: {column}")
+            continue
+
+        result = cluster_column(df, column)
+
+        # Couverture des mots-clés écrits à la main, pour comparaison
+        if name in EXISTING_KEYWORDS:
+            answered = np.zeros(text_index.n_rows, dtype=bool)
+            answered[text_index.doc_row[text_index.doc_field == text_index.columns.index(column)]] = True
+            matched = text_index.match_rows(keyword_query(EXISTING_KEYWORDS[name]), columns=[column])
+            result['existing_keywords'] = list(EXISTING_KEYWORDS[name])
+            result['existing_coverage'] = matched[answered].mean() * 100 if answered.any() else 0.0
+
+        columns[name] = result
+
+    report = {
+        'columns': columns,
+        'summary': {
+            name: {
+                'n_categories': len(result['categories']),
+                'coverage': result['coverage'],
+                'existing_coverage': result.get('existing_coverage')
+            }
+            for name, result in columns.items()
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DU REGROUPEMENT DES RÉPONSES LIBRES ===")
+    for name, result in columns.items():
+        existing = result.get('existing_coverage')
+        comparison = f" (mots-clés actuels: {existing:.1f}%)" if existing is not None else ""
+        print(f"   - {name}: {result['n_answers']} réponses, {len(result['categories'])} catégories, "
+              f"couverture {result['coverage']:.1f}%{comparison}")
+        for category in result['categories'][:3]:
+            print(f"       • {', '.join(category['keywords'])} ({category['size']} réponses)")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_text_clustering_report(df)
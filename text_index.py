@@ -0,0 +1,261 @@
+"""
+Index inversé des réponses libres (recherche par mot, expression et préfixe, classement BM25)
+"""
+import re
+import hashlib
+import weakref
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+import pandas as pd
+import numpy as np
+from config import TEXT_INDEX_CONFIG, SELECT_MULTIPLE_GROUPS, DATETIME_COLUMNS
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+QUERY_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+def fold_text(text):
+    """Minuscules et suppression des accents"""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+def tokenize(text):
+    """Découpe un texte normalisé en termes"""
+    return TOKEN_PATTERN.findall(fold_text(text))
+
+def keyword_query(keywords):
+    """Requête d'index équivalente à une liste de mots-clés (préfixes et expressions)"""
+    return ' '.join(f'"{k}"' if ' ' in k else f'{k}*' for k in keywords)
+
+def detect_text_columns(df):
+    """Colonnes de réponses libres: texte, hors choix multiples et métadonnées"""
+    excluded = ({col.strip() for col in SELECT_MULTIPLE_GROUPS.values()} | set(DATETIME_COLUMNS)
+                | set(TEXT_INDEX_CONFIG['exclude_columns']))
+    columns = []
+    for col in df.columns:
+        if col.strip() in excluded or col.startswith('_') or '/' in col:
+            continue
+        if not (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])):
+            continue
+        values = df[col].dropna().astype(str)
+        if len(values) > 0 and values.str.split().str.len().mean() >= TEXT_INDEX_CONFIG['min_words']:
+            columns.append(col)
+    return columns
+
+class TextIndex:
+    """Index inversé positionnel: un document = une réponse (ligne, colonne)"""
+
+    def __init__(self, n_rows, columns):
+        self.n_rows = n_rows
+        self.columns = list(columns)
+        self.doc_row = np.zeros(0, dtype=np.int32)
+        self.doc_field = np.zeros(0, dtype=np.int16)
+        self.doc_length = np.zeros(0, dtype=np.int32)
+        self.postings = {}        # terme -> (documents, fréquences, décalages, positions)
+        self.terms = []           # vocabulaire trié (requêtes par préfixe)
+        self.fingerprint = None
+
+    @classmethod
+    def build(cls, df, columns=None):
+        """Construit l'index à partir des colonnes de texte libre d'un DataFrame"""
+        columns = [col for col in (columns or detect_text_columns(df)) if col in df.columns]
+        index = cls(len(df), columns)
+
+        doc_row, doc_field, doc_length = [], [], []
+        occurrences = defaultdict(list)   # terme -> [(document, positions)]
+
+        for field, col in enumerate(columns):
+            values = df[col].to_numpy()
+            for row in np.flatnonzero(pd.notna(values)):
+                tokens = tokenize(values[row])
+                if not tokens:
+                    continue
+                doc = len(doc_row)
+                doc_row.append(row)
+                doc_field.append(field)
+                doc_length.append(len(tokens))
+
+                positions = defaultdict(list)
+                for position, token in enumerate(tokens):
+                    positions[token].append(position)
+                for token, token_positions in positions.items():
+                    occurrences[token].append((doc, token_positions))
+
+        index.doc_row = np.array(doc_row, dtype=np.int32)
+        index.doc_field = np.array(doc_field, dtype=np.int16)
+        index.doc_length = np.array(doc_length, dtype=np.int32)
+
+        for term, entries in occurrences.items():
+            docs = np.array([doc for doc, _ in entries], dtype=np.int32)
+            frequencies = np.array([len(positions) for _, positions in entries], dtype=np.int32)
+            offsets = np.concatenate([[0], np.cumsum(frequencies)]).astype(np.int32)
+            positions = np.array([p for _, token_positions in entries for p in token_positions], dtype=np.int32)
+            index.postings[term] = (docs, frequencies, offsets, positions)
+
+        index.terms = sorted(index.postings)
+        index.fingerprint = text_fingerprint(df, columns)
+        return index
+
+    @property
+    def n_docs(self):
+        return len(self.doc_row)
+
+    def _field_mask(self, columns):
+        """Documents appartenant aux colonnes demandées (toutes si None)"""
+        if columns is None:
+            return None
+        missing = [col for col in columns if col not in self.columns]
+        if missing:
+            raise KeyError(f"Colonnes non indexées: {missing}")
+        return np.isin(self.doc_field, [self.columns.index(col) for col in columns])
+
+    def term_docs(self, term):
+        """Documents contenant un terme (avec fréquences)"""
+        docs, frequencies, _, _ = self.postings.get(term, (np.zeros(0, np.int32),) * 4)
+        return docs, frequencies
+
+    def prefix_terms(self, prefix):
+        """Termes du vocabulaire commençant par un préfixe"""
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + '\uffff')
+        return self.terms[start:end]
+
+    def phrase_docs(self, terms):
+        """Documents contenant les termes consécutivement (avec nombre d'occurrences)"""
+        if len(terms) == 1:
+            return self.term_docs(terms[0])
+        if any(term not in self.postings for term in terms):
+            return np.zeros(0, np.int32), np.zeros(0, np.int32)
+
+        candidates = self.postings[terms[0]][0]
+        for term in terms[1:]:
+            candidates = np.intersect1d(candidates, self.postings[term][0], assume_unique=True)
+
+        docs, counts = [], []
+        for doc in candidates:
+            starts = None
+            for shift, term in enumerate(terms):
+                term_docs, _, offsets, positions = self.postings[term]
+                k = np.searchsorted(term_docs, doc)
+                term_positions = positions[offsets[k]:offsets[k + 1]] - shift
+                starts = term_positions if starts is None else np.intersect1d(starts, term_positions, assume_unique=True)
+                if len(starts) == 0:
+                    break
+            if starts is not None and len(starts) > 0:
+                docs.append(doc)
+                counts.append(len(starts))
+        return np.array(docs, dtype=np.int32), np.array(counts, dtype=np.int32)
+
+    def parse_query(self, query):
+        """Découpe une requête en clauses (liste de termes) : mots, "expressions", préfixes*"""
+        clauses = []
+        for phrase, word in QUERY_PATTERN.findall(query):
+            if word.endswith('*'):
+                prefix = ''.join(tokenize(word[:-1]))
+                clauses.extend([term] for term in self.prefix_terms(prefix))
+            else:
+                terms = tokenize(phrase or word)
+                if terms:
+                    clauses.append(terms)
+        return clauses
+
+    def _clause_postings(self, query, columns=None):
+        """Documents et fréquences de chaque clause, restreints aux colonnes demandées"""
+        mask = self._field_mask(columns)
+        for terms in self.parse_query(query):
+            docs, frequencies = self.phrase_docs(terms)
+            if mask is not None:
+                keep = mask[docs]
+                docs, frequencies = docs[keep], frequencies[keep]
+            yield docs, frequencies
+
+    def match_docs(self, query, columns=None):
+        """Masque booléen des documents correspondant à au moins une clause"""
+        matched = np.zeros(self.n_docs, dtype=bool)
+        for docs, _ in self._clause_postings(query, columns):
+            matched[docs] = True
+        return matched
+
+    def match_rows(self, query, columns=None):
+        """Masque booléen des lignes ayant au moins une réponse correspondante"""
+        matched = np.zeros(self.n_rows, dtype=bool)
+        matched[self.doc_row[self.match_docs(query, columns)]] = True
+        return matched
+
+    def count_docs(self, query, columns=None):
+        """Nombre de réponses (ligne, colonne) correspondant à la requête"""
+        return int(self.match_docs(query, columns).sum())
+
+    def search(self, query, columns=None, top_n=10):
+        """Classe les réponses par score BM25"""
+        k1, b = TEXT_INDEX_CONFIG['bm25_k1'], TEXT_INDEX_CONFIG['bm25_b']
+        scores = np.zeros(self.n_docs)
+        average_length = self.doc_length.mean() if self.n_docs > 0 else 0
+
+        for docs, frequencies in self._clause_postings(query, columns):
+            if len(docs) == 0:
+                continue
+            idf = np.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1 - b + b * self.doc_length[docs] / average_length)
+            np.add.at(scores, docs, idf * frequencies * (k1 + 1) / (frequencies + norm))
+
+        ranked = np.flatnonzero(scores > 0)
+        ranked = ranked[np.argsort(-scores[ranked], kind='stable')][:top_n]
+        return pd.DataFrame({
+            'row': self.doc_row[ranked],
+            'column': [self.columns[field] for field in self.doc_field[ranked]],
+            'score': scores[ranked]
+        })
+
+def text_fingerprint(df, columns):
+    """Empreinte du contenu des colonnes indexées (validité de l'index persisté)"""
+    digest = hashlib.sha1(f"{len(df)}:{'|'.join(columns)}".encode())
+    if columns:
+        digest.update(pd.util.hash_pandas_object(df[columns].astype('string'), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def load_or_build_index(df, columns=None, index_file=None):
+    """Charge l'index persisté s'il correspond aux données, sinon le reconstruit"""
+    index_file = index_file or TEXT_INDEX_CONFIG['index_file']
+    columns = columns or TEXT_INDEX_CONFIG['columns'] or detect_text_columns(df)
+    columns = [col for col in dict.fromkeys(list(columns) + TEXT_INDEX_CONFIG['required_columns']) if col in df.columns]
+    fingerprint = text_fingerprint(df, columns)
+
+    if index_file.exists():
+        try:
+            index = pd.read_pickle(index_file)
+            if isinstance(index, TextIndex) and index.fingerprint == fingerprint:
+                return index
+        except Exception as e:
+            print(f"⚠️ Index texte illisible, reconstruction: {e}")
+
+    index = TextIndex.build(df, columns)
+    pd.to_pickle(index, index_file)
+    print(f"✓ Index texte construit: {index.n_docs} réponses, {len(index.terms)} termes ({len(columns)} colonnes)")
+    return index
+
+# Un index par DataFrame, libéré avec lui
+_INDEXES = {}
+
+def get_text_index(df):
+    """Retourne l'index texte associé à un DataFrame (construit ou chargé une seule fois)"""
+    key = id(df)
+    entry = _INDEXES.get(key)
+    if entry is None or entry[0]() is not df:
+        entry = (weakref.ref(df), load_or_build_index(df))
+        _INDEXES[key] = entry
+        weakref.finalize(df, _INDEXES.pop, key, None)
+    return entry[1]
+
+if __name__ == "__main__":
+    import sys
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        import text_index  # même instance que celle construite par prepare_data
+        index = text_index.get_text_index(df)
+        query = ' '.join(sys.argv[1:]) or 'intoxication*'
+        results = index.search(query)
+        for _, hit in results.iterrows():
+            print(f"{hit['score']:.2f}  [{hit['column'][:40]}] {df.iloc[hit['row']][hit['column']]}")
@@ -0,0 +1,113 @@
+"""
+Balayage des seuils d'analyse (scénarios what-if sur config.THRESHOLDS)
+"""
+import pandas as pd
+import numpy as np
+from config import THRESHOLDS, THRESHOLD_SWEEPS
+from impact_analysis import resolve_rule, rule_columns, rule_values, threshold_counts
+
+def build_grid(key, grid=None):
+    """Construit la grille de seuils d'un indicateur (inclut le seuil actuel)"""
+    if grid is None:
+        start, stop, num = THRESHOLD_SWEEPS[key]['grid']
+        grid = np.linspace(start, stop, num)
+    grid = np.asarray(grid, dtype=float)
+    if key in THRESHOLDS:
+        current = THRESHOLDS[key]
+        grid = np.union1d(grid[~np.isclose(grid, current)], [current])
+    return np.sort(grid)
+
+def sweep_threshold(df, key, grid=None):
+    """Courbe d'un indicateur en fonction de son seuil"""
+    grid = build_grid(key, grid)
+    counts = threshold_counts(df, resolve_rule(THRESHOLD_SWEEPS[key]['rule']), grid)
+
+    return pd.DataFrame({
+        'count': counts,
+        'percentage': counts / len(df) * 100 if len(df) > 0 else np.zeros(len(grid))
+    }, index=pd.Index(grid, name=key))
+
+def sweep_high_risk_profile(df, exposure_grid=None, protection_grid=None):
+    """Nombre de profils à haut risque (exposition > t1 et protection >= t2) sur une grille 2D
+
+    Chaque exploitation est placée dans une case (rang d'exposition, rang de
+    protection); des sommes cumulées inverses donnent tous les comptes d'un coup.
+    """
+    exposure_grid = build_grid('pesticide_exposure_risk', exposure_grid)
+    protection_grid = build_grid('protection_insufficient', protection_grid)
+
+    exposure, protection = (
+        pd.to_numeric(rule_values(df, resolve_rule(THRESHOLD_SWEEPS[key]['rule'])), errors='coerce').to_numpy(dtype=float)
+        for key in ('pesticide_exposure_risk', 'protection_insufficient')
+    )
+    valid = ~(np.isnan(exposure) | np.isnan(protection))
+
+    # Nombre de seuils satisfaits par chaque exploitation
+    exposure_rank = np.searchsorted(exposure_grid, exposure[valid], side='left')
+    protection_rank = np.searchsorted(protection_grid, protection[valid], side='right')
+
+    shape = (len(exposure_grid) + 1, len(protection_grid) + 1)
+    histogram = np.bincount(
+        np.ravel_multi_index((exposure_rank, protection_rank), shape),
+        minlength=shape[0] * shape[1]
+    ).reshape(shape)
+
+    cumulative = histogram[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+
+    return pd.DataFrame(
+        cumulative[1:, 1:],
+        index=pd.Index(exposure_grid, name='pesticide_exposure_risk'),
+        columns=pd.Index(protection_grid, name='protection_insufficient')
+    )
+
+def generate_threshold_sweep_report(df):
+    """Génère les courbes de sensibilité des indicateurs aux seuils"""
+
+    print("Balayage des seuils d'analyse...")
+
+    curves = {}
+    for key, spec in THRESHOLD_SWEEPS.items():
+        columns = rule_columns(resolve_rule(spec['rule']))
+        if not any(col in df.columns for col in columns):
+            print(f"⚠️ Colonne absente pour le seuil {key}: {columns[0]}")
+            continue
+        curve = sweep_threshold(df, key)
+        current = THRESHOLDS.get(key)
+        curves[key] = {
+            'label': spec['label'],
+            'thresholds': curve.index.tolist(),
+            'counts': curve['count'].tolist(),
+            'percentages': curve['percentage'].tolist(),
+            'current_threshold': current,
+            'current_percentage': curve['percentage'].get(current, np.nan) if current is not None else np.nan
+        }
+
+    high_risk = sweep_high_risk_profile(df)
+
+    report = {
+        'curves': curves,
+        'high_risk_grid': {
+            'exposure_thresholds': high_risk.index.tolist(),
+            'protection_thresholds': high_risk.columns.tolist(),
+            'counts': high_risk.to_numpy().tolist()
+        },
+        'summary': {
+            key: curve['current_percentage'] for key, curve in curves.items()
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DU BALAYAGE DES SEUILS ===")
+    for key, curve in curves.items():
+        percentages = curve['percentages']
+        print(f"   - {curve['label']}: {curve['current_percentage']:.1f}% au seuil actuel "
+              f"({min(percentages):.1f}% - {max(percentages):.1f}% sur la grille)")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_threshold_sweep_report(df)
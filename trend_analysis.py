@@ -0,0 +1,192 @@
+"""
+Analyse temporelle des indicateurs à partir de la date de soumission
+"""
+import pandas as pd
+import numpy as np
+from config import CACHE_DIR, THRESHOLDS, TREND_CONFIG, SOCIODEMOGRAPHIC_SCAN_CONFIG
+from data_loader import first_answer
+
+TREND_INDICATORS = {
+    'pesticide_exposure': 'Score moyen d\'exposition aux pesticides',
+    'high_exposure_rate': 'Exposition élevée aux pesticides (%)',
+    'overconsumption_rate': 'Surconsommation d\'eau (%)',
+    'untrained_rate': 'Agriculteurs non formés (%)'
+}
+
+def compute_indicator_frame(df):
+    """Calcule les indicateurs individuels indexés par date de soumission (triés)"""
+
+    time_column = TREND_CONFIG['time_column']
+    timestamps = pd.to_datetime(df[time_column], errors='coerce')
+
+    indicators = pd.DataFrame(index=df.index)
+    indicators['pesticide_exposure'] = df['Pesticide_exposure_score'].astype(float)
+    # Exposition parmi les agriculteurs ayant un score; surconsommation rapportée à tous
+    # les agriculteurs, comme le taux global de water_analysis (tranche non déclarée = non)
+    exposure, water = df['Pesticide_exposure_score'], df['Water_consumption_m3']
+    indicators['high_exposure_rate'] = (exposure > THRESHOLDS['pesticide_exposure_risk']).astype(float).where(exposure.notna()) * 100
+    indicators['overconsumption_rate'] = (water > THRESHOLDS['water_consumption_high']).astype(float) * 100
+
+    # Part des non formés parmi les répondants (toutes les versions de la question)
+    training = first_answer(df, SOCIODEMOGRAPHIC_SCAN_CONFIG['training_columns'])
+    indicators['untrained_rate'] = (training == 'non').astype(float).where(training.isin(['oui', 'non'])) * 100
+
+    indicators.index = timestamps
+    indicators = indicators[indicators.index.notna()]
+    return indicators.sort_index(kind='mergesort')
+
+def trend_thresholds():
+    """Seuils utilisés par les indicateurs (un changement invalide le cache)"""
+    return {key: THRESHOLDS[key] for key in ('pesticide_exposure_risk', 'water_consumption_high')}
+
+def row_hashes(indicators):
+    """Empreinte 64 bits de chaque soumission (date et valeurs des indicateurs)"""
+    return pd.Series(pd.util.hash_pandas_object(indicators, index=True).to_numpy(dtype=np.uint64),
+                     index=indicators.index)
+
+def aggregate_windows(indicators, frequency):
+    """Agrège les indicateurs en sommes et effectifs additifs par fenêtre
+
+    'row_hash' est la somme (modulo 2^64) des empreintes des soumissions de la
+    fenêtre : additive comme les autres agrégats, elle permet de vérifier que
+    les soumissions des fenêtres reprises du cache n'ont pas changé.
+    """
+
+    grouped = indicators.resample(frequency)
+    sums = grouped.sum(min_count=0)
+    counts = grouped.count()
+
+    aggregates = pd.concat({'sum': sums, 'count': counts}, axis=1)
+    aggregates['n_rows'] = grouped.size()
+    window_hashes = row_hashes(indicators).resample(frequency).apply(lambda values: values.to_numpy(dtype=np.uint64).sum())
+    aggregates['row_hash'] = window_hashes.reindex(aggregates.index, fill_value=0).to_numpy(dtype=np.uint64)
+    return aggregates
+
+def _load_cache(cache_path):
+    """Charge les agrégats mis en cache, s'ils existent"""
+    if cache_path is None or not cache_path.exists():
+        return None
+    try:
+        return pd.read_pickle(cache_path)
+    except Exception as e:
+        print(f"⚠️ Cache des tendances illisible ({e}) - recalcul complet")
+        return None
+
+def update_window_aggregates(df, cache_path=None, frequency=None, refresh_windows=None):
+    """Met à jour les agrégats par fenêtre en ne recalculant que les dernières fenêtres
+
+    Les fenêtres antérieures à la zone de rafraîchissement sont reprises du cache
+    tant que les seuils sont inchangés et que les soumissions qu'elles couvrent
+    sont identiques (même nombre et même empreinte).
+    """
+
+    frequency = frequency or TREND_CONFIG['frequency']
+    refresh_windows = TREND_CONFIG['refresh_windows'] if refresh_windows is None else refresh_windows
+    if cache_path is None:
+        cache_path = CACHE_DIR / TREND_CONFIG['cache_file']
+
+    indicators = compute_indicator_frame(df)
+    if len(indicators) == 0:
+        return aggregate_windows(indicators, frequency)
+
+    cached = _load_cache(cache_path)
+    if cached is not None and (cached.attrs.get('frequency') != frequency
+                               or cached.attrs.get('thresholds') != trend_thresholds()
+                               or 'row_hash' not in cached.columns):
+        cached = None
+
+    aggregates = None
+    if cached is not None and len(cached) > 0:
+        # Début de la zone à rafraîchir : les dernières fenêtres du cache
+        first_refreshed = max(len(cached) - refresh_windows, 0)
+        if first_refreshed < len(cached):
+            refresh_start = cached.index[first_refreshed]
+        else:
+            refresh_start = cached.index[-1] + pd.tseries.frequencies.to_offset(frequency)
+        stable = cached[cached.index < refresh_start]
+
+        # Recherche dichotomique sur l'index trié
+        split = indicators.index.searchsorted(refresh_start, side='left')
+        if (stable['n_rows'].sum() == split and
+                stable['row_hash'].to_numpy(dtype=np.uint64).sum() == row_hashes(indicators.iloc[:split]).to_numpy().sum()):
+            recent = aggregate_windows(indicators.iloc[split:], frequency)
+            aggregates = pd.concat([stable, recent[recent.index >= refresh_start]])
+            print(f"✓ Tendances: {len(aggregates) - len(stable)} fenêtre(s) mise(s) à jour")
+
+    if aggregates is None:
+        aggregates = aggregate_windows(indicators, frequency)
+        print(f"✓ Tendances: {len(aggregates)} fenêtre(s) calculée(s)")
+
+    aggregates = aggregates.asfreq(frequency, fill_value=0)
+    aggregates.attrs['frequency'] = frequency
+    aggregates.attrs['thresholds'] = trend_thresholds()
+
+    try:
+        aggregates.to_pickle(cache_path)
+    except Exception as e:
+        print(f"⚠️ Impossible d'enregistrer le cache des tendances: {e}")
+
+    return aggregates
+
+def compute_trends(aggregates, rolling_windows=None):
+    """Calcule les valeurs par fenêtre et glissantes à partir des agrégats"""
+
+    rolling_windows = rolling_windows or TREND_CONFIG['rolling_windows']
+
+    sums = aggregates['sum']
+    counts = aggregates['count']
+
+    window_values = sums / counts.replace(0, np.nan)
+    rolling_values = (
+        sums.rolling(rolling_windows, min_periods=1).sum() /
+        counts.rolling(rolling_windows, min_periods=1).sum().replace(0, np.nan)
+    )
+
+    return window_values, rolling_values
+
+def generate_trend_report(df):
+    """Génère le rapport d'évolution temporelle des indicateurs"""
+
+    print("Analyse de l'évolution temporelle des indicateurs...")
+
+    aggregates = update_window_aggregates(df)
+    window_values, rolling_values = compute_trends(aggregates)
+
+    indicators = {}
+    for name, label in TREND_INDICATORS.items():
+        rolling = rolling_values[name].dropna()
+        indicators[name] = {
+            'label': label,
+            'window': window_values[name].tolist(),
+            'rolling': rolling_values[name].tolist(),
+            'first': rolling.iloc[0] if len(rolling) > 0 else np.nan,
+            'last': rolling.iloc[-1] if len(rolling) > 0 else np.nan
+        }
+
+    report = {
+        'frequency': aggregates.attrs.get('frequency', TREND_CONFIG['frequency']),
+        'rolling_windows': TREND_CONFIG['rolling_windows'],
+        'dates': [d.strftime('%Y-%m-%d') for d in aggregates.index],
+        'submissions': aggregates['n_rows'].astype(int).tolist(),
+        'indicators': indicators,
+        'summary': {
+            'period_start': aggregates.index.min().strftime('%d/%m/%Y') if len(aggregates) > 0 else 'N/A',
+            'period_end': aggregates.index.max().strftime('%d/%m/%Y') if len(aggregates) > 0 else 'N/A',
+            'windows': len(aggregates)
+        }
+    }
+
+    # Afficher le résumé
+    print("\n=== RÉSUMÉ DES TENDANCES ===")
+    print(f"\nPériode: {report['summary']['period_start']} - {report['summary']['period_end']} ({report['summary']['windows']} fenêtres)")
+    for name, data in indicators.items():
+        print(f"   - {data['label']}: {data['first']:.1f} → {data['last']:.1f}")
+
+    return report
+
+if __name__ == "__main__":
+    from data_loader import prepare_data
+    df = prepare_data()
+
+    if df is not None:
+        report = generate_trend_report(df)
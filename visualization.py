@@ -5,15 +5,34 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import numpy as np
-from config import GRAPH_CONFIG, GRAPHS_DIR
+from scipy.cluster.hierarchy import linkage
+from scipy.spatial.distance import squareform
+from config import GRAPH_CONFIG, RENDER_PROFILES
+from chart_registry import CHART_REGISTRY
 import warnings
 warnings.filterwarnings('ignore')
 
-# Configuration de style
-plt.style.use('seaborn-v0_8-darkgrid')
-plt.rcParams['font.size'] = GRAPH_CONFIG['font_size']
-plt.rcParams['figure.figsize'] = GRAPH_CONFIG['figure_size']
-plt.rcParams['figure.dpi'] = GRAPH_CONFIG['dpi']
+def apply_render_profile(name='publication'):
+    """Applique un profil de rendu (publication ou aperçu) : résolution, style et format d'intégration au PDF"""
+    GRAPH_CONFIG.update(RENDER_PROFILES[name])
+    CHART_REGISTRY.export_png = GRAPH_CONFIG['export_png']
+    CHART_REGISTRY.export_dir = GRAPH_CONFIG['export_dir']
+    if CHART_REGISTRY.export_png:
+        CHART_REGISTRY.export_dir.mkdir(parents=True, exist_ok=True)
+
+    # Configuration de style
+    plt.rcdefaults()
+    plt.style.use(GRAPH_CONFIG['style'])
+    plt.rcParams['font.size'] = GRAPH_CONFIG['font_size']
+    plt.rcParams['figure.figsize'] = GRAPH_CONFIG['figure_size']
+    plt.rcParams['figure.dpi'] = GRAPH_CONFIG['dpi']
+    return name
+
+apply_render_profile()
+
+def save_chart(fig, filename):
+    """Enregistre un graphique dans le registre (rendu mémoire pour le PDF, export PNG en arrière-plan)"""
+    return CHART_REGISTRY.register(filename, fig)
 
 def create_harmful_practices_chart(report_data):
     """Crée un graphique des pratiques agricoles nuisibles"""
@@ -41,8 +60,7 @@ def create_harmful_practices_chart(report_data):
     ax.set_xlim(0, 100)
     
     plt.tight_layout()
-    plt.savefig(GRAPHS_DIR / 'pratiques_nuisibles.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'pratiques_nuisibles.png')
 
 def create_deforestation_evolution_chart(report_data):
     """Crée un graphique de l'évolution de la déforestation"""
@@ -75,8 +93,7 @@ def create_deforestation_evolution_chart(report_data):
     plt.suptitle(f'Impact sur la Déforestation ({deforestation["percentage"]:.1f}% des agriculteurs concernés)', 
                  fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(GRAPHS_DIR / 'deforestation_evolution.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'deforestation_evolution.png')
 
 def create_biodiversity_impact_chart(report_data):
     """Crée un graphique de l'impact sur la biodiversité"""
@@ -111,8 +128,7 @@ def create_biodiversity_impact_chart(report_data):
     
     plt.suptitle('Impact sur la Biodiversité', fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(GRAPHS_DIR / 'biodiversite_impact.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'biodiversite_impact.png')
 
 def create_pesticide_exposure_chart(report_data):
     """Crée un graphique de l'exposition aux pesticides"""
@@ -150,8 +166,7 @@ def create_pesticide_exposure_chart(report_data):
     
     plt.suptitle('Analyse de l\'Exposition aux Pesticides', fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(GRAPHS_DIR / 'exposition_pesticides.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'exposition_pesticides.png')
 
 def create_water_consumption_chart(report_data):
     """Crée un graphique de la consommation d'eau"""
@@ -190,8 +205,39 @@ def create_water_consumption_chart(report_data):
     plt.suptitle('Analyse de la Consommation d\'Eau dans la Riziculture', 
                  fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(GRAPHS_DIR / 'consommation_eau.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'consommation_eau.png')
+
+def create_water_volume_distribution_chart(report_data):
+    """Crée l'histogramme Monte Carlo du volume d'eau annuel"""
+    
+    monte_carlo = report_data['monte_carlo']
+    total = monte_carlo['total_volume_m3']
+    
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+    
+    # Graphique 1: Distribution du volume total
+    ax1.hist(monte_carlo['distribution'], bins=50, color=GRAPH_CONFIG['colors'][0], alpha=0.8)
+    for value, style in [(total['low'], ':'), (total['median'], '--'), (total['high'], ':')]:
+        ax1.axvline(value, color='red', linestyle=style)
+    ax1.set_xlabel('Volume annuel total (m³)', fontsize=GRAPH_CONFIG['label_size'])
+    ax1.set_ylabel('Nombre de tirages', fontsize=GRAPH_CONFIG['label_size'])
+    ax1.set_title(f"Volume Total (P{monte_carlo['interval'][0]}-P{monte_carlo['interval'][1]})", fontsize=GRAPH_CONFIG['title_size'])
+    
+    # Graphique 2: Volume par source d'eau avec intervalle
+    sources = {k: v for k, v in monte_carlo['per_source_m3'].items() if v['high'] > 0}
+    if sources:
+        medians = [v['median'] for v in sources.values()]
+        errors = [[v['median'] - v['low'] for v in sources.values()],
+                  [v['high'] - v['median'] for v in sources.values()]]
+        ax2.bar(list(sources.keys()), medians, yerr=errors, capsize=5, color=GRAPH_CONFIG['colors'][2])
+        ax2.set_ylabel('Volume annuel (m³)', fontsize=GRAPH_CONFIG['label_size'])
+        ax2.set_title('Volume par Source d\'Eau', fontsize=GRAPH_CONFIG['title_size'])
+        ax2.tick_params(axis='x', rotation=45)
+    
+    plt.suptitle(f"Estimation Monte Carlo des Volumes d'Eau ({monte_carlo['n_farms_modeled']} exploitations, "
+                 f"{monte_carlo['n_draws']} tirages)", fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
+    plt.tight_layout()
+    return save_chart(plt.gcf(), 'volume_eau_monte_carlo.png')
 
 def create_correlation_matrix(df):
     """Crée une matrice de corrélation"""
@@ -226,8 +272,7 @@ def create_correlation_matrix(df):
     plt.title('Matrice de Corrélation des Facteurs Socio-Environnementaux', 
               fontsize=GRAPH_CONFIG['title_size'], fontweight='bold', pad=20)
     plt.tight_layout()
-    plt.savefig(GRAPHS_DIR / 'correlation_matrix.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'correlation_matrix.png')
 
 def create_sociodemographic_analysis(report_data):
     """Crée des graphiques d'analyse socio-démographique"""
@@ -284,8 +329,112 @@ def create_sociodemographic_analysis(report_data):
     plt.suptitle('Analyse Socio-Démographique et Exposition aux Risques', 
                  fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
     plt.tight_layout()
-    plt.savefig(GRAPHS_DIR / 'analyse_sociodemographique.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'analyse_sociodemographique.png')
+
+def create_trend_chart(trend_report):
+    """Crée un graphique de l'évolution temporelle des indicateurs"""
+    
+    dates = pd.to_datetime(trend_report['dates'])
+    indicators = trend_report['indicators']
+    
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10), sharex=True)
+    
+    for ax, (color, (name, data)) in zip(axes.flat, zip(GRAPH_CONFIG['colors'], indicators.items())):
+        ax.plot(dates, data['window'], marker='o', linestyle='', alpha=0.4, color=color, label='Par fenêtre')
+        ax.plot(dates, data['rolling'], linewidth=2, color=color,
+                label=f"Moyenne glissante ({trend_report['rolling_windows']} fenêtres)")
+        ax.set_title(data['label'], fontsize=GRAPH_CONFIG['title_size'])
+        ax.tick_params(axis='x', rotation=45)
+        ax.grid(True, alpha=0.3)
+        ax.legend(fontsize=GRAPH_CONFIG['legend_size'])
+    
+    plt.suptitle('Évolution Temporelle des Indicateurs', fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
+    plt.tight_layout()
+    return save_chart(plt.gcf(), 'tendances_temporelles.png')
+
+def create_threshold_sweep_chart(sweep_report):
+    """Crée les courbes de sensibilité des indicateurs aux seuils"""
+    
+    curves = sweep_report['curves']
+    grid = sweep_report['high_risk_grid']
+    
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+    
+    for ax, color, curve in zip(axes.flat, GRAPH_CONFIG['colors'], curves.values()):
+        ax.plot(curve['thresholds'], curve['percentages'], linewidth=2, color=color)
+        if curve['current_threshold'] is not None:
+            ax.axvline(curve['current_threshold'], color='red', linestyle='--',
+                       label=f"Seuil actuel: {curve['current_threshold']:g} ({curve['current_percentage']:.1f}%)")
+            ax.legend(fontsize=GRAPH_CONFIG['legend_size'])
+        ax.set_xlabel('Seuil', fontsize=GRAPH_CONFIG['label_size'])
+        ax.set_ylabel('Agriculteurs concernés (%)', fontsize=GRAPH_CONFIG['label_size'])
+        ax.set_title(curve['label'], fontsize=GRAPH_CONFIG['title_size'])
+        ax.set_ylim(0, 100)
+        ax.grid(True, alpha=0.3)
+    
+    # Profils à haut risque selon les deux seuils
+    ax = axes.flat[3]
+    exposure = grid['exposure_thresholds']
+    protection = grid['protection_thresholds']
+    mesh = ax.pcolormesh(protection, exposure, np.array(grid['counts']), cmap='Reds', shading='nearest')
+    fig.colorbar(mesh, ax=ax, label='Agriculteurs à haut risque')
+    ax.set_xlabel('Seuil de protection insuffisante', fontsize=GRAPH_CONFIG['label_size'])
+    ax.set_ylabel('Seuil d\'exposition', fontsize=GRAPH_CONFIG['label_size'])
+    ax.set_title('Profils à Haut Risque selon les Seuils', fontsize=GRAPH_CONFIG['title_size'])
+    
+    plt.suptitle('Sensibilité des Indicateurs aux Seuils d\'Analyse', fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
+    plt.tight_layout()
+    return save_chart(plt.gcf(), 'analyse_seuils.png')
+
+def create_biodiversity_practices_chart(biodiversity_report):
+    """Crée le graphique des groupes cités et du croisement avec les pratiques"""
+    
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7), gridspec_kw={'width_ratios': [1, 1.6]})
+    
+    # Groupes taxonomiques cités
+    taxa = pd.Series(biodiversity_report['taxon_counts']).sort_values()
+    ax1.barh(taxa.index, taxa.values, color=GRAPH_CONFIG['colors'][2])
+    ax1.set_xlabel('Nombre d\'agriculteurs', fontsize=GRAPH_CONFIG['label_size'])
+    ax1.set_title('Groupes Taxonomiques Cités', fontsize=GRAPH_CONFIG['title_size'])
+    
+    # Sens du changement selon les pratiques (taux parmi les agriculteurs concernés)
+    crosstab = biodiversity_report['practice_crosstab']
+    practices = [p for p, data in crosstab.items() if data['n'] >= biodiversity_report['min_support']]
+    changes = list(biodiversity_report['change_counts'])
+    rates = pd.DataFrame({p: {c: crosstab[p]['rates_with'][c] for c in changes} for p in practices}).T
+    
+    if not rates.empty:
+        sns.heatmap(rates, annot=True, fmt='.0f', cmap='YlOrRd', vmin=0, vmax=100, ax=ax2,
+                    cbar_kws={'label': '% des agriculteurs'})
+        ax2.set_yticklabels([f"{p} (n={crosstab[p]['n']})" for p in rates.index], rotation=0)
+    ax2.set_title('Changements Observés selon les Pratiques', fontsize=GRAPH_CONFIG['title_size'])
+    
+    plt.suptitle('Biodiversité : Faune, Flore et Pratiques Agricoles', fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold')
+    plt.tight_layout()
+    return save_chart(plt.gcf(), 'biodiversite_pratiques.png')
+
+def create_association_heatmap(association_report):
+    """Crée la carte de chaleur regroupée des V de Cramér entre questions catégorielles"""
+    
+    labels = association_report['labels']
+    if len(labels) < 2:
+        return
+    
+    matrix = pd.DataFrame(association_report['cramers_v'], index=labels, columns=labels).fillna(0)
+    size = max(10, 0.22 * len(labels))
+    show_labels = len(labels) <= 120
+    
+    # Regroupement hiérarchique sur la distance 1 - V
+    distance = np.clip(1 - matrix.to_numpy(), 0, 1)
+    np.fill_diagonal(distance, 0)
+    link = linkage(squareform(distance, checks=False), method='average')
+    grid = sns.clustermap(matrix, row_linkage=link, col_linkage=link, cmap='viridis', vmin=0, vmax=1,
+                          figsize=(size, size), xticklabels=show_labels, yticklabels=show_labels,
+                          cbar_kws={'label': 'V de Cramér'}, dendrogram_ratio=0.12)
+    grid.ax_heatmap.tick_params(labelsize=max(5, GRAPH_CONFIG['label_size'] - 4))
+    grid.fig.suptitle('Associations entre Questions Catégorielles (V de Cramér)',
+                      fontsize=GRAPH_CONFIG['title_size']+2, fontweight='bold', y=1.01)
+    return save_chart(grid.fig, 'associations_categorielles.png')
 
 def create_summary_dashboard(all_reports):
     """Crée un tableau de bord résumé"""
@@ -321,11 +470,10 @@ def create_summary_dashboard(all_reports):
         ax1.text(x, 0.7, value, fontsize=20, fontweight='bold', ha='center')
         ax1.text(x, 0.3, label, fontsize=12, ha='center')
     
-    # Graphiques synthétiques
-    # ... (ajouter d'autres visualisations selon les besoins)
+    # Le tableau de bord interactif complet (filtres, pratiques, recommandations) est
+    # généré séparément en HTML : voir html_dashboard.generate_html_dashboard
     
-    plt.savefig(GRAPHS_DIR / 'tableau_de_bord.png', dpi=GRAPH_CONFIG['dpi'], bbox_inches='tight')
-    plt.close()
+    return save_chart(plt.gcf(), 'tableau_de_bord.png')
 
 def generate_all_visualizations(df, all_reports):
     """Génère toutes les visualisations"""
@@ -342,22 +490,44 @@ def generate_all_visualizations(df, all_reports):
     create_biodiversity_impact_chart(all_reports['impact'])
     print("✓ Graphique de biodiversité créé")
     
+    if 'biodiversity' in all_reports:
+        create_biodiversity_practices_chart(all_reports['biodiversity'])
+        print("✓ Graphique biodiversité et pratiques créé")
+    
     create_pesticide_exposure_chart(all_reports['health'])
     print("✓ Graphique d'exposition aux pesticides créé")
     
     create_water_consumption_chart(all_reports['water'])
     print("✓ Graphique de consommation d'eau créé")
     
+    if all_reports['water'].get('monte_carlo', {}).get('n_farms_modeled', 0) > 0:
+        create_water_volume_distribution_chart(all_reports['water'])
+        print("✓ Distribution Monte Carlo des volumes d'eau créée")
+    
     create_correlation_matrix(df)
     print("✓ Matrice de corrélation créée")
     
     create_sociodemographic_analysis(all_reports['correlation'])
     print("✓ Analyse socio-démographique créée")
     
+    if 'associations' in all_reports:
+        create_association_heatmap(all_reports['associations'])
+        print("✓ Carte des associations catégorielles créée")
+    
+    if 'trends' in all_reports:
+        create_trend_chart(all_reports['trends'])
+        print("✓ Graphique des tendances temporelles créé")
+    
+    if 'thresholds' in all_reports:
+        create_threshold_sweep_chart(all_reports['thresholds'])
+        print("✓ Graphique de sensibilité aux seuils créé")
+    
     create_summary_dashboard(all_reports)
     print("✓ Tableau de bord créé")
     
-    print(f"\nTous les graphiques ont été sauvegardés dans : {GRAPHS_DIR}")
+    print(f"\n{len(CHART_REGISTRY.charts)} graphiques rendus en mémoire pour le rapport")
+    if CHART_REGISTRY.export_png:
+        print(f"Export PNG en arrière-plan vers : {CHART_REGISTRY.export_dir}")
 
 if __name__ == "__main__":
     print("Module de visualisation prêt à l'emploi")
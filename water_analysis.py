@@ -3,6 +3,13 @@ Analyse de la consommation d'eau dans la riziculture
 """
 import pandas as pd
 import numpy as np
+from config import WATER_CONSUMPTION_BUCKETS, MONTE_CARLO_CONFIG
+from feature_store import register_feature, get_feature_store
+
+WATER_BUCKET_COLUMN = "Quantité d'eau utilisée/ha en cas de pompage"
+CAMPAIGNS_COLUMN = 'Nombre de campagne par an'
+SURFACE_COLUMN = 'Superficie cultivée en 2025'
+WATER_SOURCE_PREFIX = 'origine de l\'eau /'
 
 def analyze_water_consumption(df):
     """Analyse la consommation d'eau par hectare"""
@@ -24,9 +31,15 @@ def analyze_water_consumption(df):
         'Élevée (>16250 m³/ha)': (df['Water_consumption_m3'] > 16250).sum()
     }
     
-    # Calcul du volume total estimé
+    # Calcul du volume total estimé : une campagne, puis sur l'année (comme l'estimation Monte Carlo)
     total_surface = df['Superficie cultivée en 2025'].sum()
-    total_water_volume = (df['Water_consumption_m3'] * df['Superficie cultivée en 2025']).sum()
+    campaign_volumes = df['Water_consumption_m3'] * df['Superficie cultivée en 2025']
+    total_water_volume = campaign_volumes.sum()
+    if CAMPAIGNS_COLUMN in df.columns:
+        campaigns = pd.to_numeric(df[CAMPAIGNS_COLUMN], errors='coerce').fillna(1).clip(lower=1)
+    else:
+        campaigns = 1
+    annual_water_volume = (campaign_volumes * campaigns).sum()
     
     results = {
         'statistics': water_stats,
@@ -34,6 +47,7 @@ def analyze_water_consumption(df):
         'total_estimation': {
             'total_surface_ha': total_surface,
             'total_water_volume_m3': total_water_volume,
+            'annual_water_volume_m3': annual_water_volume,
             'average_per_farm': total_water_volume / len(df) if len(df) > 0 else 0
         }
     }
@@ -191,33 +205,40 @@ def analyze_water_management_practices(df):
     
     return results
 
-def analyze_water_efficiency(df):
-    """Analyse l'efficacité de l'utilisation de l'eau"""
-    
-    # Relation entre consommation d'eau et rendement
-    # Approximation basée sur la rentabilité déclarée
+RENTABILITY_COLUMN = 'comment notez vous la rentabilité de votre production'
+
+@register_feature('rentability_score', depends_on=[RENTABILITY_COLUMN])
+def compute_rentability_score(rentability):
+    """Score de rentabilité déclarée (0 à 3, 1 si non renseigné)"""
     rentability_map = {
         'tres rentable': 3,
         'moyennement rentable': 2,
         'peu rentable': 1,
         'pas rentable': 0
     }
+    if rentability is None:
+        return 1
+    return rentability.map(rentability_map).fillna(1)
+
+@register_feature('water_efficiency', depends_on=['rentability_score', 'Water_consumption_m3'])
+def compute_water_efficiency(rentability_score, water_consumption):
+    """Efficacité = rentabilité / consommation d'eau (normalisée)"""
+    efficiency = rentability_score / (water_consumption / 10000)
+    return efficiency.replace([np.inf, -np.inf], 0).fillna(0)
+
+def analyze_water_efficiency(df):
+    """Analyse l'efficacité de l'utilisation de l'eau"""
     
-    rentability_column = 'comment notez vous la rentabilité de votre production'
-    if rentability_column in df.columns:
-        df['rentability_score'] = df[rentability_column].map(rentability_map).fillna(1)
-    else:
-        df['rentability_score'] = 1
-    
-    # Efficacité = rentabilité / consommation d'eau (normalisée)
-    df['water_efficiency'] = df['rentability_score'] / (df['Water_consumption_m3'] / 10000)
-    df['water_efficiency'] = df['water_efficiency'].replace([np.inf, -np.inf], 0).fillna(0)
+    # Relation entre consommation d'eau et rendement
+    # Approximation basée sur la rentabilité déclarée
+    water_efficiency = get_feature_store(df).get('water_efficiency')
+    consumption = df['Water_consumption_m3']
     
     # Grouper par niveau de consommation
     efficiency_by_consumption = {
-        'low_consumption': df[df['Water_consumption_m3'] < 13000]['water_efficiency'].mean(),
-        'medium_consumption': df[(df['Water_consumption_m3'] >= 13000) & (df['Water_consumption_m3'] <= 16250)]['water_efficiency'].mean(),
-        'high_consumption': df[df['Water_consumption_m3'] > 16250]['water_efficiency'].mean()
+        'low_consumption': water_efficiency[consumption < 13000].mean(),
+        'medium_consumption': water_efficiency[(consumption >= 13000) & (consumption <= 16250)].mean(),
+        'high_consumption': water_efficiency[consumption > 16250].mean()
     }
     
     # Nombre de campagnes par an et consommation
@@ -227,17 +248,83 @@ def analyze_water_efficiency(df):
         campaigns_water = df.groupby(campaigns_col)['Water_consumption_m3'].agg(['mean', 'count']).to_dict('index')
     
     results = {
-        'average_efficiency': df['water_efficiency'].mean(),
+        'average_efficiency': water_efficiency.mean(),
         'efficiency_by_consumption': efficiency_by_consumption,
         'campaigns_impact': campaigns_water,
         'recommendations': {
-            'need_efficiency_improvement': (df['water_efficiency'] < 1).sum(),
+            'need_efficiency_improvement': (water_efficiency < 1).sum(),
             'overconsumption_cases': (df['Water_consumption_m3'] > 16250).sum()
         }
     }
     
     return results
 
+def _summarize_draws(draws, interval):
+    """Résume une distribution de tirages (moyenne, médiane, intervalle)"""
+    low, median, high = np.percentile(draws, [interval[0], 50, interval[1]], axis=-1)
+    return {'mean': float(np.mean(draws)), 'median': float(median), 'low': float(low), 'high': float(high)}
+
+def monte_carlo_water_volume(df, n_draws=None, chunk_size=None, seed=None):
+    """Estime la distribution des volumes d'eau par tirages Monte Carlo
+    
+    La consommation par hectare de chaque exploitation est tirée uniformément dans
+    sa tranche déclarée, indépendamment pour chaque campagne de l'année. Les tirages
+    sont des matrices (exploitations x tirages) traitées par blocs d'exploitations
+    pour borner la mémoire; les volumes par source d'eau sont obtenus par un produit
+    matriciel avec la répartition des sources de chaque exploitation.
+    """
+    n_draws = n_draws or MONTE_CARLO_CONFIG['n_draws']
+    seed = MONTE_CARLO_CONFIG['seed'] if seed is None else seed
+    rng = np.random.default_rng(seed)
+    
+    bounds = df[WATER_BUCKET_COLUMN].map(WATER_CONSUMPTION_BUCKETS) if WATER_BUCKET_COLUMN in df.columns else pd.Series(np.nan, index=df.index)
+    known = bounds.notna().to_numpy()
+    
+    low = np.array([b[0] for b in bounds[known]], dtype=float)
+    width = np.array([b[1] - b[0] for b in bounds[known]], dtype=float)
+    surface = pd.to_numeric(df.loc[known, SURFACE_COLUMN], errors='coerce').fillna(0).to_numpy(dtype=float)
+    if CAMPAIGNS_COLUMN in df.columns:
+        campaigns = pd.to_numeric(df.loc[known, CAMPAIGNS_COLUMN], errors='coerce').fillna(1).clip(lower=1).to_numpy(dtype=int)
+    else:
+        campaigns = np.ones(known.sum(), dtype=int)
+    
+    # Répartition de chaque exploitation entre ses sources d'eau (parts égales)
+    source_cols = [col for col in df.columns if col.startswith(WATER_SOURCE_PREFIX)]
+    sources = [col.split('/')[-1].strip() for col in source_cols]
+    shares = df.loc[known, source_cols].fillna(0).to_numpy(dtype=float)
+    n_sources_used = shares.sum(axis=1, keepdims=True)
+    shares = np.divide(shares, n_sources_used, out=np.zeros_like(shares), where=n_sources_used > 0)
+    
+    if chunk_size is None:
+        chunk_size = max(1, MONTE_CARLO_CONFIG['max_chunk_bytes'] // (8 * n_draws * 2))
+    
+    total = np.zeros(n_draws)
+    per_source = np.zeros((len(sources), n_draws))
+    
+    for start in range(0, len(low), chunk_size):
+        block = slice(start, start + chunk_size)
+        volumes = np.zeros((len(low[block]), n_draws))
+        # Une boucle par campagne (1 à 2 en pratique), vectorisée sur exploitations et tirages
+        for campaign in range(campaigns[block].max(initial=0)):
+            draws = rng.random(volumes.shape)
+            draws *= width[block, None]
+            draws += low[block, None]
+            draws *= (surface[block] * (campaigns[block] > campaign))[:, None]
+            volumes += draws
+        total += volumes.sum(axis=0)
+        per_source += shares[block].T @ volumes
+    
+    interval = MONTE_CARLO_CONFIG['interval']
+    return {
+        'n_farms_modeled': int(known.sum()),
+        'n_farms_unknown': int((~known).sum()),
+        'n_draws': n_draws,
+        'interval': interval,
+        'total_volume_m3': _summarize_draws(total, interval),
+        'per_source_m3': {source: _summarize_draws(per_source[i], interval) for i, source in enumerate(sources)},
+        'distribution': total
+    }
+
 def generate_water_report(df):
     """Génère un rapport complet sur l'utilisation de l'eau"""
     
@@ -256,14 +343,19 @@ def generate_water_report(df):
         # Analyser l'efficacité
         efficiency = analyze_water_efficiency(df)
         
+        # Distribution des volumes (Monte Carlo)
+        monte_carlo = monte_carlo_water_volume(df)
+        
         report = {
             'consumption': consumption,
+            'monte_carlo': monte_carlo,
             'irrigation': irrigation,
             'management': management,
             'efficiency': efficiency,
             'summary': {
                 'average_consumption_m3': consumption['statistics']['mean'],
                 'total_water_used_m3': consumption['total_estimation']['total_water_volume_m3'],
+                'annual_water_used_m3': consumption['total_estimation']['annual_water_volume_m3'],
                 'high_consumption_percentage': (consumption['distribution']['Élevée (>16250 m³/ha)'] / len(df)) * 100 if len(df) > 0 else 0,
                 'sri_adoption_rate': (management['sri_adoption']['knows_and_applies'] / len(df)) * 100 if len(df) > 0 else 0,
                 'irrigation_problems': sum(management['system_problems'].values())
@@ -275,8 +367,12 @@ def generate_water_report(df):
         
         print(f"\n1. Consommation d'eau:")
         print(f"   - Consommation moyenne: {consumption['statistics']['mean']:,.0f} m³/ha")
-        print(f"   - Volume total estimé: {consumption['total_estimation']['total_water_volume_m3']:,.0f} m³")
+        print(f"   - Volume total estimé par campagne: {consumption['total_estimation']['total_water_volume_m3']:,.0f} m³")
+        print(f"   - Volume annuel estimé (campagnes déclarées): {consumption['total_estimation']['annual_water_volume_m3']:,.0f} m³")
         print(f"   - Surconsommation (>16250 m³/ha): {report['summary']['high_consumption_percentage']:.1f}% des agriculteurs")
+        mc_total = monte_carlo['total_volume_m3']
+        print(f"   - Volume annuel (Monte Carlo, {monte_carlo['n_draws']} tirages): {mc_total['median']:,.0f} m³ "
+              f"[P{monte_carlo['interval'][0]}-P{monte_carlo['interval'][1]}: {mc_total['low']:,.0f} - {mc_total['high']:,.0f}]")
         
         print(f"\n2. Méthodes d'irrigation:")
         print(f"   - Pompage: {irrigation['efficiency_indicators']['pompage_percentage']:.1f}%")
@@ -298,11 +394,12 @@ def generate_water_report(df):
         print(f"Erreur lors de l'analyse de l'eau: {str(e)}")
         # Retourner un rapport par défaut en cas d'erreur
         return {
-            'consumption': {'statistics': {'mean': 0}, 'distribution': {}, 'total_estimation': {'total_water_volume_m3': 0}},
+            'consumption': {'statistics': {'mean': 0}, 'distribution': {}, 'total_estimation': {'total_water_volume_m3': 0, 'annual_water_volume_m3': 0}},
+            'monte_carlo': {'n_farms_modeled': 0, 'n_draws': 0, 'total_volume_m3': {'mean': 0, 'median': 0, 'low': 0, 'high': 0}, 'per_source_m3': {}},
             'irrigation': {'irrigation_methods': {}, 'water_sources': {}, 'energy_types': {}, 'efficiency_indicators': {'pompage_percentage': 0, 'solar_energy_percentage': 0, 'river_dependency': 0}},
             'management': {'sri_adoption': {'knows_and_applies': 0, 'knows_but_not_applied': 0, 'does_not_know': 0}, 'system_problems': {}, 'conservation_practices': {}, 'water_pollution_perception': {}},
             'efficiency': {'average_efficiency': 0, 'efficiency_by_consumption': {}, 'campaigns_impact': {}, 'recommendations': {'need_efficiency_improvement': 0, 'overconsumption_cases': 0}},
-            'summary': {'average_consumption_m3': 0, 'total_water_used_m3': 0, 'high_consumption_percentage': 0, 'sri_adoption_rate': 0, 'irrigation_problems': 0}
+            'summary': {'average_consumption_m3': 0, 'total_water_used_m3': 0, 'annual_water_used_m3': 0, 'high_consumption_percentage': 0, 'sri_adoption_rate': 0, 'irrigation_problems': 0}
         }
 
 if __name__ == "__main__":